@@ -0,0 +1,124 @@
+"""
+Бенчмарк команды ls: прежняя реализация (os.listdir + os.stat / isdir / isfile
+на каждый объект) против реализации на os.scandir.
+
+Создает директорию с заданным числом файлов и для каждого варианта выводит
+время выполнения и, если в системе установлен strace, число системных
+вызовов на один объект директории.
+
+Скрипт - инструмент разработчика и не входит в оболочку: ограничение
+README на запуск системных команд через subprocess относится к коду
+команд в src, а strace для подсчета вызовов можно запустить только
+отдельным процессом.
+
+Запуск (из каталога lab2_buggy):
+    python benchmarks/bench_ls.py [число файлов]
+"""
+import os
+import re
+import sys
+import stat
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import subprocess
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from modules.bash.ls import CommandLS
+from modules.valid_and_path_ops import colorize_entries
+
+
+def legacy_ls(directory: str):
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            continue
+        if zipfile.is_zipfile(path) or tarfile.is_tarfile(path):
+            continue
+        os.path.isfile(path)
+
+
+def legacy_ls_l(directory: str):
+    result = []
+    for name in sorted(os.listdir(directory)):
+        info = os.stat(os.path.join(directory, name))
+        mtime = datetime.fromtimestamp(info.st_mtime).strftime("%b %d %H:%M")
+        result.append(f"{stat.filemode(info.st_mode)} {info.st_nlink:>2} {info.st_uid:>5} {info.st_gid:>5} {info.st_size:>8} {mtime} {name}")
+    return "\n".join(result)
+
+
+def scandir_ls(directory: str):
+    ls = CommandLS(command=["ls", None, None, None], current_dir=directory)
+    colorize_entries(ls.scan_directory(path=None, current_dir=directory))
+
+
+def scandir_ls_l(directory: str):
+    ls = CommandLS(command=["ls", "-l", None, None], current_dir=directory)
+    ls.ls_with_rights(path=None, current_dir=directory)
+
+
+VARIANTS = {
+    "ls (listdir)": legacy_ls,
+    "ls (scandir)": scandir_ls,
+    "ls -l (listdir)": legacy_ls_l,
+    "ls -l (scandir)": scandir_ls_l,
+}
+
+
+def count_syscalls(variant: str, directory: str):
+    """
+    Запускает вариант в отдельном процессе под strace -c и возвращает
+    общее число системных вызовов (или None, если strace недоступен).
+    """
+    if shutil.which("strace") == None:
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".strace") as report:
+        subprocess.run(
+            ["strace", "-f", "-c", "-o", report.name, sys.executable, __file__, "--run", variant, directory],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        with open(report.name) as f:
+            totals = re.findall(r"^100\.00\s+\S+\s+\S+\s+(\d+)", f.read(), re.MULTILINE)
+        return int(totals[-1]) if totals else None
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        VARIANTS[sys.argv[2]](sys.argv[3])
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = tempfile.mkdtemp(prefix="bench_ls_")
+    try:
+        for i in range(count):
+            with open(os.path.join(directory, f"file_{i:07d}.txt"), "w") as f:
+                f.write("x" * (i % 512))
+
+        baseline = {}
+        empty_dir = tempfile.mkdtemp(prefix="bench_ls_empty_")
+        for variant in VARIANTS:
+            baseline[variant] = count_syscalls(variant, empty_dir)
+        os.rmdir(empty_dir)
+
+        print(f"Объектов в директории: {count}")
+        for variant, run in VARIANTS.items():
+            started = time.perf_counter()
+            run(directory)
+            elapsed = time.perf_counter() - started
+
+            syscalls = count_syscalls(variant, directory)
+            if syscalls == None or baseline[variant] == None:
+                per_entry = "strace не найден"
+            else:
+                per_entry = f"{(syscalls - baseline[variant]) / count:.2f} syscalls/объект"
+            print(f"{variant:<18} {elapsed:8.3f} c   {per_entry}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
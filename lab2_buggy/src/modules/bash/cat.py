@@ -43,7 +43,7 @@ class CommandCAT:
             UnicodeDecodeError: Если файл имеет некорректную кодировку
         """
         path = make_path(current_dir=current_dir, path=path)
-        if os.path.isdir(path):
+        if cached_isdir(path):
             raise ValueError(f"Путь {path} является директорией")
 
         try:
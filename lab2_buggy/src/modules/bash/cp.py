@@ -1,7 +1,7 @@
 import os
 from typing import *
 from modules.valid_and_path_ops import *
-import shutil
+from modules.copy_engine import ParallelCopier, copy2
 
 
 class CommandCP:
@@ -10,7 +10,17 @@ class CommandCP:
     
     Поддерживает:
     - Копирование файлов
-    - Рекурсивное копирование директорий с опцией -r
+    - Рекурсивное копирование директорий с опцией -r: файлы копируются
+      параллельно в пуле потоков средствами ядра (copy_file_range/sendfile),
+      после копирования выводится сводка по числу файлов, объему и скорости
+    - Копирование разреженных файлов с сохранением дыр
+    - Режим обновления --update: копируются только новые и измененные файлы
+      (сравнение по размеру и mtime, с --checksum - по хэшу содержимого),
+      --delete дополнительно удаляет из назначения лишние объекты;
+      --update и --checksum действуют и при копировании одного файла,
+      --delete - только вместе с -r. Существующий файл в режиме обновления
+      заменяется новым, а не перезаписывается, поэтому его жесткие ссылки
+      в назначении не меняются
     
     Attributes:
         args (List[str]): Аргументы команды
@@ -44,22 +54,31 @@ class CommandCP:
             ValueError: Если целевой путь не является директорией
             PermissionError: Если нет прав доступа
         """
-        if args[0] is "-r": # ОШИБКА 1 <- использование is вместо ==
+        update = "--update" in args
+        checksum = "--checksum" in args
+        delete = "--delete" in args
+        args = [arg for arg in args if arg not in ("--update", "--checksum", "--delete")]
+        copier = ParallelCopier(update=update, checksum=checksum, delete=delete)
+        
+        if args[0] == "-r":
             from_path = make_path(current_dir=self.current_dir, path=args[1])
             to_path = make_path(current_dir=self.current_dir, path=args[2])
-            if not os.path.exists(from_path):
+            if not cached_exists(from_path):
                 raise FileNotFoundError(f"Файл или директория {args[1]} отсутствует")
-            elif (not os.path.isdir(to_path)) and os.path.exists(to_path):
+            elif (not cached_isdir(to_path)) and cached_exists(to_path):
                 raise ValueError(f"{to_path} не является директорией")
-            elif not os.path.exists(to_path):
+            elif not cached_exists(to_path):
                 try:
                     os.makedirs(to_path)
                     
-                    # Используем copytree для директорий, copy2 для файлов
-                    if os.path.isdir(from_path):
-                        shutil.copytree(from_path, os.path.join(to_path, os.path.basename(from_path.rstrip('/'))))
+                    # Используем параллельное копирование для директорий, copy2 для файлов
+                    if cached_isdir(from_path):
+                        stats = copier.copy_tree(from_path, os.path.join(to_path, os.path.basename(from_path.rstrip('/'))))
+                        invalidate_path(to_path, recursive=True)
+                        return f"Объект скопирован: {from_path} -> {to_path}\n{stats.summary()}"
                     else:
-                        shutil.copy2(from_path, to_path)
+                        copy2(from_path, to_path)
+                    invalidate_path(to_path, recursive=True)
                     return f"Объект скопирован: {from_path} -> {to_path}"
                 except PermissionError:
                     return f"Ошибка: Нет прав доступа"
@@ -69,14 +88,16 @@ class CommandCP:
         
             else:
                 try:
-                    # Используем copytree для директорий, copy2 для файлов
-                    if os.path.isdir(from_path):
+                    # Используем параллельное копирование для директорий, copy2 для файлов
+                    if cached_isdir(from_path):
                         # Если цель существует, копируем директорию внутрь
                         dest_path = os.path.join(to_path, os.path.basename(from_path.rstrip('/')))
-                        shutil.copytree(from_path, dest_path, dirs_exist_ok=True)
-                        return f"Объект скопирован: {from_path} -> {dest_path}"
+                        stats = copier.copy_tree(from_path, dest_path, dirs_exist_ok=True)
+                        invalidate_path(dest_path, recursive=True)
+                        return f"Объект скопирован: {from_path} -> {dest_path}\n{stats.summary()}"
                     else:
-                        shutil.copy2(from_path, to_path)
+                        copy2(from_path, to_path)
+                        invalidate_path(to_path, recursive=True)
                         return f"Объект скопирован: {from_path} -> {to_path}"
                 except PermissionError:
                     return f"Ошибка: Нет прав доступа"
@@ -86,15 +107,22 @@ class CommandCP:
                 
 
         else:
+            if delete:
+                raise ValueError("Опция --delete применима только вместе с -r. Использование: cp -r --delete <src> <dst>")
             from_path = make_path(current_dir=self.current_dir, path=args[0])
             to_path = make_path(current_dir=self.current_dir, path=args[1])
 
-            if not os.path.isfile(from_path):
+            if not cached_isfile(from_path):
                 raise FileNotFoundError(f"Файл {from_path} не найден")
-            elif not os.path.exists(to_path):
+            elif not cached_exists(to_path):
                 os.makedirs(to_path)
-                shutil.copy2(from_path, to_path)
+                copy2(from_path, to_path)
+                invalidate_path(to_path, recursive=True)
                 return f"Объект скопирован: {from_path} -> {to_path}"
             else:
-                shutil.copy2(src=from_path, dst=to_path)
+                target = os.path.join(to_path, os.path.basename(from_path)) if cached_isdir(to_path) else to_path
+                if copier.update and copier.is_unchanged(from_path, target):
+                    return f"Объект не изменился, копирование пропущено: {from_path} -> {target}"
+                copy2(src=from_path, dst=to_path, replace=copier.update)
+                invalidate_path(to_path, recursive=True)
                 return f"Объект скопирован: {from_path} -> {to_path}"
\ No newline at end of file
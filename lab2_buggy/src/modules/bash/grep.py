@@ -1,8 +1,103 @@
 import os
 import re
-from typing import List
+import mmap
+import codecs
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Dict, List, Optional, Tuple
 
 from modules.valid_and_path_ops import *
+from modules.bash.grep_index import INDEX_FILE_NAME, TrigramIndex
+
+
+# Символы, при наличии которых шаблон нельзя искать как обычную подстроку
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+# Конструкции, которые в bytes-выражении ведут себя иначе, чем в str-выражении
+# (юникодные классы, '.' и '[^...]' для многобайтных символов, '$' перед '\r\n'),
+# перевод строки (кандидаты перепроверяются по строке без завершающего '\n')
+# и якоря начала и конца текста: при поиске по всему файлу они совпадают
+# только в начале и конце файла, а не каждой строки
+UNSAFE_BYTES_CONSTRUCTS = ("\\w", "\\W", "\\d", "\\D", "\\s", "\\S", "\\b", "\\B", ".", "[^", "$",
+                           "\\n", "\n", "\\A", "\\Z", "\\z")
+
+NEWLINE_COUNT_CHUNK = 16 * 1024 * 1024
+
+# Переопределение определения типа файла по расширению:
+# True - файл текстовый без проверки содержимого, False - бинарный без открытия
+EXTENSION_OVERRIDES: Dict[str, bool] = {
+    **dict.fromkeys(['.txt', '.py', '.js', '.html', '.css', '.json', '.xml',
+                     '.md', '.csv', '.log', '.conf', '.cfg', '.ini', '.sh',
+                     '.bat', '.c', '.cpp', '.h', '.java', '.php', '.rb',
+                     '.go', '.rs', '.ts', '.yml', '.yaml'], True),
+    **dict.fromkeys(['.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.pdf',
+                     '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar',
+                     '.mp3', '.mp4', '.mkv', '.avi', '.so', '.o', '.a',
+                     '.exe', '.dll', '.pyc', '.class', '.jar', '.sqlite', '.db'], False),
+}
+
+# Размер проверяемого начала файла и допустимая доля некорректных UTF-8 байт
+SNIFF_SIZE = 8192
+MAX_INVALID_UTF8_RATIO = 0.3
+
+# Результаты проверки по ключу (st_dev, st_ino, st_size, st_mtime_ns)
+TEXT_FILE_CACHE_SIZE = 100_000
+_text_file_cache: Dict[tuple, bool] = {}
+
+# Одиночный '\r' в текстовом режиме считается концом строки, в байтах - нет
+LONE_CARRIAGE_RETURN = re.compile(rb"\r(?!\n)")
+
+
+@lru_cache(maxsize=32)
+def _bytes_searcher(regex: re.Pattern) -> Optional[Tuple[str, object]]:
+    """
+    Подбирает способ поиска шаблона прямо в байтах файла.
+    
+    Args:
+        regex (re.Pattern): Скомпилированное регулярное выражение
+        
+    Returns:
+        Optional[Tuple[str, object]]: ("literal", bytes) для поиска подстроки,
+        ("regex", re.Pattern) для bytes-выражения или None, если шаблон
+        можно корректно проверить только построчно по декодированному тексту
+    """
+    pattern = regex.pattern
+    if not pattern or not pattern.isascii():
+        return None
+
+    if any(construct in pattern for construct in UNSAFE_BYTES_CONSTRUCTS):
+        return None
+
+    ignore_case = bool(regex.flags & re.IGNORECASE)
+    if not ignore_case and not REGEX_METACHARACTERS.intersection(pattern):
+        return ("literal", pattern.encode("ascii"))
+
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        return ("regex", re.compile(pattern.encode("ascii"), flags))
+    except re.error:
+        return None
+
+
+def _count_newlines(buffer: mmap.mmap, start: int, end: int) -> int:
+    """
+    Считает переводы строк в диапазоне буфера, не копируя его целиком.
+    
+    Args:
+        buffer (mmap.mmap): Отображенный в память файл
+        start (int): Начало диапазона
+        end (int): Конец диапазона (не включительно)
+        
+    Returns:
+        int: Количество символов '\\n' в диапазоне
+    """
+    count = 0
+    while start < end:
+        chunk_end = min(end, start + NEWLINE_COUNT_CHUNK)
+        count += buffer[start:chunk_end].count(b"\n")
+        start = chunk_end
+    return count
 
 
 class CommandGREP:
@@ -13,6 +108,15 @@ class CommandGREP:
     - Регулярные выражения
     - Рекурсивный поиск с опцией -r
     - Поиск без учета регистра с опцией -i
+    - Параллельный поиск в пуле процессов с опцией -j <число процессов>
+    - Триграммный индекс директории: grep --index build|refresh|drop|stats <path>
+    - Вывод только имен файлов (-l), числа совпадений (-c), ограничение
+      числа совпадений в файле (-m N) и тихий режим (-q); чтение файла
+      или всего поиска прекращается, как только ответ известен
+    
+    В отличие от GNU grep, -c выводит только файлы с совпадениями (без
+    строк "файл | 0"). Кода возврата у команд оболочки нет, поэтому -q
+    вместо строк совпадений отвечает одним словом: "Найдено" или "Не найдено".
     
     Attributes:
         args (List[str]): Аргументы команды
@@ -39,7 +143,9 @@ class CommandGREP:
             current_dir (str): Текущая рабочая директория
             
         Returns:
-            str: Результаты поиска в формате "файл | номер строки | содержимое"
+            str: Результаты поиска в формате "файл | номер строки | содержимое",
+            "файл" для -l, "файл | число совпадений" для -c (только файлы с совпадениями),
+            "Найдено" или "Не найдено" для -q
             
         Raises:
             ValueError: При недостатке аргументов или ошибке в регулярном выражении
@@ -47,42 +153,60 @@ class CommandGREP:
             PermissionError: Если нет прав доступа к файлу
             IOError: При ошибках чтения файла
         """
+        if args[0] == "--index":
+            return self._command_index(action=args[1], path_arg=args[2], current_dir=current_dir)
+        
         if args[1] == None:
-            raise ValueError("Недостаточно аргументов. Использование: grep [-r] [-i] <pattern> <path>")
+            raise ValueError("Недостаточно аргументов. Использование: grep [-r] [-i] [-l|-c|-q] [-m N] [-j N] <pattern> <path>")
         
         recursive = False
         ignore_case = False
+        workers = 1
+        files_only = False
+        count_only = False
+        quiet = False
+        max_count = None
         pattern_index = 0
         path_index = 1
         
         i = 0
-        while i < len(args) and args[i].startswith('-'):
+        while i < len(args) and args[i] != None and args[i].startswith('-'):
             if args[i] == '-r':
                 recursive = True
-                pattern_index += 1
-                path_index += 1
             elif args[i] == '-i':
                 ignore_case = True
-                pattern_index += 1
-                path_index += 1
             elif args[i] == '-ri' or args[i] == '-ir':
                 recursive = True
                 ignore_case = True
-                pattern_index += 1
-                path_index += 1
+            elif args[i] == '-l':
+                files_only = True
+            elif args[i] == '-c':
+                count_only = True
+            elif args[i] == '-q':
+                quiet = True
+            elif args[i] == '-m':
+                i += 1
+                max_count = self._parse_number(args[i] if i < len(args) else None, option='-m')
+                if max_count == 0:
+                    raise ValueError("Опция -m ожидает положительное число совпадений")
+            elif args[i] == '-j':
+                i += 1
+                workers = self._parse_workers(args[i] if i < len(args) else None)
             else:
                 raise ValueError(f"Неизвестная опция {args[i]}")
             i += 1
+        pattern_index += i
+        path_index += i
         
-        if len(args) - i < 2:
-            raise ValueError("Недостаточно аргументов. Использование: grep [-r] [-i] <pattern> <path>")
+        if path_index >= len(args) or args[path_index] == None:
+            raise ValueError("Недостаточно аргументов. Использование: grep [-r] [-i] [-l|-c|-q] [-m N] [-j N] <pattern> <path>")
         
         pattern = args[pattern_index]
         path_arg = args[path_index]
         
         search_path = make_path(current_dir=current_dir, path=path_arg)
         
-        if not os.path.exists(search_path):
+        if not cached_exists(search_path):
             raise FileNotFoundError(f"Путь {search_path} не существует")
         
         flags = re.IGNORECASE if ignore_case else 0
@@ -91,57 +215,294 @@ class CommandGREP:
         except re.error as e:
             raise ValueError(f"Ошибка в регулярном выражении: {e}")
         
-        results = self._search_files(regex, search_path, recursive)
+        # Для -l и -q достаточно первого совпадения в файле, для -q - во всем поиске
+        if quiet or files_only:
+            max_count = 1
+        
+        results = self._search_files(regex, search_path, recursive, workers,
+                                     max_count=max_count, stop_at_first=quiet)
+        if quiet:
+            return "Найдено" if results else "Не найдено"
+        
         if not results:
             return "Совпадений не найдено"
         
         output = []
+        if files_only or count_only:
+            for file_path, file_results in groupby(results, key=lambda result: result[0]):
+                rel_path = os.path.relpath(file_path, current_dir)
+                if files_only:
+                    output.append(rel_path)
+                else:
+                    output.append(f"{rel_path} | {len(list(file_results))}")
+            return "\n".join(output)
+        
         for file_path, line_num, line_content in results:
             rel_path = os.path.relpath(file_path, current_dir)
             output.append(f"{rel_path} | {line_num} line | {line_content.strip()}")
         
         return "\n".join(output)
 
-    def _search_files(self, regex: re.Pattern, search_path: str, recursive: bool) -> List[tuple]:
+    def _parse_number(self, value: str, option: str) -> int:
         """
-        Рекурсивно ищет совпадения в файлах.
+        Разбирает числовое значение опции.
+        
+        Args:
+            value (str): Значение опции
+            option (str): Имя опции для сообщения об ошибке
+            
+        Returns:
+            int: Неотрицательное число
+            
+        Raises:
+            ValueError: Если значение отсутствует или не является неотрицательным числом
+        """
+        if value == None or not value.isdigit():
+            raise ValueError(f"Опция {option} ожидает неотрицательное число")
+        return int(value)
+
+    def _parse_workers(self, value: str) -> int:
+        """
+        Разбирает значение опции -j.
+        
+        Args:
+            value (str): Число процессов (0 - по числу ядер процессора)
+            
+        Returns:
+            int: Количество процессов для поиска
+            
+        Raises:
+            ValueError: Если значение отсутствует или не является неотрицательным числом
+        """
+        workers = self._parse_number(value, option='-j')
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        return workers
+
+    def _command_index(self, action: str, path_arg: str, current_dir: str) -> str:
+        """
+        Управляет триграммным индексом директории.
+        
+        Args:
+            action (str): Действие: build, refresh, drop или stats
+            path_arg (str): Индексируемая директория
+            current_dir (str): Текущая рабочая директория
+            
+        Returns:
+            str: Сообщение о результате операции
+            
+        Raises:
+            ValueError: При неизвестном действии или если путь не является директорией
+            FileNotFoundError: Если индекс для директории не построен
+        """
+        if action not in ("build", "refresh", "drop", "stats") or path_arg == None:
+            raise ValueError("Использование: grep --index build|refresh|drop|stats <path>")
+        
+        root = make_path(current_dir=current_dir, path=path_arg)
+        if not cached_isdir(root):
+            raise ValueError(f"{root} не является директорией")
+        
+        if action == "build":
+            index = TrigramIndex(root)
+            index.refresh(self._is_text_file)
+            index.save()
+            return f"Индекс построен: {len(index.files)} файлов -> {TrigramIndex.index_path(root)}"
+        
+        index = TrigramIndex.load(root)
+        if action == "refresh":
+            reindexed_before = index.stats["reindexed"]
+            index.refresh(self._is_text_file)
+            index.save()
+            return f"Индекс обновлен: переиндексировано {index.stats['reindexed'] - reindexed_before} из {len(index.files)} файлов"
+        elif action == "drop":
+            index.drop()
+            return f"Индекс удален: {TrigramIndex.index_path(root)}"
+        else:
+            return index.format_stats()
+
+    def _collect_files(self, search_path: str, recursive: bool, regex: re.Pattern = None) -> List[str]:
+        """
+        Собирает список файлов, в которых нужно выполнить поиск.
+        
+        Если для директории построен триграммный индекс, он обновляется
+        и используется для отсечения файлов, не содержащих литералов шаблона.
+        Файл индекса перезаписывается, только если изменились записи файлов;
+        иначе на диск записывается только статистика запросов.
         
         Args:
-            regex (re.Pattern): Скомпилированное регулярное выражение
             search_path (str): Путь для поиска
             recursive (bool): Флаг рекурсивного поиска
+            regex (re.Pattern): Скомпилированное регулярное выражение для отбора по индексу
             
         Returns:
-            List[tuple]: Список кортежей (путь_к_файлу, номер_строки, содержимое_строки)
+            List[str]: Пути к текстовым файлам
         """
-        results = []
+        files_to_search = []
         
-        if os.path.isfile(search_path):
-            results.extend(self._search_in_file(regex, search_path))
-        elif os.path.isdir(search_path):
-            if recursive:
+        if cached_isfile(search_path):
+            files_to_search.append(search_path)
+        elif cached_isdir(search_path):
+            if recursive and regex != None and TrigramIndex.exists(search_path):
+                index = TrigramIndex.load(search_path)
+                files_to_search = index.candidates(regex, index.refresh(self._is_text_file))
+                if index.modified:
+                    index.save()
+                else:
+                    index.save_stats()
+            elif recursive:
                 for root, dirs, files in os.walk(search_path):
                     for file in files:
                         file_path = os.path.join(root, file)
                         if self._is_text_file(file_path):
-                            results.extend(self._search_in_file(regex, file_path))
+                            files_to_search.append(file_path)
             else:
                 for item in os.listdir(search_path):
                     item_path = os.path.join(search_path, item)
-                    if os.path.isfile(item_path) and self._is_text_file(item_path):
-                        results.extend(self._search_in_file(regex, item_path))
+                    if cached_isfile(item_path) and self._is_text_file(item_path):
+                        files_to_search.append(item_path)
         else:
             raise ValueError(f"Путь {search_path} не является файлом или директорией")
         
+        return files_to_search
+
+    def _search_files(self, regex: re.Pattern, search_path: str, recursive: bool, workers: int = 1,
+                      max_count: int = None, stop_at_first: bool = False) -> List[tuple]:
+        """
+        Рекурсивно ищет совпадения в файлах.
+        
+        При workers > 1 файлы распределяются между процессами пула,
+        результат в любом случае упорядочен по пути и номеру строки.
+        
+        Args:
+            regex (re.Pattern): Скомпилированное регулярное выражение
+            search_path (str): Путь для поиска
+            recursive (bool): Флаг рекурсивного поиска
+            workers (int): Количество процессов для поиска
+            max_count (int): Максимальное число совпадений в одном файле (None - без ограничения)
+            stop_at_first (bool): Прекратить поиск после первого файла с совпадениями
+            
+        Returns:
+            List[tuple]: Список кортежей (путь_к_файлу, номер_строки, содержимое_строки)
+        """
+        files_to_search = self._collect_files(search_path, recursive, regex)
+        results = []
+        
+        if workers > 1 and len(files_to_search) > 1:
+            workers = min(workers, len(files_to_search))
+            chunksize = max(1, len(files_to_search) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                search = partial(CommandGREP._search_in_file, regex, max_count=max_count)
+                for file_results in executor.map(search, files_to_search, chunksize=chunksize):
+                    results.extend(file_results)
+                    if stop_at_first and results:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+        else:
+            for file_path in files_to_search:
+                results.extend(self._search_in_file(regex, file_path, max_count))
+                if stop_at_first and results:
+                    break
+        
+        results.sort(key=lambda result: (result[0], result[1]))
         return results
 
-    def _search_in_file(self, regex: re.Pattern, file_path: str) -> List[tuple]:
+    @staticmethod
+    def _search_in_file(regex: re.Pattern, file_path: str, max_count: int = None) -> List[tuple]:
         """
         Ищет совпадения в одном файле.
         
+        Если шаблон допускает поиск по байтам, файл отображается в память
+        и просматривается целиком, иначе читается построчно.
+        
         Args:
             regex (re.Pattern): Скомпилированное регулярное выражение
             file_path (str): Путь к файлу
+            max_count (int): Максимальное число совпадений (None - без ограничения)
+            
+        Returns:
+            List[tuple]: Список найденных совпадений в файле
+        """
+        searcher = _bytes_searcher(regex)
+        if searcher != None:
+            results = CommandGREP._search_in_mmap(regex, searcher, file_path, max_count)
+            if results != None:
+                return results
+        return CommandGREP._search_in_lines(regex, file_path, max_count)
+
+    @staticmethod
+    def _search_in_mmap(regex: re.Pattern, searcher: Tuple[str, object], file_path: str,
+                        max_count: int = None) -> Optional[List[tuple]]:
+        """
+        Ищет совпадения в файле, отображенном в память.
+        
+        Номер строки и ее границы вычисляются только для найденных
+        совпадений; каждая строка-кандидат дополнительно проверяется
+        исходным выражением, чтобы результат совпадал с построчным поиском.
+        
+        Args:
+            regex (re.Pattern): Скомпилированное регулярное выражение
+            searcher (Tuple[str, object]): Способ поиска из _bytes_searcher
+            file_path (str): Путь к файлу
+            max_count (int): Максимальное число совпадений (None - без ограничения)
+            
+        Returns:
+            Optional[List[tuple]]: Список совпадений или None, если файл
+            нельзя отобразить в память (пустой файл, не обычный файл)
+            или в нем встречаются одиночные '\\r' как разделители строк
+        """
+        kind, needle = searcher
+        results = []
+        try:
+            with open(file_path, 'rb') as f:
+                try:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    return None
+                with buffer:
+                    # Полный проход выражением нужен, только если в файле вообще есть '\r'
+                    if buffer.find(b"\r") != -1 and LONE_CARRIAGE_RETURN.search(buffer):
+                        return None
+                    size = len(buffer)
+                    position = 0
+                    line_num = 1
+                    counted_up_to = 0
+                    while position < size and (max_count == None or len(results) < max_count):
+                        if kind == "literal":
+                            match_start = buffer.find(needle, position)
+                        else:
+                            match = needle.search(buffer, position)
+                            match_start = match.start() if match else -1
+                        if match_start == -1:
+                            break
+                        
+                        line_start = buffer.rfind(b"\n", 0, match_start) + 1
+                        line_end = buffer.find(b"\n", match_start)
+                        if line_end == -1:
+                            line_end = size
+                        
+                        line_num += _count_newlines(buffer, counted_up_to, line_start)
+                        counted_up_to = line_start
+                        
+                        line = buffer[line_start:line_end].decode('utf-8', errors='ignore')
+                        if kind == "literal" or regex.search(line):
+                            results.append((file_path, line_num, line))
+                        position = line_end + 1
+        except PermissionError:
+            raise PermissionError(f"Нет прав доступа к файлу {file_path}")
+        except IOError as e:
+            raise IOError(f"Ошибка чтения файла {file_path}: {e}")
+        
+        return results
+
+    @staticmethod
+    def _search_in_lines(regex: re.Pattern, file_path: str, max_count: int = None) -> List[tuple]:
+        """
+        Построчно ищет совпадения в декодированном тексте файла.
+        
+        Args:
+            regex (re.Pattern): Скомпилированное регулярное выражение
+            file_path (str): Путь к файлу
+            max_count (int): Максимальное число совпадений (None - без ограничения)
             
         Returns:
             List[tuple]: Список найденных совпадений в файле
@@ -152,6 +513,8 @@ class CommandGREP:
                 for line_num, line in enumerate(f, 1):
                     if regex.search(line):
                         results.append((file_path, line_num, line))
+                        if max_count != None and len(results) >= max_count:
+                            break
         except PermissionError:
             raise PermissionError(f"Нет прав доступа к файлу {file_path}")
         except IOError as e:
@@ -161,7 +524,13 @@ class CommandGREP:
 
     def _is_text_file(self, file_path: str) -> bool:
         """
-        Проверяет, является ли файл текстовым по расширению.
+        Проверяет, является ли файл текстовым.
+        
+        Сначала учитываются переопределения по расширению (EXTENSION_OVERRIDES),
+        затем проверяется начало файла: наличие NUL-байтов или большой доли
+        некорректных UTF-8 последовательностей означает бинарный файл.
+        Результат кэшируется по (inode, размер, mtime), поэтому при повторном
+        поиске известные бинарные файлы не открываются.
         
         Args:
             file_path (str): Путь к файлу
@@ -169,10 +538,51 @@ class CommandGREP:
         Returns:
             bool: True если файл считается текстовым
         """
-        text_extensions = {'.txt', '.py', '.js', '.html', '.css', '.json', '.xml', 
-                          '.md', '.csv', '.log', '.conf', '.cfg', '.ini', '.sh', 
-                          '.bat', '.c', '.cpp', '.h', '.java', '.php', '.rb', 
-                          '.go', '.rs', '.ts', '.yml', '.yaml'}
+        if os.path.basename(file_path).startswith(INDEX_FILE_NAME):
+            return False
         
         _, ext = os.path.splitext(file_path)
-        return ext.lower() in text_extensions or ext == ''
\ No newline at end of file
+        override = EXTENSION_OVERRIDES.get(ext.lower())
+        if override != None:
+            return override
+        
+        try:
+            stat_info = os.stat(file_path)
+        except OSError:
+            return False
+        key = (stat_info.st_dev, stat_info.st_ino, stat_info.st_size, stat_info.st_mtime_ns)
+        cached = _text_file_cache.get(key)
+        if cached != None:
+            return cached
+        
+        is_text = self._sniff_text(file_path)
+        if len(_text_file_cache) >= TEXT_FILE_CACHE_SIZE:
+            del _text_file_cache[next(iter(_text_file_cache))]
+        _text_file_cache[key] = is_text
+        return is_text
+
+    @staticmethod
+    def _sniff_text(file_path: str) -> bool:
+        """
+        Определяет тип файла по содержимому его начала.
+        
+        Args:
+            file_path (str): Путь к файлу
+            
+        Returns:
+            bool: True если начало файла похоже на текст
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                prefix = f.read(SNIFF_SIZE)
+        except OSError:
+            return False
+        
+        if not prefix:
+            return True
+        if b"\0" in prefix:
+            return False
+        
+        # final=False: обрезанный на границе блока символ не считается ошибкой
+        decoded = codecs.getincrementaldecoder('utf-8')(errors='replace').decode(prefix, final=False)
+        return decoded.count("\ufffd") / len(prefix) <= MAX_INVALID_UTF8_RATIO
\ No newline at end of file
@@ -0,0 +1,350 @@
+import os
+import re
+import json
+from typing import Callable, Dict, List, Set
+
+from modules.valid_and_path_ops import *
+
+
+INDEX_FILE_NAME = ".grep_trigram_index"
+# Статистика хранится отдельно: она меняется при каждом поиске, а
+# перезаписывать ради нее триграммы всех файлов слишком дорого
+STATS_FILE_NAME = INDEX_FILE_NAME + ".stats"
+INDEX_VERSION = 1
+
+# Файлы больше этого размера не индексируются и всегда считаются кандидатами
+MAX_INDEXED_FILE_SIZE = 64 * 1024 * 1024
+
+# Символы, которые при re.IGNORECASE совпадают с не-ASCII символами
+# (например, 'k' и знак Кельвина), поэтому по ним нельзя отсекать файлы
+CASE_FOLD_AMBIGUOUS = set("iksIKS")
+
+
+def extract_required_literals(regex: re.Pattern) -> List[bytes]:
+    """
+    Извлекает из шаблона литеральные фрагменты, которые обязательно
+    присутствуют в любой совпадающей строке.
+
+    Разбор консервативный: учитываются только литералы верхнего уровня,
+    шаблоны с альтернативой '|' или встроенными флагами не разбираются.
+
+    Args:
+        regex (re.Pattern): Скомпилированное регулярное выражение
+
+    Returns:
+        List[bytes]: Обязательные фрагменты в нижнем регистре (длиной от 3 байт)
+    """
+    pattern = regex.pattern
+    if "|" in pattern or "(?" in pattern or regex.flags & re.VERBOSE:
+        return []
+
+    ignore_case = bool(regex.flags & re.IGNORECASE)
+    runs: List[str] = []
+    current = ""
+    depth = 0
+    i = 0
+
+    def close_run():
+        nonlocal current
+        if current:
+            runs.append(current)
+        current = ""
+
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == "\\":
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                literal = pattern[i + 1]
+            i += 2
+        elif char == "(":
+            depth += 1
+            i += 1
+        elif char == ")":
+            depth -= 1
+            i += 1
+        elif char == "[":
+            close_run()
+            i += 1
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        elif char in ".^$":
+            i += 1
+        elif char in "*?{":
+            # Предыдущий символ необязателен
+            current = current[:-1]
+            close_run()
+            if char == "{":
+                end = pattern.find("}", i)
+                i = len(pattern) if end == -1 else end + 1
+            else:
+                i += 1
+            continue
+        elif char == "+":
+            i += 1
+        else:
+            literal = char
+            i += 1
+
+        if literal != None and depth == 0 and not (ignore_case and (literal in CASE_FOLD_AMBIGUOUS or not literal.isascii())):
+            current += literal
+        else:
+            close_run()
+
+    close_run()
+    return [run.encode("utf-8").lower() for run in runs if len(run.encode("utf-8")) >= 3]
+
+
+def file_trigrams(data: bytes) -> Set[bytes]:
+    """
+    Строит множество триграмм содержимого файла без учета регистра ASCII.
+
+    Args:
+        data (bytes): Содержимое файла
+
+    Returns:
+        Set[bytes]: Множество триграмм
+    """
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+class TrigramIndex:
+    """
+    Персистентный триграммный индекс директории для ускорения grep -r.
+
+    Индекс хранится в файле .grep_trigram_index в корне индексируемой
+    директории и обновляется инкрементально: заново индексируются только
+    файлы, у которых изменились mtime или размер. Статистика использования
+    хранится рядом в .grep_trigram_index.stats и записывается после
+    каждого поиска без перезаписи самого индекса.
+
+    Attributes:
+        root (str): Индексируемая директория
+        files (Dict[str, dict]): Метаданные и триграммы файлов по относительному пути
+        stats (Dict[str, int]): Накопленная статистика использования индекса
+        modified (bool): Изменились ли записи файлов после загрузки или сохранения
+    """
+
+    def __init__(self, root: str):
+        """
+        Инициализация пустого индекса.
+
+        Args:
+            root (str): Индексируемая директория
+        """
+        self.root = root
+        self.files: Dict[str, dict] = {}
+        self.stats: Dict[str, int] = {
+            "queries": 0,
+            "fresh": 0,
+            "reindexed": 0,
+            "candidates": 0,
+            "pruned": 0,
+        }
+        self.modified = False
+
+    @staticmethod
+    def index_path(root: str) -> str:
+        return os.path.join(root, INDEX_FILE_NAME)
+
+    @staticmethod
+    def stats_path(root: str) -> str:
+        return os.path.join(root, STATS_FILE_NAME)
+
+    @staticmethod
+    def exists(root: str) -> bool:
+        return os.path.isfile(TrigramIndex.index_path(root))
+
+    @classmethod
+    def load(cls, root: str) -> "TrigramIndex":
+        """
+        Загружает индекс директории с диска.
+
+        Args:
+            root (str): Индексируемая директория
+
+        Returns:
+            TrigramIndex: Загруженный индекс (пустой, если файл индекса устарел)
+
+        Raises:
+            FileNotFoundError: Если индекс для директории не построен
+        """
+        index = cls(root)
+        path = cls.index_path(root)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Индекс для {root} не построен (grep --index build <path>)")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Ошибка чтения индекса {path}: {e}")
+            return index
+        if data.get("version") != INDEX_VERSION:
+            return index
+        index.files = data.get("files", {})
+        index.stats.update(data.get("stats", {}))
+        try:
+            with open(cls.stats_path(root), "r", encoding="utf-8") as f:
+                index.stats.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.error(f"Ошибка чтения статистики индекса {cls.stats_path(root)}: {e}")
+        return index
+
+    def save(self):
+        """
+        Атомарно записывает индекс и его статистику на диск.
+        """
+        path = self.index_path(self.root)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, f)
+        os.replace(tmp_path, path)
+        self.modified = False
+        self.save_stats()
+
+    def save_stats(self):
+        """
+        Атомарно записывает только статистику индекса.
+        """
+        path = self.stats_path(self.root)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.stats, f)
+        os.replace(tmp_path, path)
+
+    def drop(self):
+        """
+        Удаляет файл индекса и его статистику.
+        """
+        os.remove(self.index_path(self.root))
+        if os.path.exists(self.stats_path(self.root)):
+            os.remove(self.stats_path(self.root))
+
+    def refresh(self, is_text_file: Callable[[str], bool]) -> List[str]:
+        """
+        Сверяет индекс с деревом файлов и переиндексирует изменившиеся файлы.
+
+        Args:
+            is_text_file (Callable[[str], bool]): Фильтр файлов, в которых ищет grep
+
+        Returns:
+            List[str]: Абсолютные пути всех текущих файлов дерева
+        """
+        current: Dict[str, dict] = {}
+        paths: List[str] = []
+        for root, dirs, files in os.walk(self.root):
+            for file in files:
+                if root == self.root and file.startswith(INDEX_FILE_NAME):
+                    continue
+                file_path = os.path.join(root, file)
+                if not is_text_file(file_path):
+                    continue
+                try:
+                    stat_info = os.stat(file_path)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(file_path, self.root)
+                paths.append(file_path)
+
+                entry = self.files.get(rel_path)
+                if entry and entry["mtime"] == stat_info.st_mtime_ns and entry["size"] == stat_info.st_size:
+                    self.stats["fresh"] += 1
+                    current[rel_path] = entry
+                    continue
+
+                self.stats["reindexed"] += 1
+                self.modified = True
+                current[rel_path] = self._index_file(file_path, stat_info)
+
+        if current.keys() != self.files.keys():
+            self.modified = True
+        self.files = current
+        return paths
+
+    def _index_file(self, file_path: str, stat_info: os.stat_result) -> dict:
+        """
+        Строит запись индекса для одного файла.
+
+        Args:
+            file_path (str): Путь к файлу
+            stat_info (os.stat_result): Метаданные файла
+
+        Returns:
+            dict: Запись с mtime, размером и упакованными триграммами
+        """
+        entry = {"mtime": stat_info.st_mtime_ns, "size": stat_info.st_size, "trigrams": None}
+        if stat_info.st_size > MAX_INDEXED_FILE_SIZE:
+            return entry
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return entry
+        # Триграммы хранятся одной latin-1 строкой по 3 символа на триграмму
+        entry["trigrams"] = b"".join(sorted(file_trigrams(data))).decode("latin-1")
+        return entry
+
+    def candidates(self, regex: re.Pattern, paths: List[str]) -> List[str]:
+        """
+        Отбирает файлы, которые могут содержать совпадения с шаблоном.
+
+        Args:
+            regex (re.Pattern): Скомпилированное регулярное выражение
+            paths (List[str]): Пути файлов, полученные из refresh
+
+        Returns:
+            List[str]: Пути файлов-кандидатов
+        """
+        self.stats["queries"] += 1
+        required: Set[bytes] = set()
+        for literal in extract_required_literals(regex):
+            required |= file_trigrams(literal)
+
+        if not required:
+            self.stats["candidates"] += len(paths)
+            return paths
+
+        result = []
+        for file_path in paths:
+            entry = self.files.get(os.path.relpath(file_path, self.root))
+            packed = entry["trigrams"] if entry else None
+            if packed == None:
+                result.append(file_path)
+                continue
+            raw = packed.encode("latin-1")
+            trigrams = {raw[i:i + 3] for i in range(0, len(raw), 3)}
+            if required <= trigrams:
+                result.append(file_path)
+
+        self.stats["candidates"] += len(result)
+        self.stats["pruned"] += len(paths) - len(result)
+        return result
+
+    def format_stats(self) -> str:
+        """
+        Форматирует статистику индекса для вывода в консоль.
+
+        Returns:
+            str: Статистика индекса
+        """
+        checked = self.stats["fresh"] + self.stats["reindexed"]
+        hit_rate = self.stats["fresh"] / checked * 100 if checked else 0.0
+        considered = self.stats["candidates"] + self.stats["pruned"]
+        pruned_rate = self.stats["pruned"] / considered * 100 if considered else 0.0
+        return "\n".join([
+            f"Индекс: {self.index_path(self.root)}",
+            f"Файлов в индексе: {len(self.files)}",
+            f"Запросов: {self.stats['queries']}",
+            f"Попаданий в индекс: {self.stats['fresh']} из {checked} ({hit_rate:.1f}%)",
+            f"Переиндексировано файлов: {self.stats['reindexed']}",
+            f"Кандидатов: {self.stats['candidates']}, отсечено: {self.stats['pruned']} ({pruned_rate:.1f}%)",
+        ])
@@ -1,5 +1,15 @@
 import os
 import stat
+import heapq
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import pwd
+    import grp
+except ImportError:  # Windows
+    pwd = None
+    grp = None
 
 
 from typing import *
@@ -8,6 +18,101 @@ from modules.valid_and_path_ops import *
 from datetime import datetime
 
 
+@lru_cache(maxsize=None)
+def user_name(uid: int) -> str:
+    """
+    Возвращает имя пользователя по uid (или сам uid, если имя неизвестно).
+    """
+    if pwd == None:
+        return str(uid)
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+@lru_cache(maxsize=None)
+def group_name(gid: int) -> str:
+    """
+    Возвращает имя группы по gid (или сам gid, если имя неизвестно).
+    """
+    if grp == None:
+        return str(gid)
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+
+def get_file_type(mode: int) -> str:
+    if stat.S_ISDIR(mode):
+        return 'd'
+    elif stat.S_ISREG(mode):
+        return '-'
+    elif stat.S_ISLNK(mode):
+        return 'l'
+    else:
+        return '?'
+
+
+def get_permissions(mode: int) -> str:
+    # stat.filemode возвращает строку вида "drwxr-xr-x", первый символ - тип
+    return stat.filemode(mode)[1:]
+
+
+def entry_sort_key(sort_by: Optional[str]) -> Callable[[os.DirEntry], tuple]:
+    """
+    Возвращает ключ сортировки объектов директории.
+    
+    Args:
+        sort_by (Optional[str]): "size" (-S), "mtime" (-t) или None (по имени)
+        
+    Returns:
+        Callable[[os.DirEntry], tuple]: Ключ, упорядочивающий по убыванию
+        размера/времени изменения с именем в качестве второго критерия
+    """
+    def metadata(entry: os.DirEntry) -> Optional[os.stat_result]:
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
+    
+    if sort_by == "size":
+        def key(entry):
+            stat_info = metadata(entry)
+            return (-(stat_info.st_size if stat_info else 0), entry.name)
+    elif sort_by == "mtime":
+        def key(entry):
+            stat_info = metadata(entry)
+            return (-(stat_info.st_mtime_ns if stat_info else 0), entry.name)
+    else:
+        def key(entry):
+            return (entry.name,)
+    return key
+
+
+def order_entries(entries: Iterable[os.DirEntry], sort_by: Optional[str] = None, limit: Optional[int] = None) -> List[os.DirEntry]:
+    """
+    Упорядочивает объекты директории и оставляет первые limit из них.
+    
+    При заданном limit используется ограниченная куча (heapq.nsmallest),
+    поэтому итератор os.scandir просматривается потоково и в памяти
+    хранится не более limit объектов, а не весь список директории.
+    
+    Args:
+        entries (Iterable[os.DirEntry]): Объекты директории (например, итератор os.scandir)
+        sort_by (Optional[str]): "size", "mtime" или None (по имени)
+        limit (Optional[int]): Максимальное число объектов (None - без ограничения)
+        
+    Returns:
+        List[os.DirEntry]: Упорядоченные объекты
+    """
+    key = entry_sort_key(sort_by)
+    if limit != None:
+        return heapq.nsmallest(limit, entries, key=key)
+    return sorted(entries, key=key)
+
+
 class CommandLS:
     """
     Класс для реализации команды LS (list) - вывода содержимого директории.
@@ -16,6 +121,16 @@ class CommandLS:
     - Простой вывод списка файлов
     - Детальный вывод с правами доступа и метаданными с опцией -l
     - Цветовое выделение директорий
+    - Сортировка по размеру (-S) или времени изменения (-t) и вывод первых
+      N объектов (--limit N) без загрузки всего списка директории
+    - Рекурсивный вывод с опцией -R (в том числе вместе с -l): поддиректории
+      сканируются параллельно в пуле потоков, а блок каждой директории
+      выводится сразу, как только он готов, в детерминированном порядке
+    - Вывод счетчиков общего кэша метаданных командой ls --cache-stats
+    
+    Содержимое директории читается через os.scandir: тип объекта берется
+    из DirEntry без дополнительных системных вызовов, а stat выполняется
+    не более одного раза на объект.
     
     Attributes:
         args (List[str]): Аргументы команды
@@ -34,80 +149,184 @@ class CommandLS:
         self.current_dir = current_dir
 
     
-    def ls_with_rights(self, path:str, current_dir: str):
+    def format_long_entry(self, entry: os.DirEntry) -> str:
+        """
+        Форматирует один объект директории в формате ls -l.
+        
+        Args:
+            entry (os.DirEntry): Объект директории
+            
+        Returns:
+            str: Строка с типом, правами, владельцем, размером, датой и именем
+        """
+        item = entry.name
+        try:
+            stat_info = entry.stat(follow_symlinks=False)
+            
+            file_type = get_file_type(stat_info.st_mode)
+            permissions = get_permissions(stat_info.st_mode)
+            nlink = stat_info.st_nlink
+            size = stat_info.st_size
+            mtime = datetime.fromtimestamp(stat_info.st_mtime).strftime("%b %d %H:%M")
+            
+            # Для симлинков
+            display_name = item
+            if file_type == 'l':
+                try:
+                    target = os.readlink(entry.path)
+                    display_name = f"{item} -> {target}"
+                except OSError:
+                    display_name = f"{item} -> [broken]"
+            
+            return f"{file_type}{permissions} {nlink:>2} {user_name(stat_info.st_uid):>8} {group_name(stat_info.st_gid):>8} {size:>8} {mtime} {display_name}"
+            
+        except PermissionError:
+            return f"?????????? ? ? ? ? ? ??? ?? ???? {item} (Permission denied)"
+        except OSError as e:
+            return f"?????????? ? ? ? ? ? ??? ?? ???? {item} (Error: {e})"
+
+    def ls_with_rights(self, path:str, current_dir: str, sort_by: str = None, limit: int = None):
         """
         Выводит содержимое директории с детальной информацией о правах доступа.
         
         Args:
             path (str): Путь к директории
             current_dir (str): Текущая рабочая директория
+            sort_by (str): "size", "mtime" или None (по имени)
+            limit (int): Максимальное число выводимых объектов
             
         Returns:
             str: Форматированный вывод с правами доступа и метаданными
         """
         directory = make_path(current_dir=current_dir, path=path)
-    
-        def get_file_type(mode):
-            if stat.S_ISDIR(mode):
-                return 'd'
-            elif stat.S_ISREG(mode):
-                return '-'
-            elif stat.S_ISLNK(mode):
-                return 'l'
-            else:
-                return '?'
-        
-        def get_permissions(mode):
-            perm_str = ''
-            for type in "USR", "GRP", "OTH":
-                for perms in "R", "W", "X":
-                    if mode & getattr(stat, f"S_I{perms}{type}"):
-                        perm_str += perms.lower()
-                    else:
-                        perm_str += '-'
-            return perm_str
         
         try:
-            items = os.listdir(directory)
-            items.sort()
+            with os.scandir(directory) as entries:
+                items = order_entries(entries, sort_by=sort_by, limit=limit)
             
-            result = []
-            for item in items:
-                item_path = os.path.join(directory, item)
-                
-                try:
-                    stat_info = os.stat(item_path)
-                    
-                    file_type = get_file_type(stat_info.st_mode)
-                    permissions = get_permissions(stat_info.st_mode)
-                    nlink = stat_info.st_nlink
-                    size = stat_info.st_size
-                    mtime = datetime.fromtimestamp(stat_info.st_mtime).strftime("%b %d %H:%M")
-                    
-                    # Для симлинков
-                    display_name = item
-                    if file_type == 'l':
-                        try:
-                            target = os.readlink(item_path)
-                            display_name = f"{item} -> {target}"
-                        except OSError:
-                            display_name = f"{item} -> [broken]"
-                    
-                    line = f"{file_type}{permissions} {nlink:>2} {stat_info.st_uid:>5} {stat_info.st_gid:>5} {size:>8} {mtime} {display_name}"
-                    result.append(line)
-                    
-                except PermissionError:
-                    result.append(f"?????????? ? ? ? ? ? ??? ?? ???? {item} (Permission denied)")
-                except OSError as e:
-                    result.append(f"?????????? ? ? ? ? ? ??? ?? ???? {item} (Error: {e})")
-            
-            return "\n".join(result)
+            return "\n".join(self.format_long_entry(entry) for entry in items)
             
         except Exception as e:
             return f"Error: {e}"
 
         
     
+    def _scan_block(self, directory: str, current_dir: str, long_format: bool,
+                    sort_by: str = None, limit: int = None) -> Tuple[str, List[str]]:
+        """
+        Сканирует одну директорию для рекурсивного вывода.
+        
+        Args:
+            directory (str): Путь к директории
+            current_dir (str): Текущая рабочая директория (для заголовка блока)
+            long_format (bool): Выводить объекты в формате ls -l
+            sort_by (str): "size", "mtime" или None (по имени)
+            limit (int): Максимальное число выводимых объектов директории
+            
+        Returns:
+            Tuple[str, List[str]]: Блок вывода директории и пути ее поддиректорий
+        """
+        header = f"{os.path.relpath(directory, current_dir)}:"
+        try:
+            with os.scandir(directory) as entries:
+                items = sorted(entries, key=lambda entry: entry.name)
+        except OSError as e:
+            return f"{header}\nError: {e}", []
+        
+        shown = items
+        if sort_by != None or limit != None:
+            shown = order_entries(items, sort_by=sort_by, limit=limit)
+        if long_format:
+            listing = "\n".join(self.format_long_entry(entry) for entry in shown)
+        else:
+            listing = "  ".join(colorize_entries(shown))
+        # Симлинки на директории не раскрываются, чтобы избежать циклов
+        subdirs = [entry.path for entry in items if entry.is_dir(follow_symlinks=False)]
+        return f"{header}\n{listing}", subdirs
+
+    def ls_recursive(self, path: str, current_dir: str, long_format: bool, workers: int = None,
+                     sort_by: str = None, limit: int = None) -> str:
+        """
+        Рекурсивно выводит содержимое директории и всех поддиректорий.
+        
+        Каждая поддиректория сканируется в пуле потоков сразу после того,
+        как просканирован ее родитель. Блоки печатаются по мере готовности
+        в порядке обхода в глубину с сортировкой по имени, поэтому вывод
+        не зависит от того, в каком порядке потоки завершили работу.
+        
+        Args:
+            path (str): Путь к директории
+            current_dir (str): Текущая рабочая директория
+            long_format (bool): Выводить объекты в формате ls -l
+            workers (int): Количество потоков (None - значение по умолчанию ThreadPoolExecutor)
+            sort_by (str): "size", "mtime" или None (по имени)
+            limit (int): Максимальное число выводимых объектов в каждой директории
+            
+        Returns:
+            str: Пустая строка (вывод печатается по мере сканирования)
+            
+        Raises:
+            FileNotFoundError: Если директория не существует
+            ValueError: Если путь не является директорией
+        """
+        root = make_path(current_dir, path)
+        if not cached_exists(root):
+            raise FileNotFoundError(f"Несуществующая директория {root}")
+        elif not cached_isdir(root):
+            raise ValueError(f"{root} не является директорией")
+        
+        futures: Dict[str, Future] = {}
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            def scan(directory: str) -> Tuple[str, List[str]]:
+                block, subdirs = self._scan_block(directory, current_dir, long_format, sort_by, limit)
+                # Поддиректории ставятся в очередь до того, как результат
+                # родителя станет доступен, поэтому при выводе они уже известны
+                for subdir in subdirs:
+                    futures[subdir] = executor.submit(scan, subdir)
+                return block, subdirs
+            
+            futures[root] = executor.submit(scan, root)
+            stack = [root]
+            first = True
+            while stack:
+                directory = stack.pop()
+                block, subdirs = futures.pop(directory).result()
+                print(block if first else f"\n{block}")
+                logging.info(block)
+                first = False
+                stack.extend(reversed(subdirs))
+        
+        return ""
+
+    def scan_directory(self, path: str, current_dir: str, sort_by: str = None, limit: int = None) -> List[os.DirEntry]:
+        """
+        Читает содержимое директории через os.scandir.
+        
+        Args:
+            path (str): Путь к директории
+            current_dir (str): Текущая рабочая директория
+            sort_by (str): "size", "mtime" или None (порядок файловой системы)
+            limit (int): Максимальное число объектов
+            
+        Returns:
+            List[os.DirEntry]: Объекты директории с кэшированными метаданными
+            
+        Raises:
+            FileNotFoundError: Если директория не существует
+            ValueError: Если путь не является директорией
+        """
+        res_path = make_path(current_dir, path)
+        try:
+            with os.scandir(res_path) as entries:
+                if sort_by == None and limit == None:
+                    return list(entries)
+                return order_entries(entries, sort_by=sort_by, limit=limit)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Несуществующая директория {res_path}")
+        except NotADirectoryError:
+            raise ValueError(f"{res_path} не является директорией")
+
     def ls_without_rgihts(self, path: str, current_dir: str):
         """
         Выводит простое содержимое директории без детальной информации.
@@ -123,16 +342,7 @@ class CommandLS:
             FileNotFoundError: Если директория не существует
             ValueError: Если путь не является директорией
         """
-        if path == None:
-            return os.listdir(current_dir)
-        else:
-            res_path = make_path(current_dir, path)
-            if not os.path.exists(res_path):
-                raise FileNotFoundError(f"Несуществующая директория {res_path}")
-            elif not os.path.isdir(res_path):
-                raise ValueError(f"{res_path} не является директорией")
-            else:
-                return os.listdir(res_path)
+        return [entry.name for entry in self.scan_directory(path=path, current_dir=current_dir)]
             
 
 
@@ -146,13 +356,48 @@ class CommandLS:
         Returns:
             str: Результат выполнения команды
         """
+        if len(args) > 0 and args[0] == "--cache-stats":
+            return metadata_cache.format_stats()
+        
         str = ""
-        if args[0] == "-l":
-            return self.ls_with_rights(path=args[1], current_dir=self.current_dir)
+        long_format = False
+        recursive = False
+        sort_by = None
+        limit = None
+        
+        i = 0
+        while i < len(args) and args[i] != None and args[i].startswith('-'):
+            if args[i] == '--limit':
+                i += 1
+                if i >= len(args) or args[i] == None or not args[i].isdigit():
+                    raise ValueError("Опция --limit ожидает неотрицательное число")
+                limit = int(args[i])
+            elif args[i].startswith('--') or len(args[i]) < 2:
+                raise ValueError(f"Неизвестная опция {args[i]}")
+            else:
+                # Короткие опции можно объединять: -lR, -lS, -ltR
+                for option in args[i][1:]:
+                    if option == 'l':
+                        long_format = True
+                    elif option == 'R':
+                        recursive = True
+                    elif option == 'S':
+                        sort_by = "size"
+                    elif option == 't':
+                        sort_by = "mtime"
+                    else:
+                        raise ValueError(f"Неизвестная опция {args[i]}")
+            i += 1
+        path = args[i] if i < len(args) else None
+        
+        if recursive:
+            return self.ls_recursive(path=path, current_dir=self.current_dir, long_format=long_format,
+                                     sort_by=sort_by, limit=limit)
+        elif long_format:
+            return self.ls_with_rights(path=path, current_dir=self.current_dir, sort_by=sort_by, limit=limit)
         else:
-            dir_path = make_path(self.current_dir, args[0])
-            output = self.ls_without_rgihts(path=args[0],current_dir=self.current_dir)
-            for obj_dir in colorize_dirs(output, dir_path):
+            entries = self.scan_directory(path=path, current_dir=self.current_dir, sort_by=sort_by, limit=limit)
+            for obj_dir in colorize_entries(entries):
                 str += f"{obj_dir}  "
-            logging.info(output)
+            logging.info([entry.name for entry in entries])
             return str
\ No newline at end of file
@@ -1,14 +1,30 @@
 import os
+import sys
+import time
+import errno
+import threading
 from typing import *
 
 from modules.valid_and_path_ops import *
-import shutil
+from modules.copy_engine import CopyStats, move_across_devices
+
+
+# Минимальный интервал между выводами прогресса копирования (секунды)
+PROGRESS_INTERVAL = 0.2
 
 
 class CommandMV:
     """
     Класс для реализации команды MV (move) - перемещения файлов и директорий.
     
+    Перемещение выполняется атомарным os.rename относительно дескриптора
+    директории назначения (он открывается один раз на все операнды). Если
+    источник находится на другой файловой системе (EXDEV), объект
+    копируется параллельно, копия сверяется с источником, и только затем
+    источник удаляется. Прогресс такого копирования выводится одной
+    обновляемой строкой, только если вывод идет в терминал; итоговые
+    счетчики входят в возвращаемое сообщение.
+    
     Attributes:
         args (List[str]): Аргументы команды
         current_dir (str): Текущая рабочая директория
@@ -25,9 +41,78 @@ class CommandMV:
         self.args = command[1:]
         self.current_dir = current_dir
 
+    @staticmethod
+    def progress_printer() -> Optional[Callable[[CopyStats], None]]:
+        """
+        Создает обработчик прогресса копирования, который не чаще
+        PROGRESS_INTERVAL секунд выводит число файлов и объем.
+        
+        Returns:
+            Optional[Callable[[CopyStats], None]]: Обработчик для ParallelCopier
+            или None, если стандартный вывод не является терминалом
+        """
+        if not sys.stdout.isatty():
+            return None
+        lock = threading.Lock()
+        last_report = [0.0]
+
+        def report(stats: CopyStats):
+            now = time.monotonic()
+            with lock:
+                if now - last_report[0] < PROGRESS_INTERVAL:
+                    return
+                last_report[0] = now
+                print(f"\rСкопировано файлов: {stats.files}, {stats.bytes / (1024 * 1024):.2f} МБ", end="", flush=True)
+
+        return report
+
+    def move_one(self, from_path: str, to_path: str, dir_fd: int) -> str:
+        """
+        Перемещает один объект в директорию назначения.
+        
+        Args:
+            from_path (str): Абсолютный путь источника
+            to_path (str): Абсолютный путь директории назначения
+            dir_fd (int): Дескриптор директории назначения
+            
+        Returns:
+            str: Сообщение о результате перемещения
+            
+        Raises:
+            FileNotFoundError: Если исходный путь не существует
+            FileExistsError: Если в назначении уже есть объект с таким именем
+            ValueError: Если директория перемещается сама в себя
+        """
+        if not cached_exists(from_path):
+            raise FileNotFoundError(f"Пути {from_path} не существует")
+        name = os.path.basename(from_path.rstrip('/'))
+        target = os.path.join(to_path, name)
+        if os.path.lexists(target):
+            raise FileExistsError(f"{target} уже существует")
+        source = os.path.realpath(from_path)
+        if os.path.realpath(to_path) == source or os.path.realpath(to_path).startswith(source + os.sep):
+            raise ValueError(f"Нельзя переместить {from_path} внутрь самой себя")
+
+        try:
+            os.rename(from_path, name, dst_dir_fd=dir_fd)
+            message = f"Файл перемещен: {from_path} -> {to_path}"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            progress = self.progress_printer()
+            stats = move_across_devices(from_path, target, progress=progress)
+            if progress != None:
+                # Стираем строку прогресса: итог войдет в сообщение команды
+                print("\r\033[K", end="", flush=True)
+            message = f"Файл перемещен между файловыми системами: {from_path} -> {to_path}\n{stats.summary()}"
+        invalidate_path(from_path, recursive=True)
+        invalidate_path(target, recursive=True)
+        return message
+
     def command_mv(self, args: List[str], current_dir: str):
         """
-        Выполняет перемещение файла или директории.
+        Выполняет перемещение файлов или директорий в директорию назначения.
+        Использование: mv <source> [<source> ...] <directory>
         
         Args:
             args (List[str]): Аргументы команды
@@ -37,20 +122,30 @@ class CommandMV:
             str: Сообщение о результате перемещения
             
         Raises:
-            FileNotFoundError: Если исходный путь не существует
-            PermissionError: Если нет прав доступа
+            ValueError: При недостатке аргументов
         """
-        from_path = make_path(current_dir=current_dir, path=args[0])
-        to_path = make_path(current_dir=current_dir, path=args[1])
+        operands = [arg for arg in args if arg != None]
+        if len(operands) < 2:
+            raise ValueError("Недостаточно аргументов. Использование: mv <source> [<source> ...] <directory>")
+        to_path = make_path(current_dir=current_dir, path=operands[-1])
         try:
-            if not os.path.exists(from_path):
-                raise FileNotFoundError(f"Пути {from_path} не существует")
-            else:
-                os.makedirs(to_path, exist_ok=True)
-
-                shutil.move(from_path, to_path)
-                return f"Файл перемещен: {from_path} -> {to_path}"
+            os.makedirs(to_path, exist_ok=True)
+            dir_fd = os.open(to_path, os.O_RDONLY | os.O_DIRECTORY)
         except PermissionError:
             return f"Ошибка: Нет прав доступа"
         except Exception as e:
-            return f"Ошибка при перемещении: {e}"
\ No newline at end of file
+            return f"Ошибка при перемещении: {e}"
+
+        results = []
+        try:
+            for source in operands[:-1]:
+                from_path = make_path(current_dir=current_dir, path=source)
+                try:
+                    results.append(self.move_one(from_path, to_path, dir_fd))
+                except PermissionError:
+                    results.append(f"Ошибка: Нет прав доступа")
+                except Exception as e:
+                    results.append(f"Ошибка при перемещении: {e}")
+        finally:
+            os.close(dir_fd)
+        return "\n".join(results)
@@ -1,6 +1,7 @@
 import os
 from typing import *
 from modules.valid_and_path_ops import *
+from modules.trash import trash_purger
 import shutil
 
 
@@ -11,6 +12,9 @@ class CommandRM:
     Поддерживает:
     - Удаление файлов
     - Рекурсивное удаление директорий с опцией -r
+    - Мгновенное удаление с опцией --trash: директория переименовывается
+      в корзину, а удаляется фоновым потоком
+    - Вывод состояния фоновой очистки: rm --status
     
     Attributes:
         args (List[str]): Аргументы команды
@@ -44,6 +48,11 @@ class CommandRM:
             FileNotFoundError: Если путь не существует
             ValueError: При попытке удалить директорию без опции -r
         """
+        if args[0] == "--status":
+            return trash_purger.format_status()
+        use_trash = "--trash" in args
+        args = [arg for arg in args if arg != "--trash"]
+
         path_to_remove: str
         if args[0] == "-r":
             path_to_remove = args[1]
@@ -55,8 +64,13 @@ class CommandRM:
                 ans = input("Ваш ответ: ")
                 if ans == "Y":
                     try:
-                        if os.path.exists(path):
+                        if cached_exists(path) and use_trash:
+                            if trash_purger.move_to_trash(path) == None:
+                                return f"Директория '{path}' и все её содержимое удалены (корзина на этой файловой системе недоступна)"
+                            return f"Директория '{path}' перемещена в корзину и будет удалена в фоне (rm --status)"
+                        elif cached_exists(path):
                             shutil.rmtree(path)
+                            invalidate_path(path, recursive=True)
                             return f"Директория '{path}' и все её содержимое удалены"
                             
                         else:
@@ -71,13 +85,14 @@ class CommandRM:
         else:
             path_to_remove = args[0]
             path = make_path(path=path_to_remove, current_dir=self.args)  # ОШИБКА 3 <- перепутанные аргументы
-            if os.path.isdir(path):
+            if cached_isdir(path):
                 raise ValueError(f"{path} является директорией(используйте ключ -r для рекурсивного удаления директории и ее содержимого)")
 
 
-            elif not os.path.exists(path=path):
+            elif not cached_exists(path=path):
                 raise FileNotFoundError(f"Пути {path} не существует")
 
             else:
                 os.remove(path)
+                invalidate_path(path)
                 return f"Файл {path} успешно удален"
\ No newline at end of file
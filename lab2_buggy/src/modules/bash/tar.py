@@ -1,13 +1,246 @@
+import io
 import os
+import sys
+import json
+import copy
 import tarfile
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from modules.valid_and_path_ops import *
+from modules.copy_engine import data_extents, is_sparse
+from modules.parallel_gzip import ParallelGzipWriter
+from modules.readahead import ReadAheadPipeline, StageTimings
+from modules.tar_index import CHECKPOINT_INTERVAL, TarIndex, member_matches
+from modules.compression_policy import TAR_CODECS, benchmark_codecs, choose_stream_level, tar_archive_path
+from modules.tar_snapshot import INCREMENTAL_META_NAME, SnapshotManifest, apply_deletions, incremental_meta_member
+
+
+# Количество записей карты дыр в основном заголовке и в блоке расширения (старый GNU sparse)
+SPARSE_HEADER_ENTRIES = 4
+SPARSE_EXTENSION_ENTRIES = 21
+
+# Режимы потокового чтения tarfile по типу, определенному по сигнатуре
+STREAM_MODES = {"gzip": 'r|gz', "bz2": 'r|bz2', "xz": 'r|xz', "tar": 'r|'}
+
+
+def _sparse_map(extents: List[Tuple[int, int]], start: int, count: int) -> bytes:
+    """
+    Кодирует участок карты дыр: пары (смещение, длина) по 12 байт.
+    """
+    result = b""
+    for offset, length in extents[start:start + count]:
+        result += tarfile.itn(offset, 12, tarfile.GNU_FORMAT) + tarfile.itn(length, 12, tarfile.GNU_FORMAT)
+    return result.ljust(count * 24, tarfile.NUL)
+
+
+def restore_directory_attributes(tar: tarfile.TarFile, directories: List[tarfile.TarInfo], destination: str):
+    """
+    Восстанавливает владельца, время изменения и права распакованных
+    директорий, как это делает TarFile.extractall: после распаковки всех
+    элементов и от вложенных директорий к родительским. Иначе запись файлов
+    сбросила бы время изменения директории, а директория без права записи
+    не дала бы распаковать свое содержимое.
+
+    Args:
+        tar (tarfile.TarFile): Архив, из которого распакованы директории
+        directories (List[tarfile.TarInfo]): Элементы-директории, распакованные без атрибутов
+        destination (str): Директория назначения
+    """
+    for tarinfo in sorted(directories, key=lambda member: member.name, reverse=True):
+        dir_path = os.path.join(destination, tarinfo.name)
+        try:
+            tar.chown(tarinfo, dir_path, numeric_owner=False)
+            tar.utime(tarinfo, dir_path)
+            tar.chmod(tarinfo, dir_path)
+        except tarfile.ExtractError as e:
+            logging.warning(f"Не удалось восстановить атрибуты {dir_path}: {e}")
+
+
+class SparseTarFile(tarfile.TarFile):
+    """
+    TarFile, сохраняющий разреженные файлы как sparse-элементы (формат GNU 'S').
+
+    В архив записываются только участки с данными, найденные через
+    SEEK_DATA/SEEK_HOLE, и карта дыр; tarfile и GNU tar восстанавливают
+    дыры при распаковке. Остальные элементы пишутся стандартным образом.
+    
+    add_tree добавляет дерево, как add, но содержимое файлов заранее
+    читается потоками ReadAheadPipeline, пока архив сжимает предыдущие;
+    набором select можно ограничить добавляемые имена (инкрементальный архив).
+    """
+
+    def addfile(self, tarinfo: tarfile.TarInfo, fileobj=None):
+        # TarFile не запоминает смещения элементов при записи; они нужны для индекса
+        offset = self.offset
+        self._addfile(tarinfo, fileobj)
+        self.members[-1].offset = offset
+
+    def _addfile(self, tarinfo: tarfile.TarInfo, fileobj=None):
+        if fileobj != None and tarinfo.isreg() and not isinstance(fileobj, io.BytesIO):
+            stat_info = os.fstat(fileobj.fileno())
+            if is_sparse(stat_info):
+                extents = data_extents(fileobj.fileno(), tarinfo.size)
+                if extents != None:
+                    try:
+                        self._add_sparse(tarinfo, fileobj, extents)
+                        return
+                    except ValueError:
+                        # Поля заголовка не помещаются в формат GNU
+                        pass
+        super().addfile(tarinfo, fileobj)
+
+    def _tree_order(self, path: str, arcname: str) -> Iterator[Tuple[str, str]]:
+        """
+        Обходит дерево в том же порядке, что и TarFile.add.
+
+        Args:
+            path (str): Путь к объекту
+            arcname (str): Имя объекта в архиве
+
+        Yields:
+            Tuple[str, str]: Путь и имя в архиве
+        """
+        if self.name != None and os.path.abspath(path) == self.name:
+            return
+        yield path, arcname
+        if os.path.isdir(path) and not os.path.islink(path):
+            for name in sorted(os.listdir(path)):
+                yield from self._tree_order(os.path.join(path, name), os.path.join(arcname, name))
+
+    def add_tree(self, path: str, arcname: str, readers: int = 2,
+                 select: Optional[Set[str]] = None) -> StageTimings:
+        """
+        Добавляет дерево в архив с упреждающим чтением файлов.
+
+        Args:
+            path (str): Добавляемая директория
+            arcname (str): Имя директории в архиве
+            readers (int): Количество потоков-читателей
+            select (Optional[Set[str]]): Добавляемые имена в архиве (None - все)
+
+        Returns:
+            StageTimings: Время стадий чтения и архивации
+        """
+        entries = [(entry_path, entry_arcname) for entry_path, entry_arcname in self._tree_order(path, arcname)
+                   if select == None or entry_arcname in select]
+        # Заранее читаются обычные файлы; повторные имена жестких ссылок
+        # попадут в архив link-элементами без содержимого
+        seen_inodes = set()
+        prefetch = []
+        for entry_path, entry_arcname in entries:
+            try:
+                stat_info = os.lstat(entry_path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(stat_info.st_mode):
+                continue
+            if stat_info.st_nlink > 1:
+                if (stat_info.st_dev, stat_info.st_ino) in seen_inodes:
+                    continue
+                seen_inodes.add((stat_info.st_dev, stat_info.st_ino))
+            prefetch.append(entry_path)
+
+        pipeline = ReadAheadPipeline(prefetch, readers=readers)
+        prefetched = iter(pipeline)
+        next_prefetched = next(prefetched, None)
+        for entry_path, entry_arcname in entries:
+            data = None
+            if next_prefetched != None and next_prefetched[0] == entry_path:
+                data = next_prefetched[1]
+                next_prefetched = next(prefetched, None)
+
+            tarinfo = self.gettarinfo(entry_path, entry_arcname)
+            if tarinfo == None:
+                # Сокеты и другие неподдерживаемые объекты, как в TarFile.add
+                continue
+            if tarinfo.isreg() and tarinfo.type == tarfile.REGTYPE:
+                if data != None and len(data) == tarinfo.size:
+                    self.addfile(tarinfo, io.BytesIO(data))
+                else:
+                    with open(entry_path, "rb") as f:
+                        self.addfile(tarinfo, f)
+            else:
+                self.addfile(tarinfo)
+        # Дочитываем генератор, чтобы зафиксировать итоговое время
+        for item in prefetched:
+            pass
+        return pipeline.timings
+
+    def _add_sparse(self, tarinfo: tarfile.TarInfo, fileobj, extents: List[Tuple[int, int]]):
+        """
+        Записывает разреженный файл: заголовок с картой дыр, блоки
+        расширения карты и данные всех участков подряд.
+        """
+        self._check("awx")
+        if not extents or sum(extents[-1]) < tarinfo.size:
+            # Завершающая запись нулевой длины задает дыру в конце файла
+            extents = extents + [(tarinfo.size, 0)]
+        stored_size = sum(length for _, length in extents)
+
+        sparse_info = copy.copy(tarinfo)
+        sparse_info.type = tarfile.GNUTYPE_SPARSE
+        sparse_info.size = stored_size
+        buf = bytearray(sparse_info.tobuf(tarfile.GNU_FORMAT, self.encoding, self.errors))
+
+        header = len(buf) - tarfile.BLOCKSIZE
+        extended = len(extents) > SPARSE_HEADER_ENTRIES
+        buf[header + 386:header + 482] = _sparse_map(extents, 0, SPARSE_HEADER_ENTRIES)
+        buf[header + 482] = 1 if extended else 0
+        buf[header + 483:header + 495] = tarfile.itn(tarinfo.size, 12, tarfile.GNU_FORMAT)
+        chksum = 256 + sum(buf[header:header + 148]) + sum(buf[header + 156:header + tarfile.BLOCKSIZE])
+        buf[header + 148:header + 155] = b"%06o\0" % chksum
+
+        for start in range(SPARSE_HEADER_ENTRIES, len(extents), SPARSE_EXTENSION_ENTRIES):
+            block = bytearray(tarfile.BLOCKSIZE)
+            block[0:504] = _sparse_map(extents, start, SPARSE_EXTENSION_ENTRIES)
+            block[504] = 1 if start + SPARSE_EXTENSION_ENTRIES < len(extents) else 0
+            buf += block
+
+        self.fileobj.write(buf)
+        self.offset += len(buf)
+
+        fd = fileobj.fileno()
+        for offset, length in extents:
+            while length > 0:
+                chunk = os.pread(fd, min(length, self.copybufsize or 1024 * 1024), offset)
+                if not chunk:
+                    raise tarfile.ReadError("unexpected end of data")
+                self.fileobj.write(chunk)
+                offset += len(chunk)
+                length -= len(chunk)
+
+        blocks, remainder = divmod(stored_size, tarfile.BLOCKSIZE)
+        if remainder > 0:
+            self.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+            blocks += 1
+        self.offset += blocks * tarfile.BLOCKSIZE
+        self.members.append(tarinfo)
 
 
 class CommandTAR:
     """
-    Класс для реализации команды TAR - создания tar.gz архивов.
+    Класс для реализации команды TAR - создания tar архивов.
+    
+    Кодек выбирается опцией --codec gz|bz2|xz|none (по умолчанию gz),
+    уровень - опцией --level N; без нее уровень подбирается по энтропии
+    выборки файлов директории. С опцией -j N (0 - по числу ядер) gzip
+    сжимается блоками параллельно в пуле процессов, как pigz; архив
+    остается обычным tar.gz. С опцией --index (только gz) рядом с архивом
+    записывается индекс <archive>.idx, по которому untar достает отдельные
+    элементы, не распаковывая архив с начала. tar --benchmark <folder> сравнивает
+    степень и скорость сжатия кодеков на выборке файлов директории.
+    
+    С опцией --listed-incremental <snapshot> архив инкрементальный, как в
+    GNU tar: если файла снимка нет, создается полный архив уровня 0, иначе
+    в архив попадают только новые и измененные (по inode, mtime и размеру)
+    файлы и все директории. Первым элементом пишется служебный
+    .tar-incremental.json с уровнем и списком удаленных путей; снимок
+    обновляется только после успешного создания архива. Цепочку
+    восстанавливает untar --incremental.
+    
+    Разреженные файлы сохраняются как sparse-элементы: в архив попадают
+    только участки с данными. Повторные имена одного файла (жесткие ссылки)
+    сохраняются как link-элементы без повторной записи содержимого.
     
     Attributes:
         args (List[str]): Аргументы команды
@@ -27,7 +260,9 @@ class CommandTAR:
 
     def command_tar(self, args: List[str], current_dir: str):
         """
-        Создает tar.gz архив из указанной директории.
+        Создает tar архив из указанной директории.
+        Использование: tar [--codec gz|bz2|xz|none] [--level N] [-j N] [--index]
+                           [--listed-incremental <snapshot>] <folder> <archive>
         
         Args:
             args (List[str]): Аргументы команды
@@ -41,29 +276,119 @@ class CommandTAR:
             FileNotFoundError: Если директория не существует
             PermissionError: Если нет прав доступа
         """
-        if args[1] == None:
-            raise ValueError("Недостаточно аргументов. Использование: tar <folder> <archive.tar.gz>")
+        if args[0] == "--benchmark":
+            if args[1] == None:
+                raise ValueError("Недостаточно аргументов. Использование: tar --benchmark <folder>")
+            return benchmark_codecs(make_path(current_dir=current_dir, path=args[1]))
+
+        codec = "gz"
+        level = None
+        workers = 1
+        build_index = False
+        snapshot_path = None
+        i = 0
+        while i < len(args) and args[i] != None and args[i].startswith('-'):
+            if args[i] == '--codec':
+                i += 1
+                codec = args[i] if i < len(args) else None
+                if codec not in TAR_CODECS:
+                    raise ValueError(f"Неизвестный кодек {codec}, доступны: {', '.join(TAR_CODECS)}")
+            elif args[i] == '--level':
+                i += 1
+                value = args[i] if i < len(args) else None
+                if value == None or not value.isdigit() or not 1 <= int(value) <= 9:
+                    raise ValueError("Опция --level ожидает число от 1 до 9")
+                level = int(value)
+            elif args[i] == '-j':
+                i += 1
+                value = args[i] if i < len(args) else None
+                if value == None or not value.isdigit():
+                    raise ValueError("Опция -j ожидает неотрицательное число")
+                workers = int(value) or os.cpu_count() or 1
+            elif args[i] == '--index':
+                build_index = True
+            elif args[i] == '--listed-incremental':
+                i += 1
+                if i >= len(args) or args[i] == None:
+                    raise ValueError("Опция --listed-incremental ожидает путь к файлу снимка")
+                snapshot_path = make_path(current_dir=current_dir, path=args[i])
+            else:
+                raise ValueError(f"Неизвестная опция {args[i]}")
+            i += 1
+        args = args[i:]
+        if workers > 1 and codec != "gz":
+            raise ValueError("Параллельное сжатие (-j) поддерживается только для кодека gz")
+        if build_index and codec != "gz":
+            raise ValueError("Индекс (--index) поддерживается только для кодека gz")
+
+        if len(args) < 2 or args[1] == None:
+            raise ValueError("Недостаточно аргументов. Использование: tar [--codec gz|bz2|xz|none] [--level N] [-j N] [--index] "
+                             "[--listed-incremental <snapshot>] <folder> <archive>")
         
         folder_path = make_path(current_dir=current_dir, path=args[0])
         archive_path = make_path(current_dir=current_dir, path=args[1])
         
         # Проверяем существование папки
-        if not os.path.exists(folder_path):
+        if not cached_exists(folder_path):
             raise FileNotFoundError(f"Папка {args[0]} не найдена")
         
-        if not os.path.isdir(folder_path):
+        if not cached_isdir(folder_path):
             raise ValueError(f"{args[0]} не является папкой")
         
-        # Проверяем расширение архива, добавляем .tar.gz если нужно
-        if not archive_path.endswith('.tar.gz') and not archive_path.endswith('.tgz'):
-            archive_path += '.tar.gz'
+        # Проверяем расширение архива, добавляем расширение кодека если нужно
+        archive_path = tar_archive_path(archive_path, codec)
         
         try:
-            # Создаем TAR.GZ архив
-            with tarfile.open(archive_path, 'w:gz') as tar:
-                tar.add(folder_path, arcname=os.path.basename(folder_path))
+            mode = TAR_CODECS[codec][0]
+            options = {}
+            if codec != "none":
+                if level == None:
+                    level = choose_stream_level(folder_path)
+                if codec == "xz":
+                    # Пресеты xz выше 6 требуют сотни МБ памяти при малом выигрыше
+                    options["preset"] = min(level, 6)
+                else:
+                    options["compresslevel"] = level
+
+            arcname = os.path.basename(folder_path)
+            snapshot = None
+            changed = None
+            deleted = []
+            if snapshot_path != None:
+                # Снимок делается до чтения файлов: изменившиеся во время
+                # архивации файлы попадут в следующий уровень
+                snapshot = SnapshotManifest.scan(folder_path, arcname)
+                changed, deleted = snapshot.changes_since(SnapshotManifest.load(snapshot_path))
+
+            def fill(tar: SparseTarFile) -> StageTimings:
+                if snapshot != None:
+                    tarinfo, data = incremental_meta_member(snapshot.level, deleted)
+                    tar.addfile(tarinfo, io.BytesIO(data))
+                return tar.add_tree(folder_path, arcname=arcname, select=changed)
+
+            # Создаем TAR архив
+            if workers > 1 or build_index:
+                checkpoint_interval = CHECKPOINT_INTERVAL if build_index else None
+                with ParallelGzipWriter(archive_path, level=level, workers=workers,
+                                        checkpoint_interval=checkpoint_interval) as gzip_stream:
+                    with SparseTarFile.open(fileobj=gzip_stream, mode='w') as tar:
+                        timings = fill(tar)
+                        members = [(member.name, member.offset, member.size, member.type.decode("ascii"), member.linkname)
+                                   for member in tar.getmembers()]
+                if build_index:
+                    TarIndex(archive_path, gzip_stream.checkpoints, members).save()
+            else:
+                with SparseTarFile.open(archive_path, mode, **options) as tar:
+                    timings = fill(tar)
+            invalidate_path(archive_path)
             
-            return f"TAR.GZ архив создан: {folder_path} -> {archive_path}"
+            result = f"TAR архив создан ({codec}{'' if level == None or codec == 'none' else f', уровень {level}'}): {folder_path} -> {archive_path}\n"
+            if snapshot != None:
+                snapshot.save(snapshot_path)
+                files = sum(1 for name in changed if not stat.S_ISDIR(snapshot.entries[name][4]))
+                result += (f"Инкрементальный архив уровня {snapshot.level}: файлов записано {files}, "
+                           f"удалено путей {len(deleted)}; снимок: {snapshot_path}\n")
+            return result + timings.summary()
         
         except PermissionError:
             return f"Ошибка: Нет прав доступа для создания архива"
@@ -73,7 +398,22 @@ class CommandTAR:
 
 class CommandUNTAR:
     """
-    Класс для реализации команды UNTAR - распаковки tar.gz архивов.
+    Класс для реализации команды UNTAR - распаковки tar архивов.
+    
+    Архив читается потоково (режим tarfile 'r|'), за один последовательный
+    проход: формат сжатия определяется по первым байтам при единственном
+    открытии файла. Поэтому источником может быть и неперематываемый поток:
+    именованный канал или стандартный ввод ("-").
+    
+    После имени архива можно указать шаблоны glob, тогда распаковываются
+    только подходящие элементы; опция -t выводит список элементов. Если
+    рядом с архивом есть индекс (tar --index), элементы читаются с
+    ближайшей контрольной точки gzip потока, без распаковки архива с начала.
+    
+    untar --incremental <archive> ... восстанавливает цепочку архивов
+    tar --listed-incremental: полный архив уровня 0 и его приращения по
+    порядку. Перед распаковкой каждого приращения удаляются пути, которые
+    были удалены из исходной директории.
     
     Attributes:
         args (List[str]): Аргументы команды
@@ -93,14 +433,16 @@ class CommandUNTAR:
 
     def command_untar(self, args: List[str], current_dir: str):
         """
-        Распаковывает tar.gz архив в текущую директорию.
+        Распаковывает tar архив (gz, bz2, xz или без сжатия) в текущую директорию.
+        Использование: untar [-t] <archive|-> [pattern ...]
+                       untar --incremental <archive> [archive ...]
         
         Args:
             args (List[str]): Аргументы команды
             current_dir (str): Текущая рабочая директория
             
         Returns:
-            str: Сообщение о результате распаковки
+            str: Сообщение о результате распаковки или список элементов
             
         Raises:
             ValueError: При недостатке аргументов или если файл не является tar архивом
@@ -108,31 +450,207 @@ class CommandUNTAR:
             PermissionError: Если нет прав доступа
             tarfile.ReadError: Если архив поврежден
         """
-        if args[0] == None:
-            raise ValueError("Недостаточно аргументов. Использование: untar <archive.tar.gz>")
+        if args[0] == "--incremental":
+            archives = [arg for arg in args[1:] if arg != None]
+            if not archives:
+                raise ValueError("Недостаточно аргументов. Использование: untar --incremental <archive> [archive ...]")
+            return self._restore_chain(archives, current_dir)
+        
+        list_only = args[0] == "-t"
+        if list_only:
+            args = args[1:]
+        if len(args) == 0 or args[0] == None:
+            raise ValueError("Недостаточно аргументов. Использование: untar [-t] <archive|-> [pattern ...]")
+        patterns = [arg for arg in args[1:] if arg != None]
         
-        archive_path = make_path(current_dir=current_dir, path=args[0])
+        from_stdin = args[0] == "-"
+        archive_path = "<stdin>" if from_stdin else make_path(current_dir=current_dir, path=args[0])
         
         # Проверяем существование архива
-        if not os.path.exists(archive_path):
+        if not from_stdin and not cached_exists(archive_path):
             raise FileNotFoundError(f"Архив {args[0]} не найден")
         
-        # Проверяем, что это tar архив
-        if not tarfile.is_tarfile(archive_path):
-            raise ValueError(f"{args[0]} не является TAR архивом")
-        
         try:
-            # Распаковываем TAR.GZ архив в текущую директорию
-            with tarfile.open(archive_path, 'r:gz') as tar:
-                tar.extractall(current_dir)
+            index = None
+            if not from_stdin and cached_isfile(archive_path):
+                index = TarIndex.load(archive_path)
+            if index != None and list_only:
+                return "\n".join(name for name, *rest in index.select(patterns) if name != INCREMENTAL_META_NAME)
+            if index != None and patterns:
+                count, decompressed = self._extract_indexed(index, patterns, current_dir)
+                invalidate_path(current_dir, recursive=True)
+                return (f"Распаковано элементов по индексу: {count} "
+                        f"(распаковано {decompressed / (1024 * 1024):.2f} МБ потока): {archive_path} -> {current_dir}")
+            
+            # Распаковываем TAR архив в текущую директорию за один проход
+            source = sys.stdin.buffer if from_stdin else open(archive_path, 'rb')
+            try:
+                names, count = self._extract_stream(source, args[0], patterns, current_dir, list_only)
+            finally:
+                if not from_stdin:
+                    source.close()
+            if list_only:
+                return "\n".join(names)
+            invalidate_path(current_dir, recursive=True)
             
-            return f"TAR.GZ архив распакован: {archive_path} -> {current_dir}"
+            if patterns:
+                return f"Распаковано элементов: {count}: {archive_path} -> {current_dir}"
+            return f"TAR архив распакован: {archive_path} -> {current_dir}"
         
         except PermissionError:
             return f"Ошибка: Нет прав доступа для распаковки архива"
         
         except tarfile.ReadError:
-            return f"Ошибка: Файл поврежден или не является TAR.GZ архивом"
+            return f"Ошибка: Файл поврежден или не является TAR архивом"
         
         except Exception as e:
-            return f"Ошибка при распаковке TAR.GZ архива: {e}"
\ No newline at end of file
+            return f"Ошибка при распаковке TAR архива: {e}"
+
+    def _restore_chain(self, archives: List[str], destination: str) -> str:
+        """
+        Восстанавливает цепочку инкрементальных архивов по порядку.
+        
+        Первый архив должен быть уровня 0, уровень каждого следующего - от 1
+        до уровня предыдущего плюс один (приращение может быть сделано и от
+        сохраненной копии более раннего снимка).
+        
+        Args:
+            archives (List[str]): Архивы цепочки в порядке создания
+            destination (str): Директория назначения
+            
+        Returns:
+            str: Сообщение о результате восстановления
+        """
+        archive_paths = [make_path(current_dir=destination, path=archive) for archive in archives]
+        for archive, archive_path in zip(archives, archive_paths):
+            if not cached_isfile(archive_path):
+                raise FileNotFoundError(f"Архив {archive} не найден")
+        
+        previous_level = None
+        extracted = 0
+        removed = 0
+        try:
+            for archive, archive_path in zip(archives, archive_paths):
+                def apply_meta(meta: Dict):
+                    nonlocal previous_level, removed
+                    level = meta["level"]
+                    if previous_level == None and level != 0:
+                        raise ValueError(f"Цепочка должна начинаться с архива уровня 0, {archive} - уровня {level}")
+                    if previous_level != None and not 1 <= level <= previous_level + 1:
+                        raise ValueError(f"Архив {archive} уровня {level} не может следовать за уровнем {previous_level}")
+                    previous_level = level
+                    removed += apply_deletions(destination, meta["deleted"])
+                
+                with open(archive_path, 'rb') as source:
+                    names, count = self._extract_stream(source, archive, [], destination, incremental=apply_meta)
+                extracted += count
+        
+        except PermissionError:
+            return f"Ошибка: Нет прав доступа для распаковки архива"
+        
+        except tarfile.ReadError:
+            return f"Ошибка: Файл поврежден или не является TAR архивом"
+        
+        except Exception as e:
+            return f"Ошибка при восстановлении цепочки TAR архивов: {e}"
+        
+        finally:
+            invalidate_path(destination, recursive=True)
+        
+        return (f"Цепочка из {len(archive_paths)} архивов восстановлена (уровень {previous_level}): "
+                f"распаковано элементов {extracted}, удалено путей {removed} -> {destination}")
+
+    def _extract_stream(self, source, archive_name: str, patterns: List[str], destination: str,
+                        list_only: bool = False,
+                        incremental: Optional[Callable[[Dict], None]] = None) -> Tuple[List[str], int]:
+        """
+        Распаковывает (или перечисляет) элементы архива за один проход по потоку.
+        
+        Формат сжатия определяется по первым байтам без их извлечения из
+        буфера (peek), так что поток открывается и читается один раз.
+        
+        Args:
+            source: Буферизованный двоичный поток архива (файл, канал или stdin)
+            archive_name (str): Имя архива для сообщений об ошибках
+            patterns (List[str]): Шаблоны glob (пустой список - все элементы)
+            destination (str): Директория назначения
+            list_only (bool): Только перечислить элементы
+            incremental (Optional[Callable[[Dict], None]]): Обработчик служебного
+                элемента инкрементального архива; если задан, архив обязан начинаться с него
+            
+        Returns:
+            Tuple[List[str], int]: Имена подходящих элементов и число распакованных
+            
+        Raises:
+            ValueError: Если поток не является tar архивом (или инкрементальным архивом)
+        """
+        kind = archive_kind_from_header(source.peek(ARCHIVE_HEADER_SIZE)[:ARCHIVE_HEADER_SIZE])
+        if kind == "zip":
+            raise ValueError(f"{archive_name} является ZIP архивом (используйте unzip)")
+        mode = STREAM_MODES.get(kind, 'r|*')
+        
+        names = []
+        count = 0
+        directories = []
+        with tarfile.open(fileobj=source, mode=mode) as tar:
+            for member in tar:
+                if member.name == INCREMENTAL_META_NAME:
+                    if incremental != None:
+                        incremental(json.loads(tar.extractfile(member).read().decode("utf-8")))
+                        incremental = None
+                    continue
+                if incremental != None:
+                    raise ValueError(f"{archive_name} не является инкрементальным архивом (tar --listed-incremental)")
+                if patterns and not member_matches(member.name, patterns):
+                    continue
+                names.append(member.name)
+                if not list_only:
+                    # Атрибуты директорий восстанавливаются после распаковки их содержимого
+                    tar.extract(member, destination, set_attrs=not member.isdir())
+                    if member.isdir():
+                        directories.append(member)
+                    count += 1
+            restore_directory_attributes(tar, directories, destination)
+        if incremental != None:
+            raise ValueError(f"{archive_name} не является инкрементальным архивом (tar --listed-incremental)")
+        return names, count
+
+    def _extract_indexed(self, index: TarIndex, patterns: List[str], destination: str) -> Tuple[int, int]:
+        """
+        Распаковывает выбранные элементы, читая поток с контрольных точек индекса.
+        
+        Для жестких ссылок сначала распаковывается элемент, на который они
+        ссылаются, даже если он не подходит под шаблоны.
+        
+        Args:
+            index (TarIndex): Индекс архива
+            patterns (List[str]): Шаблоны glob
+            destination (str): Директория назначения
+            
+        Returns:
+            Tuple[int, int]: Число распакованных элементов и объем распакованного потока
+        """
+        selected = [member for member in index.select(patterns) if member[0] != INCREMENTAL_META_NAME]
+        by_name = {member[0]: member for member in index.members}
+        needed = {}
+        for member in selected:
+            name, offset, size, member_type, linkname = member
+            if member_type == tarfile.LNKTYPE.decode("ascii") and linkname in by_name:
+                needed[by_name[linkname][1]] = by_name[linkname]
+            needed[offset] = member
+        
+        reader = index.open_reader()
+        directories = []
+        try:
+            for offset in sorted(needed):
+                reader.seek(offset)
+                with tarfile.open(fileobj=reader, mode='r:') as tar:
+                    member = tar.firstmember
+                    tar.extract(member, destination, set_attrs=not member.isdir())
+                    if member.isdir():
+                        directories.append(member)
+            if directories:
+                restore_directory_attributes(tar, directories, destination)
+        finally:
+            reader.close()
+        return len(needed), reader.decompressed_bytes
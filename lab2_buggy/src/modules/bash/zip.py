@@ -1,15 +1,39 @@
 import os
 import zipfile
+import stat
 import os
-from typing import List
+from typing import List, Tuple
 
 from modules.valid_and_path_ops import *
+from modules.zip_engine import DEFAULT_MEMORY_BUDGET, ParallelZipWriter, extract_members, select_members
+from modules.compression_policy import choose_zip_compression
+from modules.readahead import ReadAheadPipeline
 
 
 class CommandZIP:
     """
     Класс для реализации команды ZIP - создания zip архивов.
     
+    Жесткие ссылки на уже добавленный файл (те же st_dev и st_ino) по
+    умолчанию пропускаются; опция --keep-hardlinks сохраняет их как
+    отдельные копии.
+    
+    С опцией -j N (0 - по числу ядер) элементы сжимаются параллельно в
+    пуле процессов; --memory-budget MB ограничивает объем данных в сжатии.
+    
+    Метод и уровень сжатия выбираются для каждого файла: уже сжатые
+    форматы (jpg, mp4, gz, zip и т.п.) и данные с высокой энтропией
+    сохраняются без сжатия, остальные сжимаются deflate с уровнем по
+    энтропии выборки. Опция --no-adaptive сжимает все файлы уровнем
+    по умолчанию.
+    
+    Без -j и -u файлы читаются заранее потоками ReadAheadPipeline, пока
+    сжимаются предыдущие; в ответе выводится время стадий чтения и сжатия.
+    
+    С опцией -u существующий архив обновляется: неизмененные элементы
+    копируются из него без пересжатия, сжимаются только новые и
+    измененные файлы.
+    
     Attributes:
         args (List[str]): Аргументы команды
         current_dir (str): Текущая рабочая директория
@@ -29,6 +53,7 @@ class CommandZIP:
     def command_zip(self, args: List[str], current_dir):
         """
         Создает zip архив из указанной директории.
+        Использование: zip [-u] [--keep-hardlinks] [--no-adaptive] [-j N] [--memory-budget MB] <folder> <archive.zip>
         
         Args:
             args (List[str]): Аргументы команды
@@ -42,17 +67,44 @@ class CommandZIP:
             FileNotFoundError: Если директория не существует
             PermissionError: Если нет прав доступа
         """
-        if args[1] == None:
-            raise ValueError("Недостаточно аргументов. Использование: zip <folder> <archive.zip>")
+        keep_hardlinks = False
+        update = False
+        adaptive = True
+        workers = None
+        memory_budget = DEFAULT_MEMORY_BUDGET
+
+        i = 0
+        while i < len(args) and args[i] != None and args[i].startswith('-'):
+            if args[i] == '--keep-hardlinks':
+                keep_hardlinks = True
+            elif args[i] == '-u':
+                update = True
+            elif args[i] == '--no-adaptive':
+                adaptive = False
+            elif args[i] == '-j':
+                i += 1
+                workers = self._parse_number(args[i] if i < len(args) else None, option='-j') or os.cpu_count() or 1
+            elif args[i] == '--memory-budget':
+                i += 1
+                memory_budget = self._parse_number(args[i] if i < len(args) else None, option='--memory-budget') * 1024 * 1024
+                if memory_budget == 0:
+                    raise ValueError("Опция --memory-budget ожидает положительное число мегабайт")
+            else:
+                raise ValueError(f"Неизвестная опция {args[i]}")
+            i += 1
+        args = args[i:]
+
+        if len(args) < 2 or args[1] == None:
+            raise ValueError("Недостаточно аргументов. Использование: zip [-u] [--keep-hardlinks] [--no-adaptive] [-j N] [--memory-budget MB] <folder> <archive.zip>")
         
         folder_path = make_path(current_dir=current_dir, path=args[0])
         archive_path = make_path(current_dir=current_dir, path=args[1])
         
         # Проверяем существование папки
-        if not os.path.exists(folder_path):
+        if not cached_exists(folder_path):
             raise FileNotFoundError(f"Папка {args[0]} не найдена")
         
-        if not os.path.isdir(folder_path):
+        if not cached_isdir(folder_path):
             raise ValueError(f"{args[0]} не является папкой")
         
         # Проверяем расширение архива
@@ -60,27 +112,105 @@ class CommandZIP:
             archive_path += '.zip'
         
         try:
-            # Создаем ZIP архив
-            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(folder_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Создаем относительный путь для архива
-                        arcname = os.path.relpath(file_path, os.path.dirname(folder_path))
-                        zipf.write(file_path, arcname)
+            members, skipped_links = self._collect_members(folder_path, keep_hardlinks)
+            if update or (workers != None and workers > 1):
+                # Параллельное сжатие и/или переиспользование элементов прежнего архива
+                writer = ParallelZipWriter(workers=workers or 1, memory_budget=memory_budget, adaptive=adaptive)
+                stats = writer.write(archive_path, members, update=update)
+            else:
+                # Создаем ZIP архив; файлы заранее читаются потоками конвейера
+                arcnames = dict(members)
+                pipeline = ReadAheadPipeline([file_path for file_path, arcname in members])
+                with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    for file_path, data in pipeline:
+                        zinfo = zipfile.ZipInfo.from_file(file_path, arcnames[file_path])
+                        if data != None and len(data) != zinfo.file_size:
+                            # Файл изменился после чтения: zipfile прочитает его заново
+                            data = None
+                        compress_type, level = zipfile.ZIP_DEFLATED, None
+                        if adaptive:
+                            # Выборка для оценки энтропии берется из уже прочитанных данных
+                            compress_type, level = choose_zip_compression(file_path, zinfo.file_size, data)
+                        if data != None:
+                            zipf.writestr(zinfo, data, compress_type=compress_type, compresslevel=level)
+                        else:
+                            zipf.write(file_path, arcnames[file_path], compress_type=compress_type, compresslevel=level)
+                stats = pipeline.timings
+            invalidate_path(archive_path)
             
-            return f"Архив создан: {folder_path} -> {archive_path}"
+            result = f"Архив создан: {folder_path} -> {archive_path}"
+            if stats != None:
+                result += f"\n{stats.summary()}"
+            if skipped_links:
+                result += f"\nПропущено жестких ссылок: {skipped_links}"
+            return result
         
         except PermissionError:
             return f"Ошибка: Нет прав доступа для создания архива"
         except Exception as e:
             return f"Ошибка при создании архива: {e}"
 
+    def _collect_members(self, folder_path: str, keep_hardlinks: bool) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Собирает файлы директории для записи в архив.
+        
+        Жесткие ссылки на уже добавленный файл (те же st_dev и st_ino)
+        пропускаются, если не задан keep_hardlinks.
+        
+        Args:
+            folder_path (str): Архивируемая директория
+            keep_hardlinks (bool): Сохранять жесткие ссылки отдельными копиями
+            
+        Returns:
+            Tuple[List[Tuple[str, str]], int]: Пары (путь к файлу, имя в архиве)
+                и число пропущенных жестких ссылок
+        """
+        members = []
+        written_inodes = set()
+        skipped_links = 0
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                if not keep_hardlinks:
+                    file_stat = os.lstat(file_path)
+                    if file_stat.st_nlink > 1 and not stat.S_ISDIR(file_stat.st_mode):
+                        inode = (file_stat.st_dev, file_stat.st_ino)
+                        if inode in written_inodes:
+                            skipped_links += 1
+                            continue
+                        written_inodes.add(inode)
+                # Создаем относительный путь для архива
+                arcname = os.path.relpath(file_path, os.path.dirname(folder_path))
+                members.append((file_path, arcname))
+        return members, skipped_links
+
+    def _parse_number(self, value: str, option: str) -> int:
+        """
+        Разбирает числовое значение опции.
+        
+        Args:
+            value (str): Значение опции
+            option (str): Имя опции для сообщения об ошибке
+            
+        Returns:
+            int: Неотрицательное число
+            
+        Raises:
+            ValueError: Если значение отсутствует или не является неотрицательным числом
+        """
+        if value == None or not value.isdigit():
+            raise ValueError(f"Опция {option} ожидает неотрицательное число")
+        return int(value)
+
 
 class CommandUNZIP:
     """
     Класс для реализации команды UNZIP - распаковки zip архивов.
     
+    После имени архива можно указать шаблоны glob: распаковываются только
+    подходящие элементы, и с диска читаются только их данные. С опцией
+    -j N (0 - по числу ядер) элементы распаковываются параллельно.
+    
     Attributes:
         args (List[str]): Аргументы команды
         current_dir (str): Текущая рабочая директория
@@ -100,6 +230,7 @@ class CommandUNZIP:
     def command_unzip(self, args: List[str], current_dir):
         """
         Распаковывает zip архив в текущую директорию.
+        Использование: unzip [-j N] <archive.zip> [pattern ...]
         
         Args:
             args (List[str]): Аргументы команды
@@ -114,23 +245,46 @@ class CommandUNZIP:
             PermissionError: Если нет прав доступа
             zipfile.BadZipFile: Если архив поврежден
         """
-        if args[0] == None:
-            raise ValueError("Недостаточно аргументов. Использование: unzip <archive.zip>")
+        workers = 1
+        i = 0
+        while i < len(args) and args[i] != None and args[i].startswith('-'):
+            if args[i] == '-j':
+                i += 1
+                value = args[i] if i < len(args) else None
+                if value == None or not value.isdigit():
+                    raise ValueError("Опция -j ожидает неотрицательное число")
+                workers = int(value) or os.cpu_count() or 1
+            else:
+                raise ValueError(f"Неизвестная опция {args[i]}")
+            i += 1
+        args = args[i:]
+        
+        if len(args) == 0 or args[0] == None:
+            raise ValueError("Недостаточно аргументов. Использование: unzip [-j N] <archive.zip> [pattern ...]")
+        patterns = [arg for arg in args[1:] if arg != None]
         
         archive_path = make_path(current_dir=current_dir, path=args[0])
         
         # Проверяем существование архива
-        if not os.path.exists(archive_path):
+        if not cached_exists(archive_path):
             raise FileNotFoundError(f"Архив {args[0]} не найден")
         
         if not zipfile.is_zipfile(archive_path):
             raise ValueError(f"{args[0]} не является ZIP архивом")
         
         try:
-            # Распаковываем архив в текущую директорию
+            # Выбираем элементы по центральному каталогу
             with zipfile.ZipFile(archive_path, 'r') as zipf:
-                zipf.extractall(self.current_dir)
+                members = select_members(zipf, patterns)
+            if not members:
+                return f"В архиве {archive_path} нет элементов, подходящих под {' '.join(patterns)}"
+            
+            # Распаковываем архив в текущую директорию
+            extracted = extract_members(archive_path, members, self.current_dir, workers=workers)
+            invalidate_path(self.current_dir, recursive=True)
             
+            if patterns:
+                return f"Распаковано элементов: {extracted}: {archive_path} -> {self.current_dir}"
             return f"Архив распакован: {archive_path} -> {self.current_dir}"
         
         except PermissionError:
@@ -0,0 +1,229 @@
+from typing import *
+import os
+import bz2
+import lzma
+import math
+import zlib
+import time
+import zipfile
+
+from modules.valid_and_path_ops import *
+
+
+# Форматы, данные которых уже сжаты: повторное сжатие только тратит CPU
+STORED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp3", ".aac", ".ogg", ".opus", ".flac", ".m4a",
+    ".mp4", ".mkv", ".avi", ".mov", ".webm",
+    ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".zip", ".7z", ".rar", ".jar",
+    ".docx", ".xlsx", ".pptx", ".odt", ".epub", ".apk", ".whl",
+}
+
+# Пороги энтропии выборки (бит на байт) для выбора уровня deflate
+STORE_ENTROPY = 7.5
+FAST_ENTROPY = 6.0
+
+# Размер одного фрагмента выборки; берутся начало, середина и конец файла
+SAMPLE_CHUNK_SIZE = 16 * 1024
+
+# Файлы меньше этого размера сжимаются уровнем по умолчанию без выборки
+MIN_SAMPLED_SIZE = 4 * 1024
+
+# Кодеки tar: режим tarfile.open и расширение архива
+TAR_CODECS = {
+    "gz": ("w:gz", ".tar.gz"),
+    "bz2": ("w:bz2", ".tar.bz2"),
+    "xz": ("w:xz", ".tar.xz"),
+    "none": ("w", ".tar"),
+}
+
+TAR_EXTENSIONS = (".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar")
+
+
+def sample_entropy(path: str, size: int, data: Optional[bytes] = None) -> float:
+    """
+    Оценивает энтропию Шеннона содержимого файла по трем фрагментам.
+
+    Args:
+        path (str): Путь к файлу
+        size (int): Размер файла
+        data (Optional[bytes]): Уже прочитанное содержимое файла (None - читать фрагменты с диска)
+
+    Returns:
+        float: Энтропия в битах на байт (от 0 до 8)
+    """
+    offsets = sorted({0, max(0, size // 2 - SAMPLE_CHUNK_SIZE // 2), max(0, size - SAMPLE_CHUNK_SIZE)})
+    sample = b""
+    if data != None:
+        for offset in offsets:
+            sample += data[offset:offset + SAMPLE_CHUNK_SIZE]
+    else:
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                sample += f.read(SAMPLE_CHUNK_SIZE)
+    if not sample:
+        return 0.0
+    entropy = 0.0
+    for count in (sample.count(bytes((value,))) for value in range(256)):
+        if count:
+            probability = count / len(sample)
+            entropy -= probability * math.log2(probability)
+    return entropy
+
+
+def choose_zip_compression(path: str, size: int, data: Optional[bytes] = None) -> Tuple[int, Optional[int]]:
+    """
+    Выбирает метод и уровень сжатия элемента zip архива.
+
+    Уже сжатые форматы (по расширению) и данные с энтропией выборки не
+    ниже STORE_ENTROPY сохраняются без сжатия, плохо сжимаемые данные
+    (энтропия не ниже FAST_ENTROPY) сжимаются быстрым уровнем 1, остальные -
+    уровнем 6: на избыточных данных уровень 9 в разы медленнее при почти
+    том же размере.
+
+    Args:
+        path (str): Путь к файлу
+        size (int): Размер файла
+        data (Optional[bytes]): Уже прочитанное содержимое файла (None - читать выборку с диска)
+
+    Returns:
+        Tuple[int, Optional[int]]: Метод сжатия zipfile и уровень (None для ZIP_STORED)
+    """
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED, None
+    if size < MIN_SAMPLED_SIZE:
+        return zipfile.ZIP_DEFLATED, 6
+    try:
+        entropy = sample_entropy(path, size, data)
+    except OSError:
+        return zipfile.ZIP_DEFLATED, 6
+    if entropy >= STORE_ENTROPY:
+        return zipfile.ZIP_STORED, None
+    if entropy >= FAST_ENTROPY:
+        return zipfile.ZIP_DEFLATED, 1
+    return zipfile.ZIP_DEFLATED, 6
+
+
+def choose_stream_level(folder_path: str, max_files: int = 256) -> int:
+    """
+    Выбирает уровень сжатия для потокового кодека tar (один на весь
+    архив) по выборке файлов директории: уровни choose_zip_compression
+    усредняются с весом по размеру, уже сжатые данные считаются уровнем 0.
+
+    Args:
+        folder_path (str): Архивируемая директория
+        max_files (int): Сколько файлов рассмотреть
+
+    Returns:
+        int: Уровень сжатия от 1 до 6
+    """
+    weighted = 0
+    total = 0
+    seen = 0
+    for root, dirs, files in os.walk(folder_path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                continue
+            compress_type, level = choose_zip_compression(file_path, size)
+            weighted += size * (level or 0)
+            total += size
+            seen += 1
+            if seen >= max_files:
+                break
+        if seen >= max_files:
+            break
+    if total == 0:
+        return 6
+    return min(6, max(1, round(weighted / total)))
+
+
+def tar_archive_path(archive_path: str, codec: str) -> str:
+    """
+    Добавляет к пути архива расширение кодека, если расширение tar не указано.
+
+    Args:
+        archive_path (str): Путь к архиву
+        codec (str): Кодек из TAR_CODECS
+
+    Returns:
+        str: Путь к архиву с расширением
+    """
+    if archive_path.endswith(TAR_EXTENSIONS):
+        return archive_path
+    return archive_path + TAR_CODECS[codec][1]
+
+
+def _collect_sample(folder_path: str, limit: int) -> List[Tuple[str, bytes]]:
+    """
+    Читает файлы директории, пока их суммарный объем не превысит limit.
+
+    Args:
+        folder_path (str): Директория
+        limit (int): Предел объема выборки в байтах
+
+    Returns:
+        List[Tuple[str, bytes]]: Пути и содержимое файлов выборки
+    """
+    sample = []
+    total = 0
+    for root, dirs, files in os.walk(folder_path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            if not os.path.isfile(file_path) or os.path.islink(file_path):
+                continue
+            try:
+                with open(file_path, "rb") as f:
+                    data = f.read(limit - total)
+            except OSError:
+                continue
+            sample.append((file_path, data))
+            total += len(data)
+            if total >= limit:
+                return sample
+    return sample
+
+
+def benchmark_codecs(folder_path: str, limit: int = 32 * 1024 * 1024) -> str:
+    """
+    Сравнивает степень и скорость сжатия кодеков на выборке файлов директории.
+
+    Args:
+        folder_path (str): Директория, из которой берется выборка
+        limit (int): Предел объема выборки в байтах
+
+    Returns:
+        str: Таблица с размером, степенью сжатия и скоростью каждого варианта
+    """
+    sample = _collect_sample(folder_path, limit)
+    total = sum(len(data) for path, data in sample)
+    if total == 0:
+        return f"В {folder_path} нет данных для замера"
+
+    def adaptive(path: str, data: bytes) -> bytes:
+        compress_type, level = choose_zip_compression(path, len(data), data)
+        return data if compress_type == zipfile.ZIP_STORED else zlib.compress(data, level)
+
+    variants: List[Tuple[str, Callable[[str, bytes], bytes]]] = [
+        ("zip адаптивный", adaptive),
+        ("gzip -1", lambda path, data: zlib.compress(data, 1)),
+        ("gzip -6", lambda path, data: zlib.compress(data, 6)),
+        ("gzip -9", lambda path, data: zlib.compress(data, 9)),
+        ("bz2 -9", lambda path, data: bz2.compress(data, 9)),
+        ("xz -6", lambda path, data: lzma.compress(data, preset=6)),
+        ("none", lambda path, data: data),
+    ]
+
+    lines = [f"Выборка: {len(sample)} файлов, {total / (1024 * 1024):.2f} МБ из {folder_path}",
+             f"{'Вариант':<16} {'Размер, МБ':>11} {'Сжатие':>8} {'Скорость, МБ/с':>15}"]
+    for name, compress in variants:
+        started = time.perf_counter()
+        size = sum(len(compress(path, data)) for path, data in sample)
+        elapsed = time.perf_counter() - started
+        speed = total / (1024 * 1024) / elapsed if elapsed > 0 else float("inf")
+        lines.append(f"{name:<16} {size / (1024 * 1024):>11.2f} {size / total * 100:>7.1f}% {speed:>15.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,616 @@
+from typing import *
+import os
+import stat
+import time
+import shutil
+import errno
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from modules.valid_and_path_ops import *
+
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Ошибки, при которых ядро не умеет копировать между этими файлами
+# и нужно перейти к следующему способу копирования
+KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                           errno.EBADF, errno.ENOTSUP}
+
+
+def _copy_file_range(fd_in: int, fd_out: int) -> bool:
+    """
+    Копирует данные внутри ядра через os.copy_file_range (Linux 4.5+).
+
+    Returns:
+        bool: True если копирование выполнено, False если способ не поддерживается
+        или первый вызов ничего не скопировал (файлы procfs и sysfs сообщают
+        нулевой размер, пустой файл дешево скопировать и через буфер)
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied_any = False
+    while True:
+        try:
+            copied = os.copy_file_range(fd_in, fd_out, COPY_CHUNK_SIZE)
+        except OSError as e:
+            if e.errno in KERNEL_COPY_UNSUPPORTED and not copied_any:
+                return False
+            raise
+        if copied == 0:
+            return copied_any
+        copied_any = True
+
+
+def _sendfile(fd_in: int, fd_out: int) -> bool:
+    """
+    Копирует данные внутри ядра через os.sendfile.
+
+    Returns:
+        bool: True если копирование выполнено, False если способ не поддерживается
+        или первый вызов ничего не скопировал
+    """
+    if not hasattr(os, "sendfile"):
+        return False
+    offset = os.lseek(fd_in, 0, os.SEEK_CUR)
+    copied_any = False
+    while True:
+        try:
+            sent = os.sendfile(fd_out, fd_in, offset, COPY_CHUNK_SIZE)
+        except OSError as e:
+            if e.errno in KERNEL_COPY_UNSUPPORTED and not copied_any:
+                return False
+            raise
+        if sent == 0:
+            os.lseek(fd_in, offset, os.SEEK_SET)
+            return copied_any
+        offset += sent
+        copied_any = True
+
+
+def is_sparse(stat_info: os.stat_result) -> bool:
+    """
+    Проверяет, занимает ли файл на диске меньше места, чем его размер.
+
+    Args:
+        stat_info (os.stat_result): Метаданные файла
+
+    Returns:
+        bool: True если в файле, вероятно, есть дыры
+    """
+    blocks = getattr(stat_info, "st_blocks", None)
+    return blocks != None and stat_info.st_size > 0 and blocks * 512 < stat_info.st_size
+
+
+def data_extents(fd: int, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Находит участки файла с данными через SEEK_DATA/SEEK_HOLE.
+
+    Args:
+        fd (int): Дескриптор файла
+        size (int): Размер файла
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: Список (смещение, длина) участков с данными
+        или None, если файловая система не поддерживает поиск дыр
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        return None
+    extents: List[Tuple[int, int]] = []
+    position = 0
+    try:
+        while position < size:
+            try:
+                start = os.lseek(fd, position, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    break
+                raise
+            end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+            extents.append((start, end - start))
+            position = end
+    except OSError as e:
+        if e.errno in KERNEL_COPY_UNSUPPORTED:
+            return None
+        raise
+    finally:
+        os.lseek(fd, 0, os.SEEK_SET)
+    return extents
+
+
+def _copy_range(fd_in: int, fd_out: int, offset: int, length: int):
+    """
+    Копирует участок файла по тому же смещению в файле назначения.
+    """
+    end = offset + length
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < end:
+                copied = os.copy_file_range(fd_in, fd_out, min(COPY_CHUNK_SIZE, end - offset), offset, offset)
+                if copied == 0:
+                    return
+                offset += copied
+            return
+        except OSError as e:
+            if e.errno not in KERNEL_COPY_UNSUPPORTED:
+                raise
+    while offset < end:
+        chunk = os.pread(fd_in, min(COPY_CHUNK_SIZE, end - offset), offset)
+        if not chunk:
+            return
+        os.pwrite(fd_out, chunk, offset)
+        offset += len(chunk)
+
+
+def copy_file_data(src: str, dst: str):
+    """
+    Копирует содержимое файла: сначала copy_file_range, затем sendfile,
+    при отсутствии поддержки ядра - обычное копирование через буфер.
+
+    Для разреженных файлов (образы дисков, предвыделенные базы данных)
+    копируются только участки с данными, найденные через SEEK_DATA/SEEK_HOLE,
+    а дыры воссоздаются в назначении без записи нулей.
+
+    Args:
+        src (str): Исходный файл
+        dst (str): Файл назначения (перезаписывается)
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fd_in, fd_out = fsrc.fileno(), fdst.fileno()
+        stat_info = os.fstat(fd_in)
+        if is_sparse(stat_info):
+            extents = data_extents(fd_in, stat_info.st_size)
+            if extents != None:
+                for offset, length in extents:
+                    _copy_range(fd_in, fd_out, offset, length)
+                os.ftruncate(fd_out, stat_info.st_size)
+                return
+        if _copy_file_range(fd_in, fd_out):
+            return
+        if _sendfile(fd_in, fd_out):
+            return
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+
+
+def file_digest(path: str) -> bytes:
+    """
+    Вычисляет хэш содержимого файла (BLAKE2b).
+
+    Args:
+        path (str): Путь к файлу
+
+    Returns:
+        bytes: Хэш содержимого
+    """
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                return digest.digest()
+            digest.update(chunk)
+
+
+def remove_path(path: str):
+    """
+    Удаляет файл, символическую ссылку или директорию со всем содержимым.
+
+    Args:
+        path (str): Удаляемый путь
+    """
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def copy2(src: str, dst: str, replace: bool = False) -> str:
+    """
+    Аналог shutil.copy2 на основе copy_file: если dst - директория,
+    файл копируется в нее под исходным именем.
+
+    Args:
+        src (str): Исходный файл
+        dst (str): Файл или директория назначения
+        replace (bool): Заменять существующий файл новым (см. copy_file)
+
+    Returns:
+        str: Путь к скопированному файлу
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    copy_file(src, dst, replace=replace)
+    return dst
+
+
+def copy_file(src: str, dst: str, replace: bool = False) -> int:
+    """
+    Копирует файл вместе с метаданными, как shutil.copy2.
+
+    При replace существующий файл назначения не перезаписывается на месте,
+    а заменяется новым через временный файл и os.replace: другие имена
+    файла (жесткие ссылки) сохраняют прежнее содержимое, а прерванное
+    копирование не оставляет наполовину записанный файл.
+
+    Args:
+        src (str): Исходный файл
+        dst (str): Файл назначения
+        replace (bool): Заменять существующий файл назначения новым
+
+    Returns:
+        int: Количество скопированных байт
+    """
+    if replace and os.path.lexists(dst):
+        tmp_path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.cp-tmp")
+        try:
+            copy_file_data(src, tmp_path)
+            shutil.copystat(src, tmp_path)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.stat(dst).st_size
+    copy_file_data(src, dst)
+    shutil.copystat(src, dst)
+    return os.stat(dst).st_size
+
+
+class CopyStats:
+    """
+    Итоги копирования дерева файлов.
+
+    Attributes:
+        files (int): Скопировано файлов
+        directories (int): Создано директорий
+        links (int): Воссоздано символических ссылок
+        hardlinks (int): Воссоздано жестких ссылок
+        bytes (int): Скопировано байт
+        skipped (int): Пропущено неизмененных файлов (режим обновления)
+        deleted (int): Удалено лишних объектов в назначении (режим зеркала)
+        errors (List[str]): Ошибки копирования отдельных объектов
+        elapsed (float): Время копирования в секундах
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.directories = 0
+        self.links = 0
+        self.hardlinks = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.deleted = 0
+        self.errors: List[str] = []
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add_file(self, size: int):
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+
+    def add_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def add_error(self, message: str):
+        with self._lock:
+            self.errors.append(message)
+
+    def summary(self) -> str:
+        """
+        Форматирует итоги копирования для вывода в консоль.
+
+        Returns:
+            str: Строка с числом файлов, объемом и скоростью копирования
+        """
+        megabytes = self.bytes / (1024 * 1024)
+        throughput = megabytes / self.elapsed if self.elapsed > 0 else 0.0
+        result = (f"Файлов: {self.files}, директорий: {self.directories}, ссылок: {self.links}, "
+                  f"жестких ссылок: {self.hardlinks}, "
+                  f"{megabytes:.2f} МБ за {self.elapsed:.2f} с ({throughput:.2f} МБ/с)")
+        if self.skipped or self.deleted:
+            result += f"\nПропущено без изменений: {self.skipped}, удалено лишних: {self.deleted}"
+        if self.errors:
+            result += f"\nОшибок: {len(self.errors)}\n" + "\n".join(self.errors)
+        return result
+
+
+class ParallelCopier:
+    """
+    Параллельное копирование дерева директорий.
+
+    Дерево обходится через os.scandir в вызывающем потоке: директории и
+    символические ссылки создаются сразу, а копирование файлов передается
+    пулу потоков. Метаданные директорий копируются в конце, от самых
+    вложенных к корню, чтобы запись файлов не меняла их mtime.
+
+    Жесткие ссылки сохраняются: файл с общими (st_dev, st_ino) копируется
+    один раз, а остальные его имена создаются в назначении через os.link.
+
+    В режиме обновления копируются только новые и измененные файлы:
+    файл пропускается, если совпадают размер и mtime (или, при checksum,
+    размер и хэш содержимого). В режиме зеркала (delete) из назначения
+    дополнительно удаляются объекты, которых нет в источнике.
+
+    Attributes:
+        workers (Optional[int]): Количество потоков (None - по умолчанию ThreadPoolExecutor)
+        update (bool): Копировать только новые и измененные файлы
+        checksum (bool): Сравнивать содержимое по хэшу вместо mtime
+        delete (bool): Удалять из назначения объекты, отсутствующие в источнике
+        progress (Optional[Callable[[CopyStats], None]]): Вызывается из потоков пула
+            после копирования каждого файла
+    """
+
+    def __init__(self, workers: Optional[int] = None, update: bool = False,
+                 checksum: bool = False, delete: bool = False,
+                 progress: Optional[Callable[[CopyStats], None]] = None):
+        self.workers = workers
+        self.update = update or checksum or delete
+        self.checksum = checksum
+        self.delete = delete
+        self.progress = progress
+
+    def is_unchanged(self, source: str, target: str, source_stat: Optional[os.stat_result] = None) -> bool:
+        """
+        Проверяет, что файл назначения совпадает с исходным.
+
+        Args:
+            source (str): Исходный файл
+            target (str): Файл назначения
+            source_stat (Optional[os.stat_result]): Уже полученные метаданные источника
+
+        Returns:
+            bool: True если файл можно не копировать
+        """
+        try:
+            target_stat = os.stat(target, follow_symlinks=False)
+        except FileNotFoundError:
+            return False
+        if not stat.S_ISREG(target_stat.st_mode):
+            return False
+        if source_stat == None:
+            source_stat = os.stat(source)
+        if source_stat.st_size != target_stat.st_size:
+            return False
+        if self.checksum:
+            return file_digest(source) == file_digest(target)
+        return source_stat.st_mtime_ns == target_stat.st_mtime_ns
+
+    def _delete_extraneous(self, target_dir: str, source_names: Set[str], stats: CopyStats):
+        """
+        Удаляет из директории назначения объекты, которых нет в источнике.
+
+        Args:
+            target_dir (str): Директория назначения
+            source_names (Set[str]): Имена объектов исходной директории
+            stats (CopyStats): Итоги копирования
+        """
+        try:
+            with os.scandir(target_dir) as entries:
+                extraneous = [entry.path for entry in entries if entry.name not in source_names]
+        except OSError as e:
+            stats.add_error(f"{target_dir}: {e}")
+            return
+        for path in extraneous:
+            try:
+                remove_path(path)
+                stats.deleted += 1
+            except OSError as e:
+                stats.add_error(f"{path}: {e}")
+
+    def copy_tree(self, src: str, dst: str, dirs_exist_ok: bool = False) -> CopyStats:
+        """
+        Копирует директорию src в dst.
+
+        Args:
+            src (str): Исходная директория
+            dst (str): Директория назначения
+            dirs_exist_ok (bool): Разрешить копирование в существующие директории
+                (в режиме обновления всегда разрешено)
+
+        Returns:
+            CopyStats: Итоги копирования
+
+        Raises:
+            FileExistsError: Если dst существует и dirs_exist_ok не задан
+        """
+        stats = CopyStats()
+        started = time.perf_counter()
+        directories: List[Tuple[str, str]] = []
+        futures: List[Future] = []
+        # (st_dev, st_ino) -> путь первой копии; жесткие ссылки создаются после копирования
+        first_copies: Dict[Tuple[int, int], str] = {}
+        hardlinks: List[Tuple[str, str, str]] = []
+
+        dirs_exist_ok = dirs_exist_ok or self.update
+
+        def copy_one(entry: os.DirEntry, target: str):
+            try:
+                if self.update and self.is_unchanged(entry.path, target, entry.stat()):
+                    stats.add_skipped()
+                    return
+                stats.add_file(copy_file(entry.path, target, replace=self.update))
+                if self.progress != None:
+                    self.progress(stats)
+            except OSError as e:
+                stats.add_error(f"{entry.path}: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            os.makedirs(dst, exist_ok=dirs_exist_ok)
+            stats.directories += 1
+            directories.append((src, dst))
+            stack = [(src, dst)]
+            while stack:
+                source_dir, target_dir = stack.pop()
+                try:
+                    with os.scandir(source_dir) as entries:
+                        items = list(entries)
+                except OSError as e:
+                    stats.add_error(f"{source_dir}: {e}")
+                    continue
+
+                if self.delete:
+                    self._delete_extraneous(target_dir, {entry.name for entry in items}, stats)
+
+                for entry in items:
+                    target = os.path.join(target_dir, entry.name)
+                    try:
+                        if entry.is_symlink():
+                            link = os.readlink(entry.path)
+                            if os.path.lexists(target):
+                                if self.update and os.path.islink(target) and os.readlink(target) == link:
+                                    stats.add_skipped()
+                                    continue
+                                remove_path(target)
+                            os.symlink(link, target)
+                            stats.links += 1
+                        elif entry.is_dir():
+                            if self.update and os.path.lexists(target) and (os.path.islink(target) or not os.path.isdir(target)):
+                                remove_path(target)
+                            os.makedirs(target, exist_ok=dirs_exist_ok)
+                            stats.directories += 1
+                            directories.append((entry.path, target))
+                            stack.append((entry.path, target))
+                        elif entry.is_file():
+                            if self.update and os.path.isdir(target) and not os.path.islink(target):
+                                remove_path(target)
+                            source_stat = entry.stat(follow_symlinks=False)
+                            if source_stat.st_nlink > 1:
+                                inode = (source_stat.st_dev, source_stat.st_ino)
+                                if inode in first_copies:
+                                    hardlinks.append((entry.path, first_copies[inode], target))
+                                    continue
+                                first_copies[inode] = target
+                            futures.append(executor.submit(copy_one, entry, target))
+                        else:
+                            stats.add_error(f"{entry.path}: специальный файл пропущен")
+                    except OSError as e:
+                        stats.add_error(f"{entry.path}: {e}")
+
+            for future in futures:
+                future.result()
+
+        for source_path, first_copy, target in hardlinks:
+            try:
+                if os.path.lexists(target):
+                    if self.update and os.path.samefile(first_copy, target):
+                        stats.add_skipped()
+                        continue
+                    remove_path(target)
+                os.link(first_copy, target)
+                stats.hardlinks += 1
+            except OSError as e:
+                stats.add_error(f"{source_path}: {e}")
+
+        for source_dir, target_dir in reversed(directories):
+            try:
+                shutil.copystat(source_dir, target_dir)
+            except OSError as e:
+                stats.add_error(f"{source_dir}: {e}")
+
+        invalidate_path(dst, recursive=True)
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+
+def verify_tree(src: str, dst: str, workers: Optional[int] = None) -> List[str]:
+    """
+    Сверяет копию дерева с источником: для обычных файлов сравниваются
+    размер и хэш содержимого, для символических ссылок - их цель.
+
+    Args:
+        src (str): Исходная директория или файл
+        dst (str): Копия
+        workers (Optional[int]): Количество потоков для хэширования
+
+    Returns:
+        List[str]: Описания расхождений (пустой список, если копия совпадает)
+    """
+    mismatches: List[str] = []
+    pairs: List[Tuple[str, str]] = []
+    stack = [(src, dst)]
+    if not os.path.isdir(src) or os.path.islink(src):
+        pairs.append((src, dst))
+        stack = []
+
+    while stack:
+        source_dir, target_dir = stack.pop()
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                target = os.path.join(target_dir, entry.name)
+                if entry.is_symlink():
+                    if not os.path.islink(target) or os.readlink(target) != os.readlink(entry.path):
+                        mismatches.append(f"{entry.path}: ссылка не совпадает")
+                elif entry.is_dir():
+                    if not os.path.isdir(target):
+                        mismatches.append(f"{entry.path}: директория отсутствует")
+                    else:
+                        stack.append((entry.path, target))
+                elif entry.is_file():
+                    pairs.append((entry.path, target))
+
+    def compare(pair: Tuple[str, str]) -> Optional[str]:
+        source, target = pair
+        if os.path.islink(source):
+            if not os.path.islink(target) or os.readlink(target) != os.readlink(source):
+                return f"{source}: ссылка не совпадает"
+            return None
+        try:
+            if os.path.getsize(source) != os.path.getsize(target):
+                return f"{source}: размер не совпадает"
+            if file_digest(source) != file_digest(target):
+                return f"{source}: содержимое не совпадает"
+        except OSError as e:
+            return f"{source}: {e}"
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        mismatches.extend(result for result in executor.map(compare, pairs) if result != None)
+    return mismatches
+
+
+def move_across_devices(src: str, dst: str,
+                        progress: Optional[Callable[[CopyStats], None]] = None) -> CopyStats:
+    """
+    Перемещает файл или директорию на другую файловую систему: копирует
+    (директории - через ParallelCopier), сверяет копию с источником и
+    только после этого удаляет источник.
+
+    Args:
+        src (str): Исходный путь
+        dst (str): Путь назначения (не должен существовать)
+        progress (Optional[Callable[[CopyStats], None]]): Обработчик прогресса копирования
+
+    Returns:
+        CopyStats: Итоги копирования
+
+    Raises:
+        OSError: Если копирование или проверка завершились с ошибками;
+            источник в этом случае не удаляется, а неполная копия удаляется
+    """
+    if os.path.isdir(src) and not os.path.islink(src):
+        stats = ParallelCopier(progress=progress).copy_tree(src, dst)
+    else:
+        stats = CopyStats()
+        started = time.perf_counter()
+        if os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            stats.links += 1
+        else:
+            stats.add_file(copy_file(src, dst))
+            if progress != None:
+                progress(stats)
+        stats.elapsed = time.perf_counter() - started
+
+    problems = stats.errors or verify_tree(src, dst)
+    if problems:
+        if os.path.lexists(dst):
+            remove_path(dst)
+        invalidate_path(dst, recursive=True)
+        raise OSError(f"Копия {dst} не совпадает с источником, источник сохранен:\n" + "\n".join(problems))
+
+    remove_path(src)
+    invalidate_path(src, recursive=True)
+    return stats
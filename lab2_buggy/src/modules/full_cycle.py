@@ -46,6 +46,7 @@ class FullCycle:
         console_output: str
         new_directory: str
         
+        metadata_cache.new_command()
         tokenized_command: List[str] = shlex_tokenization(input=input_command)
         command_name: str = tokenized_command[0]
         arguments: List[str] = tokenized_command[2:]
@@ -134,7 +135,7 @@ class FullCycle:
                 logging.info(res)
                 return output
 
-            case "grepfrut": # ОШИБКА 2 <- неверное условие, блок должен выполняться при команде grep, а не grepfrut
+            case "grep":
                 grep = CommandGREP(command=tokenized_command, current_dir=current_directory)
                 res = grep.command_grep(args=grep.args, current_dir=grep.current_dir)
                 new_dir = current_directory
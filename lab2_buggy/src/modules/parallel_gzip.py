@@ -0,0 +1,160 @@
+from typing import *
+import zlib
+import time
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+
+
+# Размер блока, сжимаемого одним процессом
+BLOCK_SIZE = 1024 * 1024
+
+# Размер окна deflate: хвост предыдущего блока используется как словарь
+DICTIONARY_SIZE = 32 * 1024
+
+# Пустой финальный блок deflate, завершающий поток
+FINAL_EMPTY_BLOCK = b"\x03\x00"
+
+
+def deflate_block(block: bytes, dictionary: bytes, level: int) -> bytes:
+    """
+    Сжимает блок в raw deflate и выравнивает его по байту (Z_SYNC_FLUSH),
+    чтобы блоки можно было склеить в один поток. Выполняется в процессе пула.
+
+    Args:
+        block (bytes): Данные блока
+        dictionary (bytes): Последние DICTIONARY_SIZE байт предыдущего блока
+        level (int): Уровень сжатия
+
+    Returns:
+        bytes: Сжатый блок без признака конца потока
+    """
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9)
+    return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    """
+    Файловый объект, сжимающий записываемые данные в gzip параллельно
+    (по схеме pigz).
+
+    Поток режется на блоки по BLOCK_SIZE байт, которые сжимаются в пуле
+    процессов; словарем каждого блока служат последние 32 КБ предыдущего,
+    поэтому степень сжатия почти как у обычного gzip. Блоки завершаются
+    Z_SYNC_FLUSH и склеиваются по порядку в один deflate поток, CRC-32
+    считается в основном процессе. Результат - обычный однопотоковый
+    gzip, который читают gzip, gunzip и tarfile.
+
+    Если задан checkpoint_interval, не реже чем через столько несжатых
+    байт на границе блока запоминается контрольная точка: смещение блока
+    в сжатом файле, его смещение в несжатом потоке и словарь (хвост
+    предыдущего блока). С контрольной точки поток можно распаковывать,
+    не читая архив с начала (см. modules.tar_index).
+
+    При workers == 1 блоки сжимаются в основном процессе без пула.
+
+    Attributes:
+        path (str): Путь к создаваемому файлу
+        name (str): То же, что path (по нему tarfile не добавляет архив сам в себя)
+        level (int): Уровень сжатия
+        workers (Optional[int]): Количество процессов (None - по числу ядер)
+        checkpoint_interval (Optional[int]): Интервал контрольных точек (None - без них)
+        checkpoints (List[Tuple[int, int, bytes]]): Контрольные точки
+            (сжатое смещение, несжатое смещение, словарь)
+    """
+
+    def __init__(self, path: str, level: int = 6, workers: Optional[int] = None,
+                 checkpoint_interval: Optional[int] = None):
+        self.path = path
+        self.name = path
+        self.level = level
+        self.workers = workers
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints: List[Tuple[int, int, bytes]] = []
+        self._file = open(path, "wb")
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+        self._max_pending = (workers or 4) * 4
+        self._pending: Deque[Tuple[Future, Optional[Tuple[int, bytes]]]] = deque()
+        self._block_offset = 0
+        self._last_checkpoint: Optional[int] = None
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._crc = 0
+        self._size = 0
+        self.closed = False
+        self._file.write(b"\x1f\x8b\x08\x00" + struct.pack("<I", int(time.time())) + b"\x00\xff")
+
+    def write(self, data: bytes) -> int:
+        """
+        Принимает очередную порцию несжатых данных.
+
+        Args:
+            data (bytes): Данные
+
+        Returns:
+            int: Количество принятых байт
+        """
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:BLOCK_SIZE]))
+            del self._buffer[:BLOCK_SIZE]
+        return len(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def _submit(self, block: bytes):
+        checkpoint = None
+        if self.checkpoint_interval != None and (self._last_checkpoint == None or
+                                                 self._block_offset - self._last_checkpoint >= self.checkpoint_interval):
+            checkpoint = (self._block_offset, self._dictionary)
+            self._last_checkpoint = self._block_offset
+
+        if self._executor == None:
+            self._write_block(deflate_block(block, self._dictionary, self.level), checkpoint)
+        else:
+            self._pending.append((self._executor.submit(deflate_block, block, self._dictionary, self.level), checkpoint))
+        self._dictionary = block[-DICTIONARY_SIZE:]
+        self._block_offset += len(block)
+        while len(self._pending) > self._max_pending:
+            self._write_block(*self._pending_result())
+
+    def _pending_result(self) -> Tuple[bytes, Optional[Tuple[int, bytes]]]:
+        future, checkpoint = self._pending.popleft()
+        return future.result(), checkpoint
+
+    def _write_block(self, compressed: bytes, checkpoint: Optional[Tuple[int, bytes]]):
+        if checkpoint != None:
+            self.checkpoints.append((self._file.tell(), checkpoint[0], checkpoint[1]))
+        self._file.write(compressed)
+
+    def close(self):
+        """
+        Досжимает остаток, записывает конец потока и трейлер gzip.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._write_block(*self._pending_result())
+            self._file.write(FINAL_EMPTY_BLOCK)
+            self._file.write(struct.pack("<II", self._crc, self._size & 0xFFFFFFFF))
+        finally:
+            if self._executor != None:
+                self._executor.shutdown(cancel_futures=True)
+            self._file.close()
+
+    def __enter__(self) -> "ParallelGzipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
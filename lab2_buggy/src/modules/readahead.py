@@ -0,0 +1,148 @@
+from typing import *
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from modules.copy_engine import is_sparse
+
+
+# Объем прочитанных заранее, но еще не обработанных данных
+DEFAULT_BUFFER_SIZE = 64 * 1024 * 1024
+
+# Файлы крупнее этого размера не читаются заранее целиком: читатель только
+# подсказывает ядру (POSIX_FADV_WILLNEED), а файл читает сам архиватор
+MAX_PREFETCH_SIZE = 16 * 1024 * 1024
+
+DEFAULT_READERS = 2
+
+
+class StageTimings:
+    """
+    Время стадий конвейера чтения и архивации.
+
+    Attributes:
+        read (float): Суммарное время чтения в потоках-читателях
+        wait (float): Время, которое архиватор ждал данных
+        archive (float): Время работы архиватора (сжатие и запись)
+        elapsed (float): Общее время
+        prefetched_bytes (int): Прочитано заранее байт
+    """
+
+    def __init__(self):
+        self.read = 0.0
+        self.wait = 0.0
+        self.archive = 0.0
+        self.elapsed = 0.0
+        self.prefetched_bytes = 0
+        self._lock = threading.Lock()
+
+    def add_read(self, seconds: float, size: int):
+        with self._lock:
+            self.read += seconds
+            self.prefetched_bytes += size
+
+    def summary(self) -> str:
+        """
+        Форматирует время стадий и определяет узкое место.
+
+        Returns:
+            str: Время чтения, ожидания и архивации
+        """
+        bound = "чтение (I/O)" if self.wait > self.archive else "сжатие и запись (CPU)"
+        return (f"Чтение: {self.read:.2f} с ({self.prefetched_bytes / (1024 * 1024):.2f} МБ заранее), "
+                f"ожидание данных: {self.wait:.2f} с, архивация: {self.archive:.2f} с, "
+                f"всего: {self.elapsed:.2f} с; узкое место: {bound}")
+
+
+def _fadvise(fd: int, advice_name: str):
+    advice = getattr(os, advice_name, None)
+    if advice != None and hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+class ReadAheadPipeline:
+    """
+    Конвейер упреждающего чтения файлов для архиваторов.
+
+    Потоки-читатели читают следующие файлы списка, пока архиватор сжимает
+    текущий, с подсказками ядру posix_fadvise (SEQUENTIAL, WILLNEED).
+    Содержимое отдается строго в порядке списка; объем прочитанных, но
+    не отданных данных ограничен buffer_size. Для крупных и разреженных
+    файлов вместо содержимого отдается None - такие файлы архиватор
+    читает сам (разреженные - чтобы сохранить дыры).
+
+    Attributes:
+        paths (List[str]): Файлы в порядке архивации
+        readers (int): Количество потоков-читателей
+        buffer_size (int): Предел объема данных в буфере
+        timings (StageTimings): Время стадий
+    """
+
+    def __init__(self, paths: List[str], readers: int = DEFAULT_READERS,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.paths = paths
+        self.readers = readers
+        self.buffer_size = buffer_size
+        self.timings = StageTimings()
+
+    def _read(self, path: str) -> Optional[bytes]:
+        started = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                fd = f.fileno()
+                stat_info = os.fstat(fd)
+                _fadvise(fd, "POSIX_FADV_SEQUENTIAL")
+                _fadvise(fd, "POSIX_FADV_WILLNEED")
+                if stat_info.st_size > MAX_PREFETCH_SIZE or is_sparse(stat_info):
+                    return None
+                data = f.read()
+        except OSError:
+            # Ошибку покажет архиватор при собственном чтении файла
+            return None
+        self.timings.add_read(time.perf_counter() - started, len(data))
+        return data
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[bytes]]]:
+        """
+        Отдает файлы списка по порядку.
+
+        Yields:
+            Tuple[str, Optional[bytes]]: Путь и содержимое файла (None - читать самостоятельно)
+        """
+        started = time.perf_counter()
+        pending: Deque[Tuple[str, int, Future]] = deque()
+        in_flight = 0
+        next_index = 0
+        with ThreadPoolExecutor(max_workers=self.readers) as executor:
+            try:
+                while True:
+                    while next_index < len(self.paths) and (not pending or in_flight < self.buffer_size):
+                        path = self.paths[next_index]
+                        next_index += 1
+                        try:
+                            size = min(os.path.getsize(path), MAX_PREFETCH_SIZE)
+                        except OSError:
+                            size = 0
+                        pending.append((path, size, executor.submit(self._read, path)))
+                        in_flight += size
+                    if not pending:
+                        break
+
+                    path, size, future = pending.popleft()
+                    waited = time.perf_counter()
+                    data = future.result()
+                    self.timings.wait += time.perf_counter() - waited
+                    in_flight -= size
+
+                    consumed = time.perf_counter()
+                    yield path, data
+                    self.timings.archive += time.perf_counter() - consumed
+            finally:
+                for path, size, future in pending:
+                    future.cancel()
+                self.timings.elapsed = time.perf_counter() - started
@@ -0,0 +1,235 @@
+from typing import *
+import io
+import os
+import zlib
+import json
+import base64
+import bisect
+import fnmatch
+
+from modules.valid_and_path_ops import *
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# Интервал контрольных точек в несжатом потоке: чем он меньше, тем меньше
+# данных распаковывается до нужного элемента и тем больше индекс
+CHECKPOINT_INTERVAL = 16 * 1024 * 1024
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class IndexedGzipReader(io.RawIOBase):
+    """
+    Файловый объект для чтения несжатого потока tar.gz с произвольного
+    места. При переходе назад или далеко вперед распаковка начинается с
+    ближайшей предшествующей контрольной точки: с ее сжатого смещения и
+    со словарем, которым сжимался блок.
+
+    Attributes:
+        path (str): Путь к архиву
+        checkpoints (List[Tuple[int, int, bytes]]): Контрольные точки
+            (сжатое смещение, несжатое смещение, словарь), по возрастанию
+    """
+
+    def __init__(self, path: str, checkpoints: List[Tuple[int, int, bytes]]):
+        super().__init__()
+        self.path = path
+        self.checkpoints = checkpoints
+        self._offsets = [checkpoint[1] for checkpoint in checkpoints]
+        self._raw = open(path, "rb")
+        self._decompressor = None
+        self._decoded = 0
+        # Распакованные, но еще не прочитанные данные; удаление из начала
+        # bytearray не копирует остаток, поэтому чтение мелкими порциями линейно
+        self._buffer = bytearray()
+        self._position = 0
+        self.decompressed_bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Поиск от конца потока не поддерживается")
+        self._position = offset
+        return offset
+
+    def _restart(self, target: int):
+        index = bisect.bisect_right(self._offsets, target) - 1
+        compressed_offset, uncompressed_offset, dictionary = self.checkpoints[max(index, 0)]
+        self._raw.seek(compressed_offset)
+        if dictionary:
+            self._decompressor = zlib.decompressobj(-15, zdict=dictionary)
+        else:
+            self._decompressor = zlib.decompressobj(-15)
+        self._decoded = uncompressed_offset
+        self._buffer.clear()
+
+    def _fill(self) -> bool:
+        if self._decompressor.eof:
+            return False
+        chunk = self._raw.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return False
+        data = self._decompressor.decompress(chunk)
+        self.decompressed_bytes += len(data)
+        self._buffer += data
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        # Буфер начинается с несжатого смещения self._decoded
+        buffer_end = self._decoded + len(self._buffer)
+        if self._decompressor == None or self._position < self._decoded or (
+                self._position > buffer_end and
+                bisect.bisect_right(self._offsets, self._position) > bisect.bisect_right(self._offsets, buffer_end)):
+            self._restart(self._position)
+
+        while self._decoded + len(self._buffer) <= self._position:
+            self._decoded += len(self._buffer)
+            self._buffer.clear()
+            if not self._fill():
+                return b""
+        del self._buffer[:self._position - self._decoded]
+        self._decoded = self._position
+
+        while size < 0 or len(self._buffer) < size:
+            if not self._fill():
+                break
+        count = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        result = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        self._decoded += count
+        self._position = self._decoded
+        return result
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+class TarIndex:
+    """
+    Индекс элементов tar.gz архива для произвольного доступа.
+
+    Хранится рядом с архивом в файле <archive>.idx (JSON): контрольные
+    точки gzip потока (их записывает ParallelGzipWriter) и несжатое
+    смещение заголовка каждого элемента. Индекс действителен, пока у
+    архива не изменились размер и время изменения.
+
+    Attributes:
+        archive_path (str): Путь к архиву
+        checkpoints (List[Tuple[int, int, bytes]]): Контрольные точки gzip потока
+        members (List[Tuple[str, int, int, str, str]]): Элементы
+            (имя, смещение заголовка, размер, тип, цель ссылки)
+    """
+
+    def __init__(self, archive_path: str, checkpoints: List[Tuple[int, int, bytes]],
+                 members: List[Tuple[str, int, int, str, str]]):
+        self.archive_path = archive_path
+        self.checkpoints = checkpoints
+        self.members = members
+
+    @staticmethod
+    def index_path(archive_path: str) -> str:
+        return archive_path + INDEX_SUFFIX
+
+    def save(self):
+        """
+        Атомарно записывает индекс рядом с архивом.
+        """
+        stat_info = os.stat(self.archive_path)
+        data = {
+            "version": INDEX_VERSION,
+            "archive_size": stat_info.st_size,
+            "archive_mtime": stat_info.st_mtime_ns,
+            "checkpoints": [[compressed, uncompressed, base64.b64encode(zlib.compress(dictionary)).decode("ascii")]
+                            for compressed, uncompressed, dictionary in self.checkpoints],
+            "members": self.members,
+        }
+        path = self.index_path(self.archive_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        invalidate_path(path)
+
+    @classmethod
+    def load(cls, archive_path: str) -> Optional["TarIndex"]:
+        """
+        Загружает индекс архива.
+
+        Args:
+            archive_path (str): Путь к архиву
+
+        Returns:
+            Optional[TarIndex]: Индекс или None, если его нет или он устарел
+        """
+        path = cls.index_path(archive_path)
+        if not cached_isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            stat_info = os.stat(archive_path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Ошибка чтения индекса {path}: {e}")
+            return None
+        if (data.get("version") != INDEX_VERSION or data.get("archive_size") != stat_info.st_size
+                or data.get("archive_mtime") != stat_info.st_mtime_ns):
+            return None
+        checkpoints = [(compressed, uncompressed, zlib.decompress(base64.b64decode(dictionary)))
+                       for compressed, uncompressed, dictionary in data["checkpoints"]]
+        return cls(archive_path, checkpoints, [tuple(member) for member in data["members"]])
+
+    def select(self, patterns: List[str]) -> List[Tuple[str, int, int, str, str]]:
+        """
+        Отбирает элементы по шаблонам glob (по полному имени, последней
+        части имени или префиксу-директории "dir/").
+
+        Args:
+            patterns (List[str]): Шаблоны (пустой список - все элементы)
+
+        Returns:
+            List[Tuple[str, int, int, str, str]]: Элементы в порядке архива
+        """
+        if not patterns:
+            return list(self.members)
+        return [member for member in self.members if member_matches(member[0], patterns)]
+
+    def open_reader(self) -> IndexedGzipReader:
+        return IndexedGzipReader(self.archive_path, self.checkpoints)
+
+
+def member_matches(name: str, patterns: List[str]) -> bool:
+    """
+    Проверяет, подходит ли имя элемента архива под один из шаблонов glob.
+
+    Args:
+        name (str): Имя элемента
+        patterns (List[str]): Шаблоны
+
+    Returns:
+        bool: True если имя подходит
+    """
+    base = os.path.basename(name.rstrip("/"))
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(base, pattern):
+            return True
+        if pattern.endswith("/") and (name + "/").startswith(pattern):
+            return True
+    return False
@@ -0,0 +1,178 @@
+from typing import *
+import os
+import json
+import time
+import stat
+import tarfile
+
+from modules.valid_and_path_ops import *
+from modules.copy_engine import remove_path
+
+
+SNAPSHOT_VERSION = 1
+
+# Служебный элемент инкрементального архива: уровень и список удаленных путей.
+# Записывается первым элементом и не распаковывается как файл
+INCREMENTAL_META_NAME = ".tar-incremental.json"
+
+
+class SnapshotManifest:
+    """
+    Снимок состояния директории для инкрементальных tar архивов (аналог
+    --listed-incremental в GNU tar).
+
+    Для каждого объекта по имени в архиве хранятся устройство, inode,
+    mtime (нс), размер и тип. Следующий архив цепочки содержит только
+    новые и измененные файлы, все директории (для восстановления пустых
+    директорий и прав) и список путей, удаленных с прошлого снимка.
+
+    Attributes:
+        entries (Dict[str, List[int]]): Имя в архиве -> [st_dev, st_ino, st_mtime_ns, st_size, st_mode]
+        level (int): Уровень архива, которым был сделан снимок (0 - полный)
+    """
+
+    def __init__(self, entries: Dict[str, List[int]], level: int = 0):
+        self.entries = entries
+        self.level = level
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SnapshotManifest"]:
+        """
+        Загружает снимок с диска.
+
+        Args:
+            path (str): Путь к файлу снимка
+
+        Returns:
+            Optional[SnapshotManifest]: Снимок или None, если файла нет (тогда делается полный архив)
+
+        Raises:
+            ValueError: Если файл снимка поврежден или другой версии
+        """
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"Файл снимка {path} поврежден: {e}")
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия файла снимка {path}")
+        return cls(data["entries"], data["level"])
+
+    def save(self, path: str):
+        """
+        Атомарно записывает снимок на диск.
+
+        Args:
+            path (str): Путь к файлу снимка
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "level": self.level, "entries": self.entries}, f)
+        os.replace(tmp_path, path)
+        invalidate_path(path)
+
+    @classmethod
+    def scan(cls, folder_path: str, arcname: str) -> "SnapshotManifest":
+        """
+        Строит снимок текущего состояния директории.
+
+        Args:
+            folder_path (str): Архивируемая директория
+            arcname (str): Имя директории в архиве
+
+        Returns:
+            SnapshotManifest: Снимок (уровень задается при сравнении)
+        """
+        entries: Dict[str, List[int]] = {}
+        stack = [(folder_path, arcname)]
+        root_stat = os.lstat(folder_path)
+        entries[arcname] = [root_stat.st_dev, root_stat.st_ino, root_stat.st_mtime_ns, 0, root_stat.st_mode]
+        while stack:
+            path, name = stack.pop()
+            with os.scandir(path) as scanned:
+                for entry in scanned:
+                    info = entry.stat(follow_symlinks=False)
+                    entry_name = f"{name}/{entry.name}"
+                    size = 0 if stat.S_ISDIR(info.st_mode) else info.st_size
+                    entries[entry_name] = [info.st_dev, info.st_ino, info.st_mtime_ns, size, info.st_mode]
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, entry_name))
+        return cls(entries)
+
+    def changes_since(self, previous: Optional["SnapshotManifest"]) -> Tuple[Set[str], List[str]]:
+        """
+        Сравнивает снимок с предыдущим и устанавливает уровень архива.
+
+        Args:
+            previous (Optional[SnapshotManifest]): Предыдущий снимок (None - полный архив)
+
+        Returns:
+            Tuple[Set[str], List[str]]: Имена объектов, которые нужно записать
+                (новые и измененные файлы и все директории), и имена, которые
+                нужно удалить перед распаковкой (удаленные и сменившие тип)
+        """
+        if previous == None:
+            self.level = 0
+            return set(self.entries), []
+        self.level = previous.level + 1
+        changed = set()
+        deleted = []
+        for name, entry in self.entries.items():
+            old_entry = previous.entries.get(name)
+            if stat.S_ISDIR(entry[4]) or old_entry != entry:
+                changed.add(name)
+            if old_entry != None and stat.S_IFMT(old_entry[4]) != stat.S_IFMT(entry[4]):
+                # Файл, ставший директорией (или наоборот), сначала удаляется
+                deleted.append(name)
+        deleted.extend(name for name in previous.entries if name not in self.entries)
+        return changed, sorted(deleted)
+
+
+def incremental_meta_member(level: int, deleted: List[str]) -> Tuple[tarfile.TarInfo, bytes]:
+    """
+    Строит служебный элемент инкрементального архива.
+
+    Args:
+        level (int): Уровень архива в цепочке
+        deleted (List[str]): Имена, удаленные с предыдущего уровня
+
+    Returns:
+        Tuple[tarfile.TarInfo, bytes]: Заголовок и содержимое элемента
+    """
+    data = json.dumps({"level": level, "deleted": deleted}, ensure_ascii=False).encode("utf-8")
+    tarinfo = tarfile.TarInfo(INCREMENTAL_META_NAME)
+    tarinfo.size = len(data)
+    tarinfo.mtime = int(time.time())
+    tarinfo.mode = 0o644
+    return tarinfo, data
+
+
+def apply_deletions(destination: str, names: List[str]) -> int:
+    """
+    Удаляет из директории распаковки объекты, удаленные по данным
+    служебного элемента инкрементального архива.
+
+    Args:
+        destination (str): Директория распаковки
+        names (List[str]): Имена в архиве
+
+    Returns:
+        int: Количество удаленных объектов
+
+    Raises:
+        ValueError: Если имя указывает за пределы директории распаковки
+    """
+    root = os.path.realpath(destination)
+    removed = 0
+    for name in names:
+        target = os.path.join(root, name)
+        parent = os.path.realpath(os.path.dirname(target))
+        if os.path.isabs(name) or os.path.commonpath([root, parent]) != root or \
+                os.path.basename(target) in ("", ".", ".."):
+            raise ValueError(f"Недопустимое имя в списке удаленных: {name}")
+        if os.path.lexists(target):
+            remove_path(target)
+            removed += 1
+    return removed
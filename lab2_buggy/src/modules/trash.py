@@ -0,0 +1,324 @@
+from typing import *
+import os
+import time
+import uuid
+import errno
+import queue
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.valid_and_path_ops import *
+from modules.copy_engine import remove_path
+
+
+TRASH_DIR_NAME = ".lab2_trash"
+
+# Сколько секунд при выходе из оболочки ждать завершения фоновой очистки
+SHUTDOWN_TIMEOUT = 10.0
+
+
+def mount_point(path: str) -> str:
+    """
+    Находит точку монтирования файловой системы, на которой лежит путь.
+
+    Args:
+        path (str): Абсолютный путь
+
+    Returns:
+        str: Точка монтирования
+    """
+    path = os.path.realpath(path)
+    device = os.lstat(path).st_dev
+    while path != os.path.dirname(path):
+        parent = os.path.dirname(path)
+        if os.lstat(parent).st_dev != device:
+            break
+        path = parent
+    return path
+
+
+class TrashPurger:
+    """
+    Фоновое удаление содержимого корзин.
+
+    rm -r --trash переименовывает удаляемую директорию в корзину на той же
+    файловой системе (O(1)), а поток-обработчик затем удаляет ее: каждый
+    уровень дерева обходится через os.scandir параллельно в пуле потоков,
+    после чего директории удаляются от самых вложенных к корню.
+
+    Корзина создается в точке монтирования, а если там нет прав на запись -
+    в родительской директории удаляемого объекта. Точка монтирования
+    определяется по st_dev, поэтому для bind-монтирования того же
+    устройства rename в нее завершается EXDEV; тогда используется корзина
+    в родительской директории, а если и это невозможно - объект удаляется
+    сразу. При выходе из оболочки очистка ожидается не дольше
+    SHUTDOWN_TIMEOUT секунд; содержимое, оставшееся в корзине, удаляется
+    при следующей очистке этой корзины.
+
+    Attributes:
+        workers (Optional[int]): Количество потоков удаления
+        removed_files (int): Удалено файлов
+        removed_dirs (int): Удалено директорий
+        purged (int): Полностью удалено объектов корзины
+        errors (List[str]): Ошибки удаления
+        current (Optional[str]): Объект, удаляемый в данный момент
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers
+        self.removed_files = 0
+        self.removed_dirs = 0
+        self.purged = 0
+        self.errors: List[str] = []
+        self.current: Optional[str] = None
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._trash_dirs: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def trash_dir_for(self, path: str) -> str:
+        """
+        Возвращает (и при необходимости создает) корзину на файловой системе пути.
+
+        Args:
+            path (str): Удаляемый путь
+
+        Returns:
+            str: Директория корзины
+        """
+        device = os.lstat(path).st_dev
+        trash_dir = self._trash_dirs.get(device)
+        if trash_dir != None and os.path.isdir(trash_dir):
+            return trash_dir
+
+        for base in (mount_point(path), os.path.dirname(os.path.abspath(path))):
+            candidate = self._create_trash_dir(base, device)
+            if candidate != None:
+                self._trash_dirs[device] = candidate
+                return candidate
+        raise PermissionError(f"Нет прав на создание корзины для {path}")
+
+    @staticmethod
+    def _create_trash_dir(base: str, device: int) -> Optional[str]:
+        """
+        Создает корзину в директории, если она окажется на том же устройстве.
+
+        Args:
+            base (str): Директория, в которой создается корзина
+            device (int): st_dev удаляемого объекта
+
+        Returns:
+            Optional[str]: Директория корзины или None
+        """
+        candidate = os.path.join(base, TRASH_DIR_NAME)
+        try:
+            os.makedirs(candidate, mode=0o700, exist_ok=True)
+        except OSError:
+            return None
+        return candidate if os.lstat(candidate).st_dev == device else None
+
+    def move_to_trash(self, path: str) -> Optional[str]:
+        """
+        Атомарно переносит объект в корзину и ставит ее в очередь на очистку.
+
+        Если rename в корзину точки монтирования завершается EXDEV
+        (bind-монтирование того же устройства), используется корзина в
+        родительской директории объекта, а если не удается и это - объект
+        удаляется сразу.
+
+        Args:
+            path (str): Удаляемый путь
+
+        Returns:
+            Optional[str]: Новый путь объекта в корзине или None, если объект удален сразу
+        """
+        name = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}-{os.path.basename(path.rstrip('/'))}"
+        trash_dir = self.trash_dir_for(path)
+        if not self._rename(path, os.path.join(trash_dir, name)):
+            parent = os.path.dirname(os.path.abspath(path.rstrip('/')))
+            trash_dir = self._create_trash_dir(parent, os.lstat(path).st_dev)
+            if trash_dir == None or not self._rename(path, os.path.join(trash_dir, name)):
+                remove_path(path)
+                invalidate_path(path, recursive=True)
+                return None
+        invalidate_path(path, recursive=True)
+        self._queue.put(trash_dir)
+        self._ensure_started()
+        return os.path.join(trash_dir, name)
+
+    @staticmethod
+    def _rename(path: str, target: str) -> bool:
+        """
+        Переименовывает объект, сообщая о переносе между точками монтирования.
+
+        Returns:
+            bool: False если rename завершился EXDEV
+        """
+        try:
+            os.rename(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            return False
+        return True
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread == None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trash-purger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            trash_dir = self._queue.get()
+            if trash_dir == None:
+                # Признак остановки от shutdown
+                self._queue.task_done()
+                return
+            try:
+                self.purge(trash_dir)
+            finally:
+                self._queue.task_done()
+
+    def purge(self, trash_dir: str):
+        """
+        Удаляет все содержимое корзины.
+
+        Args:
+            trash_dir (str): Директория корзины
+        """
+        try:
+            with os.scandir(trash_dir) as entries:
+                items = [entry.path for entry in entries]
+        except OSError as e:
+            self._add_error(f"{trash_dir}: {e}")
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path in items:
+                self.current = path
+                try:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        self._delete_tree(path, executor)
+                    else:
+                        os.remove(path)
+                        self._count(files=1)
+                    self.purged += 1
+                except FileNotFoundError:
+                    # Уже удалено предыдущей очисткой этой же корзины
+                    pass
+                except OSError as e:
+                    self._add_error(f"{path}: {e}")
+        self.current = None
+
+    def _delete_tree(self, root: str, executor: ThreadPoolExecutor):
+        """
+        Удаляет дерево директорий параллельно по уровням.
+
+        Args:
+            root (str): Корень удаляемого дерева
+            executor (ThreadPoolExecutor): Пул потоков удаления
+        """
+        levels = [[root]]
+        while levels[-1]:
+            subdirs = executor.map(self._clear_files, levels[-1])
+            levels.append([path for level in subdirs for path in level])
+        for level in reversed(levels):
+            list(executor.map(self._remove_dir, level))
+
+    def _clear_files(self, directory: str) -> List[str]:
+        """
+        Удаляет из директории все объекты, кроме поддиректорий.
+
+        Args:
+            directory (str): Директория
+
+        Returns:
+            List[str]: Пути поддиректорий
+        """
+        subdirs = []
+        removed = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        else:
+                            os.unlink(entry.path)
+                            removed += 1
+                    except OSError as e:
+                        self._add_error(f"{entry.path}: {e}")
+        except OSError as e:
+            self._add_error(f"{directory}: {e}")
+        self._count(files=removed)
+        return subdirs
+
+    def _remove_dir(self, directory: str):
+        try:
+            os.rmdir(directory)
+            self._count(dirs=1)
+        except OSError as e:
+            self._add_error(f"{directory}: {e}")
+
+    def _count(self, files: int = 0, dirs: int = 0):
+        with self._lock:
+            self.removed_files += files
+            self.removed_dirs += dirs
+
+    def _add_error(self, message: str):
+        with self._lock:
+            self.errors.append(message)
+
+    def wait(self):
+        """
+        Блокирует вызывающий поток до очистки всех корзин в очереди.
+        """
+        self._queue.join()
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT) -> bool:
+        """
+        Дожидается очистки корзин в очереди (не дольше timeout секунд) и
+        останавливает поток-обработчик. Вызывается при выходе из оболочки.
+
+        Args:
+            timeout (float): Предельное время ожидания
+
+        Returns:
+            bool: True если очередь очищена полностью
+        """
+        with self._lock:
+            thread = self._thread
+        if thread == None or not thread.is_alive():
+            return True
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            logging.warning(f"Фоновая очистка корзины не завершена за {timeout} с, "
+                            f"остаток будет удален при следующей очистке")
+            return False
+        return True
+
+    def format_status(self) -> str:
+        """
+        Форматирует состояние фоновой очистки для вывода в консоль.
+
+        Returns:
+            str: Состояние очистки
+        """
+        running = self._thread != None and self._thread.is_alive() and self._queue.unfinished_tasks > 0
+        lines = [
+            f"Фоновая очистка: {'выполняется' if running else 'простаивает'}",
+            f"Корзин в очереди: {self._queue.unfinished_tasks}",
+            f"Удалено объектов корзины: {self.purged}",
+            f"Удалено файлов: {self.removed_files}, директорий: {self.removed_dirs}",
+        ]
+        if self.current != None:
+            lines.append(f"Удаляется: {self.current}")
+        if self.errors:
+            lines.append(f"Ошибок: {len(self.errors)}\n" + "\n".join(self.errors[-10:]))
+        return "\n".join(lines)
+
+
+trash_purger = TrashPurger()
+atexit.register(trash_purger.shutdown)
@@ -1,9 +1,13 @@
 from typing import *
 import os
+import stat
+import time
 import shlex
 import logging
 import zipfile
 import tarfile
+import threading
+from collections import OrderedDict
 
 from consts import *
 # LOG_FILE = "/var/log/python-lab-2/shell.log"
@@ -35,6 +39,24 @@ commands_list = ["ls", "cd", "cat", "cp", "mv", "rm", "zip", "unzip", "tar", "un
 
 options_list = ["-l", "-r", "-i"]
 
+# Сигнатуры архивов: (смещение, магические байты, тип архива)
+ARCHIVE_SIGNATURES = [
+    (0, b"PK\x03\x04", "zip"),
+    (0, b"PK\x05\x06", "zip"),
+    (0, b"PK\x07\x08", "zip"),
+    (0, b"\x1f\x8b", "gzip"),
+    # "BZh", размер блока '1'-'9' и сигнатура первого блока (или конца пустого потока)
+    *((0, b"BZh%d%s" % (level, block_magic), "bz2")
+      for level in range(1, 10) for block_magic in (b"1AY&SY", b"\x17rE8P\x90")),
+    (0, b"\xfd7zXZ\x00", "xz"),
+    (257, b"ustar", "tar"),
+]
+ARCHIVE_HEADER_SIZE = 512
+
+# Результаты определения типа архива по ключу (st_dev, st_ino, st_mtime_ns, st_size)
+ARCHIVE_CACHE_SIZE = 100_000
+_archive_kind_cache: Dict[tuple, Optional[str]] = {}
+
 
 def write_to_history(history_file: str, command_number: int, command: str):
     """
@@ -103,8 +125,8 @@ def make_path(current_dir: str, path: str) -> str:
         return path
 
 def shlex_tokenization(input: str) -> List[str]:
-    full_arr = [None] * 4
     splitted = shlex.split(input)
+    full_arr = [None] * max(4, len(splitted) + 1)
     for index_of_command in range(len(splitted)):
         full_arr[index_of_command] = splitted[index_of_command]
         
@@ -112,22 +134,246 @@ def shlex_tokenization(input: str) -> List[str]:
 
 
 
+def archive_kind_from_header(header: bytes) -> Optional[str]:
+    """
+    Определяет тип архива по уже прочитанным первым байтам.
+    
+    Args:
+        header (bytes): Начало файла (до ARCHIVE_HEADER_SIZE байт)
+        
+    Returns:
+        Optional[str]: "zip", "gzip", "bz2", "xz", "tar" или None, если сигнатура не найдена
+    """
+    for offset, magic, name in ARCHIVE_SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return name
+    return None
+
+
+def archive_kind(path: str, stat_info: os.stat_result = None) -> Optional[str]:
+    """
+    Определяет тип архива по первым байтам файла.
+    
+    Файл открывается не более одного раза и читается не более
+    ARCHIVE_HEADER_SIZE байт; результат кэшируется по (inode, mtime, размер).
+    
+    Args:
+        path (str): Путь к файлу
+        stat_info (os.stat_result): Уже полученные метаданные файла (например, из DirEntry.stat())
+        
+    Returns:
+        Optional[str]: "zip", "gzip", "bz2", "xz", "tar" или None, если файл не архив
+    """
+    try:
+        if stat_info == None:
+            stat_info = os.stat(path)
+    except OSError:
+        return None
+    
+    key = (stat_info.st_dev, stat_info.st_ino, stat_info.st_mtime_ns, stat_info.st_size)
+    if key in _archive_kind_cache:
+        return _archive_kind_cache[key]
+    
+    try:
+        with open(path, "rb") as f:
+            kind = archive_kind_from_header(f.read(ARCHIVE_HEADER_SIZE))
+    except OSError:
+        return None
+    
+    if len(_archive_kind_cache) >= ARCHIVE_CACHE_SIZE:
+        del _archive_kind_cache[next(iter(_archive_kind_cache))]
+    _archive_kind_cache[key] = kind
+    return kind
+
 def colorize_dirs(list_of_objects: List[str], current_dir):
     res_arr: List[str] = []
     for obj in list_of_objects:
         path = make_path(current_dir=current_dir, path=obj)
-        if os.path.isdir(path):
+        if cached_isdir(path):
             res_arr.append(f"\033[34m{obj}\033[0m")
-        elif zipfile.is_zipfile(path) or tarfile.is_tarfile(path):
+        elif archive_kind(path) != None:
             res_arr.append(f"\033[31m{obj}\033[0m")
-        elif os.path.isfile(path):
+        elif cached_isfile(path):
             res_arr.append(obj)
         else:
             ValueError("Ошибка при получении данных")
     return res_arr
 
+def colorize_entries(entries: List[os.DirEntry]) -> List[str]:
+    """
+    Раскрашивает объекты директории, полученные из os.scandir.
+    
+    Тип объекта берется из кэша DirEntry, поэтому для директорий
+    не выполняется ни одного дополнительного системного вызова, а файлы
+    проверяются на архив по нескольким байтам заголовка.
+    
+    Args:
+        entries (List[os.DirEntry]): Объекты директории
+        
+    Returns:
+        List[str]: Имена объектов с цветовым выделением директорий и архивов
+    """
+    res_arr: List[str] = []
+    for entry in entries:
+        if entry.is_dir():
+            res_arr.append(f"\033[34m{entry.name}\033[0m")
+        elif entry.is_file():
+            if archive_kind(entry.path, entry.stat()) != None:
+                res_arr.append(f"\033[31m{entry.name}\033[0m")
+            else:
+                res_arr.append(entry.name)
+    return res_arr
+
+class MetadataCache:
+    """
+    Общий для всех команд кэш метаданных путей с LRU-вытеснением.
+    
+    Запись о пути считается актуальной, пока не изменилось mtime его
+    родительской директории (создание, удаление и переименование объектов
+    меняют mtime директории). Время изменения каждой директории проверяется
+    не чаще одного раза за команду. Поскольку запись файла не меняет mtime
+    директории, кэш отвечает только на вопросы о существовании и типе пути.
+    Симлинки не кэшируются: их цель может лежать в другой директории, и
+    mtime родителя ссылки не отражает ее появление или удаление.
+    Команды, изменяющие файловую систему, сбрасывают затронутые записи
+    через invalidate.
+    
+    Attributes:
+        max_entries (int): Максимальное число записей в кэше
+        hits (int): Количество попаданий в кэш
+        misses (int): Количество промахов
+        invalidations (int): Количество удаленных при инвалидации записей
+    """
+    
+    # Директории, измененные за последние RACY_WINDOW_NS, не используются для
+    # проверки: изменение в пределах того же тика часов не изменит их mtime
+    RACY_WINDOW_NS = 2_000_000_000
+    
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[os.stat_result], int]]" = OrderedDict()
+        self._dir_mtimes: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+    
+    def new_command(self):
+        """
+        Начинает новую команду: mtime директорий будут проверены заново.
+        """
+        with self._lock:
+            self._dir_mtimes.clear()
+    
+    def _dir_mtime(self, directory: str) -> Optional[int]:
+        if directory not in self._dir_mtimes:
+            try:
+                self._dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            except (OSError, ValueError):
+                self._dir_mtimes[directory] = None
+        return self._dir_mtimes[directory]
+    
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        """
+        Возвращает метаданные пути (с переходом по симлинкам) из кэша или диска.
+        
+        Args:
+            path (str): Путь к объекту
+            
+        Returns:
+            Optional[os.stat_result]: Метаданные или None, если пути не существует
+        """
+        path = os.path.normpath(path)
+        parent = os.path.dirname(path)
+        with self._lock:
+            parent_mtime = self._dir_mtime(parent)
+            cached = self._entries.get(path)
+            if cached != None and parent_mtime != None and cached[1] == parent_mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+        
+        is_link = False
+        try:
+            stat_info = os.lstat(path)
+            if stat.S_ISLNK(stat_info.st_mode):
+                is_link = True
+                stat_info = os.stat(path)
+        except (OSError, ValueError):
+            stat_info = None
+        
+        if not is_link and parent_mtime != None and time.time_ns() - parent_mtime > self.RACY_WINDOW_NS:
+            with self._lock:
+                self._entries[path] = (stat_info, parent_mtime)
+                self._entries.move_to_end(path)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return stat_info
+    
+    def invalidate(self, path: str, recursive: bool = False):
+        """
+        Удаляет из кэша запись о пути (и обо всех вложенных путях при recursive).
+        
+        Args:
+            path (str): Измененный путь
+            recursive (bool): Удалить также записи обо всех путях внутри path
+        """
+        path = os.path.normpath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            removed = [path] if path in self._entries else []
+            if recursive:
+                removed += [cached for cached in self._entries if cached.startswith(prefix)]
+            for cached in removed:
+                del self._entries[cached]
+            self.invalidations += len(removed)
+            self._dir_mtimes.pop(path, None)
+            self._dir_mtimes.pop(os.path.dirname(path), None)
+            if recursive:
+                for directory in [d for d in self._dir_mtimes if d.startswith(prefix)]:
+                    del self._dir_mtimes[directory]
+    
+    def clear(self):
+        """
+        Полностью очищает кэш.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._dir_mtimes.clear()
+    
+    def format_stats(self) -> str:
+        """
+        Форматирует счетчики кэша для вывода или логирования.
+        
+        Returns:
+            str: Статистика кэша
+        """
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return (f"Кэш метаданных: {len(self._entries)} записей, попаданий {self.hits}, "
+                f"промахов {self.misses} ({hit_rate:.1f}% попаданий), инвалидаций {self.invalidations}")
+
+
+metadata_cache = MetadataCache()
+
+
+def cached_exists(path: str) -> bool:
+    return metadata_cache.stat(path) != None
+
+def cached_isdir(path: str) -> bool:
+    stat_info = metadata_cache.stat(path)
+    return stat_info != None and stat.S_ISDIR(stat_info.st_mode)
+
+def cached_isfile(path: str) -> bool:
+    stat_info = metadata_cache.stat(path)
+    return stat_info != None and stat.S_ISREG(stat_info.st_mode)
+
+def invalidate_path(path: str, recursive: bool = False):
+    metadata_cache.invalidate(path, recursive=recursive)
+
 def path_exists(path: str) -> bool:
-    return os.path.exists(path=path)
+    return cached_exists(path)
     
 
 
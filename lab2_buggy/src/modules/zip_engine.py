@@ -0,0 +1,445 @@
+from typing import *
+import os
+import zlib
+import struct
+import time
+import fnmatch
+import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+
+from modules.valid_and_path_ops import *
+from modules.compression_policy import choose_zip_compression
+
+
+# Объем исходных данных, одновременно находящихся в сжатии (по умолчанию)
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def deflate_file(path: str, level: int = zlib.Z_DEFAULT_COMPRESSION) -> Tuple[int, bytes, int]:
+    """
+    Сжимает файл в raw deflate поток, как это делает zipfile.
+    Выполняется в процессе пула.
+
+    Args:
+        path (str): Путь к файлу
+        level (int): Уровень сжатия zlib
+
+    Returns:
+        Tuple[int, bytes, int]: CRC-32, сжатые данные и исходный размер
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    parts = []
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            parts.append(compressor.compress(chunk))
+    parts.append(compressor.flush())
+    return crc, b"".join(parts), size
+
+
+def write_raw_member(zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, chunks: Iterable[bytes]):
+    """
+    Записывает в архив уже сжатый элемент: локальный заголовок строится
+    по zinfo (CRC, размеры и метод сжатия должны быть заполнены), данные
+    копируются без изменений. Центральный каталог дописывает сам ZipFile
+    при закрытии.
+
+    Args:
+        zipf (zipfile.ZipFile): Архив, открытый на запись
+        zinfo (zipfile.ZipInfo): Описание элемента
+        chunks (Iterable[bytes]): Сжатые данные элемента
+    """
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    with zipf._lock:
+        if zipf._seekable:
+            zipf.fp.seek(zipf.start_dir)
+        zinfo.header_offset = zipf.fp.tell()
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zipf.fp.write(zinfo.FileHeader(zip64))
+        for chunk in chunks:
+            zipf.fp.write(chunk)
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = zipf.fp.tell()
+
+
+def file_crc32(path: str) -> int:
+    """
+    Вычисляет CRC-32 содержимого файла.
+
+    Args:
+        path (str): Путь к файлу
+
+    Returns:
+        int: CRC-32
+    """
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+def dos_time_slot(date_time: Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+    Приводит время к точности поля времени zip (2 секунды).
+
+    Args:
+        date_time (Tuple[int, ...]): Время в формате ZipInfo.date_time
+
+    Returns:
+        Tuple[int, ...]: Время с секундами, округленными вниз до четных
+    """
+    return (*date_time[:5], date_time[5] // 2 * 2)
+
+
+def read_raw_member(archive, zinfo: zipfile.ZipInfo) -> Iterator[bytes]:
+    """
+    Читает сжатые данные элемента архива без распаковки.
+
+    Args:
+        archive: Файловый объект существующего архива, открытый на чтение
+        zinfo (zipfile.ZipInfo): Элемент из центрального каталога
+
+    Yields:
+        bytes: Фрагменты сжатых данных
+
+    Raises:
+        zipfile.BadZipFile: Если по смещению элемента нет локального заголовка
+    """
+    archive.seek(zinfo.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, archive.read(zipfile.sizeFileHeader))
+    if header[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Поврежден локальный заголовок элемента {zinfo.filename}")
+    archive.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+    remaining = zinfo.compress_size
+    while remaining > 0:
+        chunk = archive.read(min(remaining, READ_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Элемент {zinfo.filename} обрезан")
+        remaining -= len(chunk)
+        yield chunk
+
+
+class ZipStats:
+    """
+    Итоги создания архива.
+
+    Attributes:
+        files (int): Записано элементов
+        bytes_in (int): Исходный объем данных
+        bytes_out (int): Объем сжатых данных
+        reused (int): Элементов, скопированных из прежнего архива без пересжатия
+        reused_bytes (int): Исходный объем скопированных элементов
+        compressed (int): Элементов, сжатых заново
+        compressed_bytes (int): Исходный объем сжатых заново элементов
+        removed (int): Элементов прежнего архива, которых больше нет в директории
+        elapsed (float): Время создания архива в секундах
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.reused = 0
+        self.reused_bytes = 0
+        self.compressed = 0
+        self.compressed_bytes = 0
+        self.removed = 0
+        self.elapsed = 0.0
+
+    def add(self, zinfo: zipfile.ZipInfo, reused: bool = False):
+        self.files += 1
+        self.bytes_in += zinfo.file_size
+        self.bytes_out += zinfo.compress_size
+        if reused:
+            self.reused += 1
+            self.reused_bytes += zinfo.file_size
+        else:
+            self.compressed += 1
+            self.compressed_bytes += zinfo.file_size
+
+    def summary(self) -> str:
+        """
+        Форматирует итоги для вывода в консоль.
+
+        Returns:
+            str: Число файлов, степень сжатия и скорость
+        """
+        ratio = self.bytes_out / self.bytes_in * 100 if self.bytes_in else 100.0
+        megabytes = self.bytes_in / (1024 * 1024)
+        throughput = megabytes / self.elapsed if self.elapsed > 0 else 0.0
+        result = (f"Файлов: {self.files}, {megabytes:.2f} МБ -> {self.bytes_out / (1024 * 1024):.2f} МБ "
+                  f"({ratio:.1f}%) за {self.elapsed:.2f} с ({throughput:.2f} МБ/с)")
+        if self.reused or self.removed:
+            result += (f"\nБез пересжатия: {self.reused} ({self.reused_bytes / (1024 * 1024):.2f} МБ), "
+                       f"сжато заново: {self.compressed} ({self.compressed_bytes / (1024 * 1024):.2f} МБ), "
+                       f"удалено из архива: {self.removed}")
+        return result
+
+
+class ParallelZipWriter:
+    """
+    Создание zip архива с параллельным сжатием элементов.
+
+    Файлы сжимаются в пуле процессов (zlib в одном процессе упирается в
+    одно ядро), а готовые deflate потоки вместе с CRC записываются в
+    ZipFile строго в исходном порядке. Одновременно в сжатии находится не
+    больше memory_budget байт исходных данных; файлы крупнее бюджета
+    сжимаются потоково в основном процессе через zipfile.
+
+    При обновлении существующего архива (update) элементы, у которых
+    совпадают размер и время изменения (или, если время отличается либо
+    попадает в интервал записи прежнего архива, CRC-32 содержимого),
+    копируются из прежнего архива байт в байт без пересжатия. Новый архив
+    пишется во временный файл и атомарно заменяет прежний.
+
+    При workers == 1 файлы сжимаются в основном процессе без пула.
+
+    В адаптивном режиме метод и уровень сжатия каждого файла выбираются
+    через choose_zip_compression: уже сжатые данные сохраняются без
+    сжатия (ZIP_STORED) в основном процессе, не занимая пул.
+
+    Получаемый архив - обычный zip (метод deflate, локальные заголовки с
+    известными размерами), его читают zipfile, CommandUNZIP и unzip.
+
+    Attributes:
+        workers (Optional[int]): Количество процессов (None - по числу ядер)
+        memory_budget (int): Предел объема исходных данных в сжатии
+        adaptive (bool): Выбирать метод и уровень сжатия для каждого файла
+    """
+
+    def __init__(self, workers: Optional[int] = None, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 adaptive: bool = False):
+        self.workers = workers
+        self.memory_budget = memory_budget
+        self.adaptive = adaptive
+
+    @staticmethod
+    def reusable_member(previous: Optional[zipfile.ZipFile], path: str, zinfo: zipfile.ZipInfo,
+                        archive_slot: Optional[Tuple[int, ...]] = None) -> Optional[zipfile.ZipInfo]:
+        """
+        Ищет в прежнем архиве неизмененную копию файла.
+
+        Время в zip хранится с точностью 2 секунды, поэтому файл, измененный
+        в тот же интервал, в который писался прежний архив, может сохранить
+        и размер, и время элемента. Для таких файлов дополнительно
+        сравнивается CRC-32.
+
+        Args:
+            previous (Optional[zipfile.ZipFile]): Прежний архив
+            path (str): Путь к файлу
+            zinfo (zipfile.ZipInfo): Описание файла, построенное по диску
+            archive_slot (Optional[Tuple[int, ...]]): Время записи прежнего архива (см. dos_time_slot)
+
+        Returns:
+            Optional[zipfile.ZipInfo]: Элемент прежнего архива или None, если файл нужно сжать заново
+        """
+        if previous == None:
+            return None
+        old = previous.NameToInfo.get(zinfo.filename)
+        # Зашифрованные элементы и элементы с дескриптором данных не копируются
+        if old == None or old.is_dir() or old.flag_bits & 0x09 or old.file_size != zinfo.file_size:
+            return None
+        file_slot = dos_time_slot(zinfo.date_time)
+        if dos_time_slot(old.date_time) == file_slot and (archive_slot == None or file_slot < archive_slot):
+            return old
+        return old if file_crc32(path) == old.CRC else None
+
+    def write(self, archive_path: str, members: List[Tuple[str, str]], update: bool = False) -> ZipStats:
+        """
+        Создает архив из списка файлов.
+
+        Args:
+            archive_path (str): Путь к создаваемому архиву
+            members (List[Tuple[str, str]]): Пары (путь к файлу, имя в архиве)
+            update (bool): Переиспользовать неизмененные элементы существующего архива
+
+        Returns:
+            ZipStats: Итоги создания архива
+        """
+        stats = ZipStats()
+        started = time.perf_counter()
+        previous = None
+        target_path = archive_path
+        if update and zipfile.is_zipfile(archive_path):
+            previous = zipfile.ZipFile(archive_path, 'r')
+            target_path = f"{archive_path}.tmp"
+
+        try:
+            self._write_members(target_path, members, previous, stats)
+            if previous != None:
+                stats.removed = len(set(previous.NameToInfo) - {arcname for path, arcname in members})
+                previous.close()
+                os.replace(target_path, archive_path)
+        finally:
+            if previous != None:
+                previous.close()
+                # После успешной замены временного файла уже нет
+                if os.path.exists(target_path):
+                    os.remove(target_path)
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _write_members(self, archive_path: str, members: List[Tuple[str, str]],
+                       previous: Optional[zipfile.ZipFile], stats: ZipStats):
+        """
+        Записывает элементы в новый архив в исходном порядке.
+
+        Args:
+            archive_path (str): Путь к создаваемому архиву
+            members (List[Tuple[str, str]]): Пары (путь к файлу, имя в архиве)
+            previous (Optional[zipfile.ZipFile]): Прежний архив для переиспользования элементов
+            stats (ZipStats): Итоги создания архива
+        """
+        pending: Deque[Tuple[str, zipfile.ZipInfo, Union[Future, zipfile.ZipInfo, None], Optional[int]]] = deque()
+        in_flight = 0
+        next_index = 0
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers != 1 else None
+        archive_slot = None
+        if previous != None:
+            archive_slot = dos_time_slot(time.localtime(os.stat(previous.filename).st_mtime)[:6])
+
+        try:
+            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                while True:
+                    while next_index < len(members) and (not pending or in_flight < self.memory_budget):
+                        path, arcname = members[next_index]
+                        next_index += 1
+                        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                        old = self.reusable_member(previous, path, zinfo, archive_slot)
+                        if old != None:
+                            pending.append((path, zinfo, old, None))
+                            continue
+                        zinfo.compress_type, level = zipfile.ZIP_DEFLATED, None
+                        if self.adaptive:
+                            zinfo.compress_type, level = choose_zip_compression(path, zinfo.file_size)
+                        if (executor == None or zinfo.compress_type == zipfile.ZIP_STORED
+                                or zinfo.file_size > self.memory_budget):
+                            pending.append((path, zinfo, None, level))
+                        else:
+                            future = executor.submit(deflate_file, path, zlib.Z_DEFAULT_COMPRESSION if level == None else level)
+                            pending.append((path, zinfo, future, level))
+                            in_flight += zinfo.file_size
+
+                    if not pending:
+                        break
+                    path, zinfo, action, level = pending.popleft()
+                    if action == None:
+                        zipf.write(path, zinfo.filename, compress_type=zinfo.compress_type, compresslevel=level)
+                        stats.add(zipf.getinfo(zinfo.filename))
+                        continue
+
+                    if isinstance(action, zipfile.ZipInfo):
+                        zinfo.compress_type = action.compress_type
+                        zinfo.compress_size = action.compress_size
+                        zinfo.CRC = action.CRC
+                        write_raw_member(zipf, zinfo, read_raw_member(previous.fp, action))
+                        stats.add(zinfo, reused=True)
+                        continue
+
+                    crc, data, file_size = action.result()
+                    in_flight -= zinfo.file_size
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                    zinfo.file_size = file_size
+                    zinfo.compress_size = len(data)
+                    zinfo.CRC = crc
+                    write_raw_member(zipf, zinfo, (data,))
+                    stats.add(zinfo)
+        finally:
+            if executor != None:
+                executor.shutdown(cancel_futures=True)
+
+
+def select_members(zipf: zipfile.ZipFile, patterns: List[str]) -> List[zipfile.ZipInfo]:
+    """
+    Отбирает элементы архива по шаблонам glob. Шаблон сравнивается с
+    полным именем элемента и с его последней частью, а шаблон-директория
+    ("dir/") выбирает все ее содержимое.
+
+    Args:
+        zipf (zipfile.ZipFile): Открытый архив (используется только центральный каталог)
+        patterns (List[str]): Шаблоны glob (пустой список - все элементы)
+
+    Returns:
+        List[zipfile.ZipInfo]: Выбранные элементы в порядке архива
+    """
+    if not patterns:
+        return zipf.infolist()
+    selected = []
+    for zinfo in zipf.infolist():
+        name = zinfo.filename
+        base = os.path.basename(name.rstrip("/"))
+        for pattern in patterns:
+            if (fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(base, pattern)
+                    or (pattern.endswith("/") and name.startswith(pattern))):
+                selected.append(zinfo)
+                break
+    return selected
+
+
+def extract_members(archive_path: str, members: List[zipfile.ZipInfo], destination: str,
+                    workers: int = 1) -> int:
+    """
+    Распаковывает выбранные элементы архива.
+
+    Каждый элемент читается по смещению из центрального каталога, так что
+    с диска читаются только байты выбранных элементов. При workers > 1
+    элементы распаковываются в пуле потоков (zlib отпускает GIL), и у
+    каждого потока свой ZipFile со своим файловым дескриптором.
+
+    Args:
+        archive_path (str): Путь к архиву
+        members (List[zipfile.ZipInfo]): Элементы для распаковки
+        destination (str): Директория назначения
+        workers (int): Количество потоков
+
+    Returns:
+        int: Количество распакованных элементов
+    """
+    if workers <= 1 or len(members) <= 1:
+        with zipfile.ZipFile(archive_path, 'r') as zipf:
+            for zinfo in members:
+                zipf.extract(zinfo, destination)
+        return len(members)
+
+    local = threading.local()
+    handles: List[zipfile.ZipFile] = []
+    handles_lock = threading.Lock()
+
+    def extract_one(zinfo: zipfile.ZipInfo):
+        zipf = getattr(local, "zipf", None)
+        if zipf == None:
+            zipf = local.zipf = zipfile.ZipFile(archive_path, 'r')
+            with handles_lock:
+                handles.append(zipf)
+        try:
+            zipf.extract(zinfo, destination)
+        except FileExistsError:
+            # Родительскую директорию одновременно создал другой поток
+            zipf.extract(zinfo, destination)
+
+    # Крупные элементы первыми, чтобы потоки завершили работу примерно одновременно
+    ordered = sorted(members, key=lambda zinfo: zinfo.file_size, reverse=True)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(extract_one, zinfo) for zinfo in ordered]:
+                future.result()
+    finally:
+        for zipf in handles:
+            zipf.close()
+    return len(members)
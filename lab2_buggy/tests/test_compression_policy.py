@@ -0,0 +1,68 @@
+import os
+import zipfile
+
+import pytest
+
+from tests.testutils import write_file
+
+from modules.compression_policy import (benchmark_codecs, choose_stream_level, choose_zip_compression,
+                                        sample_entropy, tar_archive_path)
+
+
+def test_compressed_extensions_are_stored(tmp_path):
+    path = write_file(str(tmp_path / "photo.JPG"), "text " * 10000)
+    assert choose_zip_compression(path, os.path.getsize(path)) == (zipfile.ZIP_STORED, None)
+
+
+def test_random_data_is_stored(tmp_path):
+    path = write_file(str(tmp_path / "random.bin"), os.urandom(100_000))
+    assert sample_entropy(path, 100_000) > 7.5
+    assert choose_zip_compression(path, 100_000) == (zipfile.ZIP_STORED, None)
+
+
+def test_redundant_data_uses_default_level(tmp_path):
+    path = write_file(str(tmp_path / "log.txt"), "2024-01-01 INFO request handled\n" * 5000)
+    assert choose_zip_compression(path, os.path.getsize(path)) == (zipfile.ZIP_DEFLATED, 6)
+
+
+def test_small_files_are_not_sampled(tmp_path):
+    path = write_file(str(tmp_path / "small.bin"), os.urandom(100))
+    assert choose_zip_compression(path, 100) == (zipfile.ZIP_DEFLATED, 6)
+
+
+def test_stream_level_is_weighted_by_size(tmp_path):
+    write_file(str(tmp_path / "text" / "a.txt"), "abc\n" * 50000)
+    assert choose_stream_level(str(tmp_path / "text")) == 6
+    write_file(str(tmp_path / "media" / "a.jpg"), os.urandom(200_000))
+    write_file(str(tmp_path / "media" / "b.txt"), "abc\n" * 5000)
+    assert choose_stream_level(str(tmp_path / "media")) == 1
+    os.makedirs(str(tmp_path / "empty"))
+    assert choose_stream_level(str(tmp_path / "empty")) == 6
+
+
+@pytest.mark.parametrize("path, codec, expected", [
+    ("backup", "gz", "backup.tar.gz"),
+    ("backup", "none", "backup.tar"),
+    ("backup", "xz", "backup.tar.xz"),
+    ("backup.tgz", "bz2", "backup.tgz"),
+])
+def test_tar_archive_path(path, codec, expected):
+    assert tar_archive_path(path, codec) == expected
+
+
+def test_benchmark_reports_every_codec(tmp_path):
+    write_file(str(tmp_path / "data" / "a.txt"), "abc\n" * 10000)
+    report = benchmark_codecs(str(tmp_path / "data"))
+    assert report.startswith("Выборка: 1 файлов")
+    for name in ("zip адаптивный", "gzip -1", "gzip -9", "bz2 -9", "xz -6", "none"):
+        assert any(line.startswith(name) for line in report.split("\n"))
+    os.makedirs(str(tmp_path / "empty"))
+    assert benchmark_codecs(str(tmp_path / "empty")).startswith("В ")
+
+
+def test_prefetched_data_is_sampled_without_reading_file(tmp_path):
+    data = os.urandom(50_000) + b"text " * 20_000
+    path = write_file(str(tmp_path / "mixed.bin"), data)
+    assert sample_entropy(path, len(data), data) == sample_entropy(path, len(data))
+    missing = str(tmp_path / "missing.bin")
+    assert choose_zip_compression(missing, len(data), data) == choose_zip_compression(path, len(data))
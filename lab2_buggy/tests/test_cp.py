@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+from tests.testutils import tree_snapshot, write_file
+
+from modules.bash.cp import CommandCP
+from modules.copy_engine import ParallelCopier, _copy_file_range, copy_file
+from modules.full_cycle import FullCycle
+
+
+def cp(current_dir: str, *args: str) -> str:
+    command = ["cp", *args, None, None]
+    return CommandCP(command, current_dir).command_cp(command[1:])
+
+
+@pytest.fixture
+def source(tmp_path):
+    for i in range(20):
+        write_file(str(tmp_path / "src" / f"d{i % 4}" / f"f{i}.txt"), f"file {i}\n" * (i + 1), mtime=1_600_000_000 + i)
+    write_file(str(tmp_path / "src" / "empty"), b"")
+    os.makedirs(str(tmp_path / "src" / "empty_dir"))
+    os.symlink("d0/f0.txt", str(tmp_path / "src" / "link"))
+    return str(tmp_path)
+
+
+def test_recursive_copy_round_trip(source):
+    output = cp(source, "-r", "src", "dst")
+    assert output.startswith("Объект скопирован")
+    assert "Файлов: 21" in output
+    assert tree_snapshot(os.path.join(source, "dst", "src")) == tree_snapshot(os.path.join(source, "src"))
+    copied = os.stat(os.path.join(source, "dst", "src", "d1", "f5.txt"))
+    assert copied.st_mtime == 1_600_000_005
+
+
+def test_recursive_copy_from_shell(source):
+    command = "cp -r src dst"
+    output, new_dir = FullCycle(command, source).full_cycle(command, source)
+    assert "Файлов: 21" in output
+    assert tree_snapshot(os.path.join(source, "dst", "src")) == tree_snapshot(os.path.join(source, "src"))
+
+
+def test_copy_single_file(source):
+    cp(source, "src/d0/f0.txt", "copy.txt")
+    with open(os.path.join(source, "copy.txt", "f0.txt")) as f:
+        assert f.read() == "file 0\n"
+
+
+def test_copy_file_without_reported_size(tmp_path):
+    target = str(tmp_path / "status")
+    copy_file("/proc/self/status", target)
+    with open(target) as f:
+        assert f.read().startswith("Name:")
+
+
+def test_kernel_copy_reports_nothing_copied(tmp_path):
+    write_file(str(tmp_path / "empty"), b"")
+    with open(str(tmp_path / "empty"), "rb") as fsrc, open(str(tmp_path / "out"), "wb") as fdst:
+        assert _copy_file_range(fsrc.fileno(), fdst.fileno()) == False
+
+
+def test_parallel_copier_workers(source):
+    stats = ParallelCopier(workers=4).copy_tree(os.path.join(source, "src"), os.path.join(source, "copy"))
+    assert (stats.files, stats.links, stats.errors) == (21, 1, [])
+    assert tree_snapshot(os.path.join(source, "copy")) == tree_snapshot(os.path.join(source, "src"))
+
+
+def test_update_copies_only_changed_files(source):
+    cp(source, "-r", "src", "dst")
+    write_file(os.path.join(source, "src", "d0", "f0.txt"), "changed\n")
+    write_file(os.path.join(source, "src", "new.txt"), "new\n")
+    output = cp(source, "-r", "--update", "src", "dst")
+    assert "Файлов: 2" in output
+    assert "Пропущено без изменений: 21" in output
+    assert tree_snapshot(os.path.join(source, "dst", "src")) == tree_snapshot(os.path.join(source, "src"))
+
+
+def test_checksum_detects_same_size_and_mtime_changes(source):
+    cp(source, "-r", "src", "dst")
+    target = os.path.join(source, "dst", "src", "d0", "f0.txt")
+    write_file(target, "FILE 0\n", mtime=1_600_000_000)
+    assert "Файлов: 0" in cp(source, "-r", "--update", "src", "dst")
+    assert "Файлов: 1" in cp(source, "-r", "--checksum", "src", "dst")
+    with open(target) as f:
+        assert f.read() == "file 0\n"
+
+
+def test_delete_mirrors_the_source(source):
+    cp(source, "-r", "src", "dst")
+    write_file(os.path.join(source, "dst", "src", "d0", "extra.txt"), "extra")
+    os.makedirs(os.path.join(source, "dst", "src", "extra_dir", "nested"))
+    output = cp(source, "-r", "--delete", "src", "dst")
+    assert "удалено лишних: 2" in output
+    assert tree_snapshot(os.path.join(source, "dst", "src")) == tree_snapshot(os.path.join(source, "src"))
+
+
+def test_update_single_file(source):
+    write_file(os.path.join(source, "out", "f0.txt"), b"")
+    assert cp(source, "--update", "src/d0/f0.txt", "out").startswith("Объект скопирован")
+    assert cp(source, "--update", "src/d0/f0.txt", "out").startswith("Объект не изменился")
+    assert cp(source, "--checksum", "src/d0/f0.txt", "out/f0.txt").startswith("Объект не изменился")
+    with pytest.raises(ValueError):
+        cp(source, "--delete", "src/d0/f0.txt", "out")
+
+
+def test_update_does_not_write_through_hard_links(source):
+    target = write_file(os.path.join(source, "out", "f0.txt"), "old\n")
+    os.link(target, os.path.join(source, "out", "other_name"))
+    cp(source, "--update", "src/d0/f0.txt", "out")
+    with open(os.path.join(source, "out", "other_name")) as f:
+        assert f.read() == "old\n"
+    with open(target) as f:
+        assert f.read() == "file 0\n"
+
+
+def make_sparse(path: str, size: int = 64 * 1024 * 1024) -> str:
+    with open(path, "wb") as f:
+        f.seek(1024 * 1024)
+        f.write(b"data" * 1024)
+        f.truncate(size)
+    return path
+
+
+def test_sparse_copy_keeps_holes(tmp_path):
+    source = make_sparse(str(tmp_path / "disk.img"))
+    if os.stat(source).st_blocks * 512 >= os.path.getsize(source):
+        pytest.skip("файловая система не поддерживает разреженные файлы")
+    copy_file(source, str(tmp_path / "copy.img"))
+    copied = os.stat(str(tmp_path / "copy.img"))
+    assert copied.st_size == os.path.getsize(source)
+    assert copied.st_blocks * 512 < copied.st_size // 4
+    with open(source, "rb") as a, open(str(tmp_path / "copy.img"), "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_recursive_copy_keeps_hard_links(source):
+    os.link(os.path.join(source, "src", "d0", "f0.txt"), os.path.join(source, "src", "d1", "same.txt"))
+    assert "жестких ссылок: 1" in cp(source, "-r", "src", "dst")
+    first = os.stat(os.path.join(source, "dst", "src", "d0", "f0.txt"))
+    second = os.stat(os.path.join(source, "dst", "src", "d1", "same.txt"))
+    assert (first.st_ino, first.st_nlink) == (second.st_ino, 2)
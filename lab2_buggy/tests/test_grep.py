@@ -0,0 +1,164 @@
+import os
+import re
+
+import pytest
+
+from tests.testutils import write_file
+
+from modules.bash.grep import CommandGREP
+from modules.bash.grep_index import INDEX_FILE_NAME, TrigramIndex
+from modules.full_cycle import FullCycle
+
+
+def grep(current_dir: str, *args: str) -> str:
+    command = ["grep", *args, None, None]
+    return CommandGREP(command, current_dir).command_grep(command[1:], current_dir)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(12):
+        write_file(str(tmp_path / "src" / f"part{i % 3}" / f"file{i}.txt"),
+                   "".join(f"line {j} {'needle' if j % 5 == i % 5 else 'hay'}\n" for j in range(40)))
+    write_file(str(tmp_path / "src" / "blob.bin"), b"\0needle\0")
+    return str(tmp_path)
+
+
+def test_full_cycle_routes_grep(tree):
+    output, new_dir = FullCycle("grep -r needle src", tree).full_cycle("grep -r needle src", tree)
+    assert new_dir == tree
+    assert "src/part0/file0.txt | 1 line | line 0 needle" in output
+
+
+def test_parallel_search_matches_serial(tree):
+    serial = grep(tree, "-r", "needle", "src")
+    assert serial.count("\n") + 1 == 12 * 8
+    assert grep(tree, "-r", "-j", "4", "needle", "src") == serial
+    assert grep(tree, "-r", "-j", "0", "needle", "src") == serial
+
+
+def test_parallel_search_skips_binary_files(tree):
+    assert "blob.bin" not in grep(tree, "-r", "-j", "2", "needle", "src")
+
+
+def test_invalid_workers_value(tree):
+    with pytest.raises(ValueError):
+        grep(tree, "-r", "-j", "x", "needle", "src")
+
+
+@pytest.mark.parametrize("pattern", ["needle", "ne+dle", "o\\n", "NEEDLE", "^line 3", "[0-9] needle$"])
+def test_mmap_search_matches_line_search(tmp_path, pattern):
+    path = write_file(str(tmp_path / "a.txt"), "foo\nline 3 needle\nbar\r\nline 4 needle\nlast needle")
+    regex = re.compile(pattern)
+    strip = lambda results: [(file, line_num, line.strip()) for file, line_num, line in results]
+    assert strip(CommandGREP._search_in_file(regex, path)) == strip(CommandGREP._search_in_lines(regex, path))
+
+
+@pytest.mark.parametrize("pattern", ["\\Aneedle", "\\Aline", "needle\\Z", "\\Afoo", "needle\\n\\Z"])
+def test_anchored_patterns_match_every_line(tmp_path, pattern):
+    path = write_file(str(tmp_path / "a.txt"), "foo\nneedle\nline 3 needle\nline 4\nlast needle")
+    regex = re.compile(pattern)
+    assert CommandGREP._search_in_file(regex, path) == CommandGREP._search_in_lines(regex, path)
+    assert grep(str(tmp_path), "\\Aneedle", "a.txt") == "a.txt | 2 line | needle"
+
+
+def test_newline_pattern_matches_like_text_search(tmp_path):
+    write_file(str(tmp_path / "a.txt"), "foo\nbar\n")
+    assert grep(str(tmp_path), "o\\n", "a.txt") == "a.txt | 1 line | foo"
+
+
+def test_lone_carriage_return_falls_back_to_lines(tmp_path):
+    write_file(str(tmp_path / "a.txt"), "first\rneedle\nsecond\n")
+    assert grep(str(tmp_path), "needle", "a.txt") == "a.txt | 2 line | needle"
+
+
+def test_line_numbers_on_large_file(tmp_path):
+    write_file(str(tmp_path / "a.txt"), "x\n" * 100000 + "needle\n" + "y\n" * 10)
+    assert grep(str(tmp_path), "needle", "a.txt") == "a.txt | 100001 line | needle"
+
+
+def test_index_results_match_plain_search(tree):
+    plain = grep(tree, "-r", "needle", "src")
+    assert grep(tree, "--index", "build", "src").startswith("Индекс построен: 12 файлов")
+    assert grep(tree, "-r", "needle", "src") == plain
+    assert grep(tree, "-r", "missing_word", "src") == "Совпадений не найдено"
+
+
+def test_index_search_does_not_rewrite_unchanged_index(tree):
+    grep(tree, "--index", "build", "src")
+    index_path = os.path.join(tree, "src", INDEX_FILE_NAME)
+    os.utime(index_path, ns=(0, 0))
+    grep(tree, "-r", "needle", "src")
+    assert os.stat(index_path).st_mtime_ns == 0
+
+    write_file(os.path.join(tree, "src", "new.txt"), "fresh needle\n")
+    assert "src/new.txt | 1 line | fresh needle" in grep(tree, "-r", "needle", "src")
+    assert os.stat(index_path).st_mtime_ns != 0
+    assert "Файлов в индексе: 13" in grep(tree, "--index", "stats", "src")
+
+
+def test_index_stats_count_searches_without_rewriting_index(tree):
+    write_file(os.path.join(tree, "src", "rare.txt"), "unique_token here\n")
+    grep(tree, "--index", "build", "src")
+    index_path = os.path.join(tree, "src", INDEX_FILE_NAME)
+    os.utime(index_path, ns=(0, 0))
+    for pattern in ("unique_token", "needle", "unique_token"):
+        grep(tree, "-r", pattern, "src")
+    stats = grep(tree, "--index", "stats", "src").split("\n")
+    assert "Запросов: 3" in stats
+    assert "Кандидатов: 14, отсечено: 25 (64.1%)" in stats
+    assert "Попаданий в индекс: 39 из 52 (75.0%)" in stats
+    assert os.stat(index_path).st_mtime_ns == 0
+    assert grep(tree, "--index", "drop", "src").startswith("Индекс удален")
+    assert not [name for name in os.listdir(os.path.join(tree, "src")) if name.startswith(INDEX_FILE_NAME)]
+
+
+def test_index_prunes_files_without_literals(tree):
+    write_file(os.path.join(tree, "src", "rare.txt"), "unique_token here\n")
+    grep(tree, "--index", "build", "src")
+    assert grep(tree, "-r", "unique_token", "src") == "src/rare.txt | 1 line | unique_token here"
+    index = TrigramIndex.load(os.path.join(tree, "src"))
+    candidates = index.candidates(re.compile("unique_token"), index.refresh(lambda path: path.endswith(".txt")))
+    assert candidates == [os.path.join(tree, "src", "rare.txt")]
+
+
+def test_files_only_and_count_modes(tree):
+    files = grep(tree, "-r", "-l", "needle", "src").split("\n")
+    assert files == sorted(f"src/part{i % 3}/file{i}.txt" for i in range(12))
+    counts = grep(tree, "-r", "-c", "needle", "src").split("\n")
+    assert all(line.endswith(" | 8") for line in counts) and len(counts) == 12
+
+
+def test_max_count_limits_matches_per_file(tree):
+    output = grep(tree, "-m", "2", "needle", "src/part0/file0.txt")
+    assert output.split("\n") == ["src/part0/file0.txt | 1 line | line 0 needle",
+                                  "src/part0/file0.txt | 6 line | line 5 needle"]
+    with pytest.raises(ValueError):
+        grep(tree, "-m", "0", "needle", "src")
+
+
+def test_quiet_mode_reports_only_whether_found(tree):
+    assert grep(tree, "-r", "-q", "needle", "src") == "Найдено"
+    assert grep(tree, "-r", "-q", "-j", "2", "needle", "src") == "Найдено"
+    assert grep(tree, "-r", "-q", "missing_word", "src") == "Не найдено"
+
+
+def test_count_mode_omits_files_without_matches(tree):
+    write_file(os.path.join(tree, "src", "other.txt"), "nothing here\n")
+    assert "src/other.txt" not in grep(tree, "-r", "-c", "needle", "src")
+
+
+def test_text_detection_by_content(tmp_path):
+    write_file(str(tmp_path / "d" / "Makefile"), "all: needle\n")
+    write_file(str(tmp_path / "d" / "cyrillic"), "иголка needle\n" * 500)
+    write_file(str(tmp_path / "d" / "data"), b"needle\0\1\2")
+    write_file(str(tmp_path / "d" / "picture.png"), "needle\n")
+    assert grep(str(tmp_path), "-r", "-l", "needle", "d").split("\n") == ["d/Makefile", "d/cyrillic"]
+
+
+def test_text_detection_cache_follows_file_changes(tmp_path):
+    path = write_file(str(tmp_path / "data"), b"\0needle")
+    command = CommandGREP(["grep"], str(tmp_path))
+    assert not command._is_text_file(path)
+    write_file(path, "needle, now as text\n")
+    assert command._is_text_file(path)
@@ -0,0 +1,120 @@
+import os
+import bz2
+import gzip
+import lzma
+import tarfile
+
+import pytest
+
+from tests.testutils import write_file
+
+from modules.bash.ls import CommandLS, order_entries
+from modules.full_cycle import FullCycle
+from modules.valid_and_path_ops import archive_kind, metadata_cache
+
+
+def ls(current_dir: str, *args: str) -> str:
+    command = ["ls", *args, None, None]
+    return CommandLS(command, current_dir).command_ls(command[1:])
+
+
+@pytest.fixture
+def listing(tmp_path):
+    write_file(str(tmp_path / "dir" / "small.txt"), "a", mtime=1_600_000_000)
+    write_file(str(tmp_path / "dir" / "large.txt"), "a" * 1000, mtime=1_500_000_000)
+    write_file(str(tmp_path / "dir" / "sub" / "inner.txt"), "abc", mtime=1_700_000_000)
+    os.symlink("small.txt", str(tmp_path / "dir" / "link"))
+    return str(tmp_path)
+
+
+def test_plain_listing_colors_directories(listing):
+    output = ls(listing, "dir")
+    assert "\033[34msub\033[0m" in output
+    assert sorted(output.split()) == sorted(["large.txt", "link", "small.txt", "\033[34msub\033[0m"])
+
+
+def test_long_listing_format(listing):
+    lines = {line.split()[8]: line for line in ls(listing, "-l", "dir").split("\n")}
+    assert lines["small.txt"].startswith("-rw")
+    assert lines["small.txt"].split()[4] == "1"
+    assert lines["sub"].startswith("d")
+    assert ls(listing, "-l", "dir").count("link -> small.txt") == 1
+
+
+def test_missing_directory(listing):
+    with pytest.raises(FileNotFoundError):
+        ls(listing, "nothing")
+    with pytest.raises(ValueError):
+        ls(listing, "dir/small.txt")
+
+
+@pytest.mark.parametrize("name, data, kind", [
+    ("a.zip", b"PK\x03\x04" + b"\0" * 30, "zip"),
+    ("a.gz", gzip.compress(b"data"), "gzip"),
+    ("a.bz2", bz2.compress(b"data"), "bz2"),
+    ("a.xz", lzma.compress(b"data"), "xz"),
+    ("notes.txt", b"BZh, not an archive\n", None),
+    ("plain", b"just text\n", None),
+])
+def test_archive_kind_by_magic_bytes(tmp_path, name, data, kind):
+    assert archive_kind(write_file(str(tmp_path / name), data)) == kind
+
+
+def test_archive_kind_detects_tar_without_extension(tmp_path):
+    write_file(str(tmp_path / "src" / "a.txt"), "a")
+    with tarfile.open(str(tmp_path / "archive"), "w") as tar:
+        tar.add(str(tmp_path / "src"), arcname="src")
+    assert archive_kind(str(tmp_path / "archive")) == "tar"
+    assert "\033[31marchive\033[0m" in ls(str(tmp_path), None)
+
+
+def test_recursive_listing_is_depth_first_and_sorted(listing, capsys):
+    for name in ("b", "a", "c"):
+        write_file(os.path.join(listing, "dir", "sub", name, "x.txt"), "x")
+    assert ls(listing, "-R", "dir") == ""
+    headers = [line for line in capsys.readouterr().out.split("\n") if line.endswith(":")]
+    assert headers == ["dir:", "dir/sub:", "dir/sub/a:", "dir/sub/b:", "dir/sub/c:"]
+
+
+def test_recursive_long_listing_does_not_follow_directory_links(listing, capsys):
+    os.symlink(os.path.join(listing, "dir"), os.path.join(listing, "dir", "sub", "loop"))
+    ls(listing, "-lR", "dir")
+    output = capsys.readouterr().out
+    assert "dir/sub/loop:" not in output
+    assert "inner.txt" in output
+
+
+def test_sort_by_size_and_time_with_limit(listing):
+    write_file(os.path.join(listing, "flat", "a"), "a" * 10)
+    write_file(os.path.join(listing, "flat", "b"), "b" * 30)
+    write_file(os.path.join(listing, "flat", "c"), "c" * 20)
+    assert ls(listing, "-S", "--limit", "2", "flat").split() == ["b", "c"]
+    names = [line.split()[8] for line in ls(listing, "-lt", "dir").split("\n")]
+    assert names.index("small.txt") < names.index("large.txt")
+    assert len(ls(listing, "-l", "--limit", "1", "dir").split("\n")) == 1
+
+
+def test_order_entries_keeps_only_limit(tmp_path):
+    for i in range(50):
+        write_file(str(tmp_path / f"f{i:02}"), "x" * i)
+    with os.scandir(str(tmp_path)) as entries:
+        top = order_entries(entries, sort_by="size", limit=3)
+    assert [entry.name for entry in top] == ["f49", "f48", "f47"]
+
+
+def test_invalid_limit(listing):
+    with pytest.raises(ValueError):
+        ls(listing, "--limit", "many", "dir")
+
+
+def test_cache_stats_show_hits_and_misses(tmp_path):
+    write_file(str(tmp_path / "d" / "a.txt"), "a")
+    old = os.stat(str(tmp_path)).st_mtime - 3600
+    os.utime(str(tmp_path), (old, old))
+    metadata_cache.clear()
+    hits, misses = metadata_cache.hits, metadata_cache.misses
+    for _ in range(2):
+        FullCycle("cd d", str(tmp_path)).full_cycle("cd d", str(tmp_path))
+    output, new_dir = FullCycle("ls --cache-stats", str(tmp_path)).full_cycle("ls --cache-stats", str(tmp_path))
+    assert output.startswith("Кэш метаданных: ")
+    assert f"попаданий {hits + 1}," in output and f"промахов {misses + 1} " in output
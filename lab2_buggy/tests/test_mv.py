@@ -0,0 +1,69 @@
+import os
+import errno
+
+import pytest
+
+from tests.testutils import tree_snapshot, write_file
+
+import modules.copy_engine as copy_engine
+from modules.bash.mv import CommandMV
+
+
+def mv(current_dir: str, *args: str) -> str:
+    command = ["mv", *args, None, None]
+    return CommandMV(command, current_dir).command_mv(command[1:], current_dir)
+
+
+@pytest.fixture
+def source(tmp_path):
+    for i in range(6):
+        write_file(str(tmp_path / "tree" / f"d{i % 2}" / f"f{i}.txt"), f"file {i}\n" * 100)
+    os.symlink("d0/f0.txt", str(tmp_path / "tree" / "link"))
+    write_file(str(tmp_path / "single.txt"), "single\n")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    def rename(src, dst, *args, **kwargs):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(os, "rename", rename)
+
+
+def test_move_several_operands(source):
+    expected = tree_snapshot(os.path.join(source, "tree"))
+    output = mv(source, "tree", "single.txt", "target")
+    assert output.count("Файл перемещен") == 2
+    assert not os.path.exists(os.path.join(source, "tree"))
+    assert tree_snapshot(os.path.join(source, "target", "tree")) == expected
+    assert os.path.isfile(os.path.join(source, "target", "single.txt"))
+
+
+def test_move_refuses_existing_target_and_self(source):
+    os.makedirs(os.path.join(source, "target", "single.txt"))
+    assert "уже существует" in mv(source, "single.txt", "target")
+    assert "внутрь самой себя" in mv(source, "tree", "tree/d0")
+
+
+def test_move_across_devices_copies_and_verifies(source, cross_device, capsys):
+    expected = tree_snapshot(os.path.join(source, "tree"))
+    output = mv(source, "tree", "single.txt", "target")
+    assert output.count("между файловыми системами") == 2
+    assert "Файлов: 6, директорий: 3, ссылок: 1" in output
+    assert capsys.readouterr().out == ""
+    assert not os.path.exists(os.path.join(source, "tree"))
+    assert tree_snapshot(os.path.join(source, "target", "tree")) == expected
+
+
+def test_progress_is_shown_only_on_terminal(monkeypatch):
+    monkeypatch.setattr("sys.stdout.isatty", lambda: False)
+    assert CommandMV.progress_printer() == None
+    monkeypatch.setattr("sys.stdout.isatty", lambda: True)
+    assert callable(CommandMV.progress_printer())
+
+
+def test_failed_verification_keeps_source(source, cross_device, monkeypatch):
+    monkeypatch.setattr(copy_engine, "verify_tree", lambda src, dst: [f"{src}: содержимое не совпадает"])
+    assert "источник сохранен" in mv(source, "tree", "target")
+    assert os.path.isdir(os.path.join(source, "tree"))
+    assert not os.path.exists(os.path.join(source, "target", "tree"))
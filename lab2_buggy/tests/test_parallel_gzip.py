@@ -0,0 +1,67 @@
+import gzip
+import os
+import subprocess
+import shutil
+import zlib
+
+import pytest
+
+import tests.testutils
+
+from modules.parallel_gzip import BLOCK_SIZE, ParallelGzipWriter
+
+
+def payload(size: int) -> bytes:
+    words = [b"alpha", b"beta", b"gamma", b"delta", os.urandom(8)]
+    data = bytearray()
+    i = 0
+    while len(data) < size:
+        data += words[i * 7 % len(words)] + b" "
+        i += 1
+    return bytes(data[:size])
+
+
+@pytest.mark.parametrize("size", [0, 1, BLOCK_SIZE - 1, BLOCK_SIZE, 3 * BLOCK_SIZE + 12345])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_output_is_single_gzip_stream(tmp_path, size, workers):
+    data = payload(size)
+    path = str(tmp_path / "out.gz")
+    with ParallelGzipWriter(path, level=6, workers=workers) as stream:
+        for start in range(0, len(data), 100_000):
+            stream.write(data[start:start + 100_000])
+    with open(path, "rb") as f:
+        compressed = f.read()
+    assert gzip.decompress(compressed) == data
+    decompressor = zlib.decompressobj(31)
+    assert decompressor.decompress(compressed) == data and decompressor.eof and not decompressor.unused_data
+
+
+def test_ratio_close_to_plain_gzip(tmp_path):
+    data = payload(4 * BLOCK_SIZE)
+    path = str(tmp_path / "out.gz")
+    with ParallelGzipWriter(path, level=6, workers=2) as stream:
+        stream.write(data)
+    assert os.path.getsize(path) < len(gzip.compress(data, 6)) * 1.05
+
+
+def test_checkpoints_start_on_block_boundaries(tmp_path):
+    data = payload(5 * BLOCK_SIZE)
+    path = str(tmp_path / "out.gz")
+    with ParallelGzipWriter(path, workers=1, checkpoint_interval=2 * BLOCK_SIZE) as stream:
+        stream.write(data)
+    assert [offset for compressed, offset, dictionary in stream.checkpoints] == [0, 2 * BLOCK_SIZE, 4 * BLOCK_SIZE]
+    with open(path, "rb") as f:
+        compressed = f.read()
+    for compressed_offset, offset, dictionary in stream.checkpoints:
+        decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+        chunk = decompressor.decompress(compressed[compressed_offset:], BLOCK_SIZE)
+        assert chunk == data[offset:offset + BLOCK_SIZE]
+
+
+@pytest.mark.skipif(shutil.which("gzip") == None, reason="нет утилиты gzip")
+def test_gzip_utility_reads_output(tmp_path):
+    data = payload(2 * BLOCK_SIZE + 1)
+    path = str(tmp_path / "out.gz")
+    with ParallelGzipWriter(path, workers=2) as stream:
+        stream.write(data)
+    assert subprocess.run(["gzip", "-dc", path], capture_output=True, check=True).stdout == data
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+import pytest
+
+from tests.testutils import write_file
+
+from modules import readahead
+from modules.readahead import ReadAheadPipeline, StageTimings
+
+
+@pytest.fixture
+def files(tmp_path):
+    return [write_file(str(tmp_path / f"f{i:02}"), os.urandom(i * 1000)) for i in range(30)]
+
+
+def contents(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("readers", [1, 4])
+def test_files_are_yielded_in_order(files, readers):
+    result = list(ReadAheadPipeline(files, readers=readers, buffer_size=5000))
+    assert [path for path, data in result] == files
+    assert all(data == contents(path) for path, data in result)
+
+
+def test_large_and_missing_files_are_left_to_archiver(files, monkeypatch):
+    monkeypatch.setattr(readahead, "MAX_PREFETCH_SIZE", 10_000)
+    missing = files[0] + ".missing"
+    result = dict(ReadAheadPipeline(files + [missing]))
+    assert result[missing] == None
+    assert result[files[11]] == None and result[files[10]] == contents(files[10])
+
+
+def test_buffer_limits_read_ahead(files, monkeypatch):
+    read = []
+    original_read = ReadAheadPipeline._read
+
+    def tracking_read(self, path):
+        read.append(path)
+        return original_read(self, path)
+
+    monkeypatch.setattr(ReadAheadPipeline, "_read", tracking_read)
+    iterator = iter(ReadAheadPipeline(files[1:], readers=1, buffer_size=3500))
+    next(iterator)
+    time.sleep(0.1)
+    assert 1 < len(read) < 5
+    iterator.close()
+
+
+def test_timings_name_the_bottleneck(files):
+    pipeline = ReadAheadPipeline(files)
+    for path, data in pipeline:
+        time.sleep(0.005)
+    timings = pipeline.timings
+    assert timings.prefetched_bytes == sum(i * 1000 for i in range(30))
+    assert timings.archive >= 0.1 and timings.elapsed >= timings.archive
+    assert timings.summary().endswith("узкое место: сжатие и запись (CPU)")
+
+    slow = StageTimings()
+    slow.wait, slow.archive = 2.0, 0.5
+    assert slow.summary().endswith("узкое место: чтение (I/O)")
+
+
+def test_readers_run_concurrently(files, monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_read(self, path):
+        with lock:
+            active.append(path)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(path)
+        return b""
+
+    monkeypatch.setattr(ReadAheadPipeline, "_read", slow_read)
+    assert len(list(ReadAheadPipeline(files, readers=3))) == 30
+    assert max(peak) > 1
@@ -0,0 +1,75 @@
+import os
+import errno
+
+import pytest
+
+from tests.testutils import write_file
+
+import modules.trash as trash
+from modules.bash.rm import CommandRM
+from modules.trash import TRASH_DIR_NAME, TrashPurger
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    # Корзина "точки монтирования" создается во временной директории, а не в корне файловой системы
+    os.makedirs(str(tmp_path / "mount" / "work"))
+    monkeypatch.setattr(trash, "mount_point", lambda path: str(tmp_path / "mount"))
+    for i in range(30):
+        write_file(str(tmp_path / "mount" / "work" / "victim" / f"d{i % 5}" / f"s{i % 2}" / f"f{i}.txt"), "x")
+    return str(tmp_path / "mount")
+
+
+def test_trash_is_purged_in_background(tree):
+    purger = TrashPurger(workers=4)
+    trashed = purger.move_to_trash(os.path.join(tree, "work", "victim"))
+    assert trashed.startswith(os.path.join(tree, TRASH_DIR_NAME))
+    assert not os.path.exists(os.path.join(tree, "work", "victim"))
+    purger.wait()
+    assert os.listdir(os.path.join(tree, TRASH_DIR_NAME)) == []
+    assert (purger.removed_files, purger.removed_dirs, purger.errors) == (30, 16, [])
+    assert "Удалено файлов: 30, директорий: 16" in purger.format_status()
+
+
+def test_bind_mount_falls_back_to_parent_trash(tree, monkeypatch):
+    rename = os.rename
+
+    def bind_mount_rename(src, dst):
+        if dst.startswith(os.path.join(tree, TRASH_DIR_NAME)):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        rename(src, dst)
+
+    monkeypatch.setattr(os, "rename", bind_mount_rename)
+    purger = TrashPurger()
+    trashed = purger.move_to_trash(os.path.join(tree, "work", "victim"))
+    assert trashed.startswith(os.path.join(tree, "work", TRASH_DIR_NAME))
+    purger.wait()
+    assert os.listdir(os.path.join(tree, "work", TRASH_DIR_NAME)) == []
+
+
+def test_removes_synchronously_without_usable_trash(tree, monkeypatch):
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    assert TrashPurger().move_to_trash(os.path.join(tree, "work", "victim")) == None
+    assert not os.path.exists(os.path.join(tree, "work", "victim"))
+
+
+def test_shutdown_finishes_pending_purge(tree):
+    purger = TrashPurger()
+    purger.move_to_trash(os.path.join(tree, "work", "victim"))
+    assert purger.shutdown(timeout=30)
+    assert not purger._thread.is_alive()
+    assert os.listdir(os.path.join(tree, TRASH_DIR_NAME)) == []
+    assert purger.shutdown()
+
+
+def test_rm_command_with_trash_and_status(tree, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda prompt="": "Y")
+    work = os.path.join(tree, "work")
+    output = CommandRM(["rm"], work).command_rm(["-r", "victim", "--trash", None], work)
+    assert "перемещена в корзину" in output
+    trash.trash_purger.wait()
+    assert not os.path.exists(os.path.join(work, "victim"))
+    assert "Фоновая очистка: простаивает" in CommandRM(["rm"], work).command_rm(["--status", None], work)
@@ -0,0 +1,162 @@
+import io
+import os
+import sys
+import tarfile
+import threading
+
+import pytest
+
+from tests.testutils import tar, tree_snapshot, untar, write_file
+
+
+@pytest.fixture
+def source(tmp_path):
+    for i in range(10):
+        write_file(str(tmp_path / "data" / f"d{i % 3}" / f"f{i}.txt"), f"line {i}\n" * (i * 50 + 1))
+    write_file(str(tmp_path / "data" / "random.bin"), os.urandom(200_000))
+    os.makedirs(str(tmp_path / "data" / "empty_dir"))
+    os.symlink("d0/f0.txt", str(tmp_path / "data" / "link"))
+    os.makedirs(str(tmp_path / "out"))
+    return str(tmp_path)
+
+
+def test_sparse_file_round_trip(source):
+    path = os.path.join(source, "data", "disk.img")
+    with open(path, "wb") as f:
+        f.seek(4 * 1024 * 1024)
+        f.write(b"payload")
+        f.truncate(32 * 1024 * 1024)
+    if os.stat(path).st_blocks * 512 >= os.path.getsize(path):
+        pytest.skip("файловая система не поддерживает разреженные файлы")
+    tar(source, "--codec", "none", "data", "archive")
+    assert os.path.getsize(os.path.join(source, "archive.tar")) < 1024 * 1024
+    untar(os.path.join(source, "out"), "../archive.tar")
+    assert tree_snapshot(os.path.join(source, "out", "data")) == tree_snapshot(os.path.join(source, "data"))
+
+
+def test_hard_links_are_archived_as_links(source):
+    os.link(os.path.join(source, "data", "d0", "f0.txt"), os.path.join(source, "data", "d1", "same.txt"))
+    tar(source, "--codec", "none", "data", "archive")
+    with tarfile.open(os.path.join(source, "archive.tar")) as archive:
+        links = [member for member in archive.getmembers() if member.islnk()]
+    assert len(links) == 1
+    untar(os.path.join(source, "out"), "../archive.tar")
+    first = os.stat(os.path.join(source, "out", "data", "d0", "f0.txt"))
+    second = os.stat(os.path.join(source, "out", "data", "d1", "same.txt"))
+    assert first.st_ino == second.st_ino
+
+
+@pytest.mark.parametrize("codec, suffix, mode", [("gz", ".tar.gz", "r:gz"), ("bz2", ".tar.bz2", "r:bz2"),
+                                                 ("xz", ".tar.xz", "r:xz"), ("none", ".tar", "r:")])
+def test_codec_round_trip(source, codec, suffix, mode):
+    output = tar(source, "--codec", codec, "--level", "9", "data", "archive")
+    assert output.startswith(f"TAR архив создан ({codec}")
+    with tarfile.open(os.path.join(source, "archive" + suffix), mode) as archive:
+        assert "data/d0/f0.txt" in archive.getnames()
+    untar(os.path.join(source, "out"), "../archive" + suffix)
+    assert tree_snapshot(os.path.join(source, "out", "data")) == tree_snapshot(os.path.join(source, "data"))
+
+
+def test_level_is_chosen_by_content(source):
+    assert "(gz, уровень 1)" in tar(source, "data", "archive")
+    os.remove(os.path.join(source, "data", "random.bin"))
+    assert "(gz, уровень 6)" in tar(source, "data", "archive2")
+
+
+@pytest.mark.parametrize("options", [["--codec", "zstd"], ["--level", "0"], ["--level", "10"],
+                                     ["--codec", "xz", "-j", "2"], ["--codec", "none", "--index"]])
+def test_invalid_codec_options(source, options):
+    with pytest.raises(ValueError):
+        tar(source, *options, "data", "archive")
+
+
+def test_benchmark(source):
+    assert "gzip -6" in tar(source, "--benchmark", "data")
+
+
+@pytest.mark.parametrize("workers", ["2", "0"])
+def test_parallel_gzip_archive_round_trip(source, workers):
+    write_file(os.path.join(source, "data", "large.txt"), "".join(f"row {i}\n" for i in range(400_000)))
+    tar(source, "-j", workers, "data", "archive")
+    with tarfile.open(os.path.join(source, "archive.tar.gz"), "r:gz") as archive:
+        assert archive.extractfile("data/large.txt").read().count(b"\n") == 400_000
+    untar(os.path.join(source, "out"), "../archive.tar.gz")
+    assert tree_snapshot(os.path.join(source, "out", "data")) == tree_snapshot(os.path.join(source, "data"))
+
+
+@pytest.fixture
+def dated_source(source):
+    data = os.path.join(source, "data")
+    os.chmod(os.path.join(data, "d1"), 0o555)
+    for root, dirs, files in os.walk(data):
+        os.utime(root, (1_577_880_000, 1_577_880_000))
+    yield source
+    for root in (os.path.join(source, "data", "d1"), os.path.join(source, "out", "data", "d1")):
+        if os.path.isdir(root):
+            os.chmod(root, 0o755)
+
+
+@pytest.mark.parametrize("options", [[], ["--index"]])
+def test_directory_attributes_are_restored(dated_source, options):
+    tar(dated_source, *options, "data", "archive")
+    out = os.path.join(dated_source, "out")
+    patterns = ["data/"] if options else []
+    untar(out, "../archive.tar.gz", *patterns)
+    for name in ("data", "data/d0", "data/d1", "data/empty_dir"):
+        assert int(os.stat(os.path.join(out, name)).st_mtime) == 1_577_880_000
+    assert os.stat(os.path.join(out, "data", "d1")).st_mode & 0o777 == 0o555
+    assert os.path.isfile(os.path.join(out, "data", "d1", "f1.txt"))
+
+
+@pytest.mark.parametrize("codec, suffix", [("gz", ".tar.gz"), ("bz2", ".tar.bz2"), ("xz", ".tar.xz"), ("none", ".tar")])
+def test_format_is_sniffed_from_header(source, codec, suffix):
+    tar(source, "--codec", codec, "data", "archive")
+    os.rename(os.path.join(source, "archive" + suffix), os.path.join(source, "renamed.bin"))
+    assert untar(os.path.join(source, "out"), "../renamed.bin").startswith("TAR архив распакован")
+    assert tree_snapshot(os.path.join(source, "out", "data")) == tree_snapshot(os.path.join(source, "data"))
+
+
+def test_untar_rejects_non_tar_input(source):
+    write_file(os.path.join(source, "text.tar"), "just text\n" * 100)
+    assert untar(source, "text.tar").startswith("Ошибка")
+    write_file(os.path.join(source, "archive.zip"), b"PK\x03\x04" + b"\0" * 100)
+    assert "используйте unzip" in untar(source, "archive.zip")
+    with pytest.raises(FileNotFoundError):
+        untar(source, "missing.tar")
+
+
+def test_filters_select_members(source):
+    tar(source, "data", "archive")
+    out = os.path.join(source, "out")
+    assert untar(out, "../archive.tar.gz", "f1*.txt", "data/d2/").startswith("Распаковано элементов: 5")
+    assert sorted(path for path, value in tree_snapshot(os.path.join(out, "data")).items() if value[0] == "file") == [
+        "d1/f1.txt", "d2/f2.txt", "d2/f5.txt", "d2/f8.txt"]
+    names = untar(source, "-t", "archive.tar.gz", "*.bin").split("\n")
+    assert names == ["data/random.bin"]
+
+
+def test_untar_reads_from_pipe(source):
+    tar(source, "--codec", "xz", "data", "archive")
+    fifo = os.path.join(source, "pipe")
+    os.mkfifo(fifo)
+
+    def feed():
+        with open(os.path.join(source, "archive.tar.xz"), "rb") as src, open(fifo, "wb") as dst:
+            dst.write(src.read())
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+    try:
+        assert untar(os.path.join(source, "out"), "../pipe").startswith("TAR архив распакован")
+    finally:
+        writer.join()
+    assert tree_snapshot(os.path.join(source, "out", "data")) == tree_snapshot(os.path.join(source, "data"))
+
+
+def test_untar_reads_from_stdin(source, monkeypatch):
+    tar(source, "--codec", "bz2", "data", "archive")
+    with open(os.path.join(source, "archive.tar.bz2"), "rb") as f:
+        stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(f.read())))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    assert untar(os.path.join(source, "out"), "-", "link").startswith("Распаковано элементов: 1")
+    assert os.readlink(os.path.join(source, "out", "data", "link")) == "d0/f0.txt"
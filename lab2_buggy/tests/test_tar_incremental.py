@@ -0,0 +1,97 @@
+import os
+import shutil
+import tarfile
+
+import pytest
+
+from tests.testutils import tar, tree_snapshot, untar, write_file
+
+from modules.tar_snapshot import INCREMENTAL_META_NAME, SnapshotManifest, apply_deletions
+
+
+def archive_names(path: str):
+    with tarfile.open(path) as archive:
+        return archive.getnames()
+
+
+@pytest.fixture
+def chain(tmp_path):
+    root = str(tmp_path)
+    for i in range(8):
+        write_file(os.path.join(root, "data", f"d{i % 2}", f"f{i}.txt"), f"version 0 of {i}\n", mtime=1_600_000_000)
+    write_file(os.path.join(root, "data", "becomes_dir"), "file for now\n", mtime=1_600_000_000)
+    os.makedirs(os.path.join(root, "data", "empty"))
+    os.makedirs(os.path.join(root, "out"))
+    tar(root, "--listed-incremental", "snap.json", "data", "level0")
+
+    write_file(os.path.join(root, "data", "d0", "f0.txt"), "version 1 of 0\n", mtime=1_600_000_100)
+    write_file(os.path.join(root, "data", "d1", "new.txt"), "new in level 1\n")
+    os.remove(os.path.join(root, "data", "d1", "f3.txt"))
+    shutil.rmtree(os.path.join(root, "data", "empty"))
+    os.remove(os.path.join(root, "data", "becomes_dir"))
+    write_file(os.path.join(root, "data", "becomes_dir", "inner.txt"), "now a directory\n")
+    level1 = tar(root, "--listed-incremental", "snap.json", "data", "level1")
+
+    write_file(os.path.join(root, "data", "d1", "f5.txt"), "version 2 of 5\n", mtime=1_600_000_200)
+    os.remove(os.path.join(root, "data", "d0", "f2.txt"))
+    level2 = tar(root, "--listed-incremental", "snap.json", "data", "level2")
+    return root, level1, level2
+
+
+def test_levels_contain_only_changes(chain):
+    root, level1, level2 = chain
+    assert "Инкрементальный архив уровня 1: файлов записано 3, удалено путей 3" in level1
+    assert "Инкрементальный архив уровня 2: файлов записано 1, удалено путей 1" in level2
+    files = [name for name in archive_names(os.path.join(root, "level1.tar.gz")) if name.endswith(".txt")]
+    assert sorted(files) == ["data/becomes_dir/inner.txt", "data/d0/f0.txt", "data/d1/new.txt"]
+    assert archive_names(os.path.join(root, "level2.tar.gz"))[0] == INCREMENTAL_META_NAME
+    assert SnapshotManifest.load(os.path.join(root, "snap.json")).level == 2
+
+
+def test_chain_restores_current_tree(chain):
+    root = chain[0]
+    output = untar(os.path.join(root, "out"), "--incremental", "../level0.tar.gz", "../level1.tar.gz", "../level2.tar.gz")
+    assert output.startswith("Цепочка из 3 архивов восстановлена (уровень 2)")
+    assert "удалено путей 4" in output
+    assert tree_snapshot(os.path.join(root, "out", "data")) == tree_snapshot(os.path.join(root, "data"))
+
+
+def test_partial_chain_restores_intermediate_state(chain):
+    root = chain[0]
+    untar(os.path.join(root, "out"), "--incremental", "../level0.tar.gz", "../level1.tar.gz")
+    restored = tree_snapshot(os.path.join(root, "out", "data"))
+    assert restored["d1/f5.txt"] == ("file", b"version 0 of 5\n")
+    assert restored["d0/f2.txt"] == ("file", b"version 0 of 2\n")
+    assert "d1/f3.txt" not in restored and "empty" not in restored
+    assert restored["becomes_dir"] == ("dir", b"")
+
+
+@pytest.mark.parametrize("order", [["level1", "level2"], ["level0", "level2"], ["level0", "level0"],
+                                   ["level0", "plain"]])
+def test_invalid_chain_is_rejected(chain, order):
+    root = chain[0]
+    tar(root, "data", "plain")
+    output = untar(os.path.join(root, "out"), "--incremental", *[f"../{name}.tar.gz" for name in order])
+    assert output.startswith("Ошибка при восстановлении цепочки")
+
+
+def test_plain_untar_skips_meta_member(chain):
+    root = chain[0]
+    assert untar(os.path.join(root, "out"), "../level1.tar.gz").startswith("TAR архив распакован")
+    assert not os.path.exists(os.path.join(root, "out", INCREMENTAL_META_NAME))
+    assert INCREMENTAL_META_NAME not in untar(root, "-t", "level1.tar.gz").split("\n")
+
+
+def test_unchanged_tree_produces_empty_increment(chain):
+    root = chain[0]
+    output = tar(root, "--listed-incremental", "snap.json", "data", "level3")
+    assert "файлов записано 0, удалено путей 0" in output
+
+
+def test_deletions_stay_inside_destination(tmp_path):
+    write_file(str(tmp_path / "outside.txt"), "keep\n")
+    os.makedirs(str(tmp_path / "out"))
+    for name in ["../outside.txt", "/etc/passwd", "data/.."]:
+        with pytest.raises(ValueError):
+            apply_deletions(str(tmp_path / "out"), [name])
+    assert os.path.exists(str(tmp_path / "outside.txt"))
@@ -0,0 +1,118 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from tests.testutils import tar, untar, write_file
+
+from modules import tar_index
+from modules.bash.tar import CommandUNTAR
+from modules.parallel_gzip import BLOCK_SIZE, ParallelGzipWriter
+from modules.tar_index import IndexedGzipReader, TarIndex, member_matches
+
+
+# Сколько сжатых данных читатель может распаковать сверх нужного
+READ_AHEAD = 4 * tar_index.READ_CHUNK_SIZE
+
+
+@pytest.fixture
+def stream(tmp_path):
+    data = b"".join(f"{i:08}\n".encode("ascii") for i in range(600_000))
+    path = str(tmp_path / "data.gz")
+    with ParallelGzipWriter(path, workers=1, checkpoint_interval=BLOCK_SIZE) as writer:
+        writer.write(data)
+    return path, data, writer.checkpoints
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setattr("modules.bash.tar.CHECKPOINT_INTERVAL", BLOCK_SIZE)
+    for i in range(6):
+        write_file(str(tmp_path / "data" / f"d{i % 2}" / f"big{i}.txt"), os.urandom(400_000).hex())
+    write_file(str(tmp_path / "data" / "config.ini"), "[main]\nkey = value\n")
+    os.link(str(tmp_path / "data" / "d0" / "big0.txt"), str(tmp_path / "data" / "d1" / "same.txt"))
+    os.makedirs(str(tmp_path / "out"))
+    tar(str(tmp_path), "--index", "data", "backup")
+    return str(tmp_path)
+
+
+def test_reader_random_access(stream):
+    path, data, checkpoints = stream
+    assert len(checkpoints) > 3
+    reader = IndexedGzipReader(path, checkpoints)
+    for offset, size in [(len(data) - 20, 10), (5, 100), (3 * BLOCK_SIZE + 7, 50_000), (0, 1), (len(data) - 3, 100)]:
+        reader.seek(offset)
+        assert reader.read(size) == data[offset:offset + size]
+        assert reader.tell() == min(offset + size, len(data))
+    reader.seek(len(data) + 10)
+    assert reader.read(10) == b""
+    reader.close()
+
+
+def test_reader_small_sequential_reads(stream):
+    path, data, checkpoints = stream
+    reader = IndexedGzipReader(path, checkpoints)
+    reader.seek(BLOCK_SIZE - 100)
+    parts = [reader.read(512) for _ in range(4096)]
+    assert b"".join(parts) == data[BLOCK_SIZE - 100:BLOCK_SIZE - 100 + 512 * 4096]
+    reader.seek(0)
+    assert io.BufferedReader(reader).read() == data
+
+
+def test_reader_restarts_from_nearest_checkpoint(stream):
+    path, data, checkpoints = stream
+    reader = IndexedGzipReader(path, checkpoints)
+    reader.seek(len(data) - 10)
+    assert reader.read() == data[-10:]
+    assert reader.decompressed_bytes < 2 * BLOCK_SIZE + READ_AHEAD
+    reader.close()
+
+
+def test_index_is_written_next_to_archive(archive):
+    index = TarIndex.load(os.path.join(archive, "backup.tar.gz"))
+    assert index != None and len(index.checkpoints) > 1
+    with tarfile.open(os.path.join(archive, "backup.tar.gz"), "r:gz") as plain:
+        assert [member[0] for member in index.members] == plain.getnames()
+
+
+def test_single_member_extraction_reads_part_of_stream(archive):
+    out = os.path.join(archive, "out")
+    output = untar(out, "../backup.tar.gz", "config.ini")
+    assert output.startswith("Распаковано элементов по индексу: 1")
+    assert float(output.split("(распаковано ")[1].split(" МБ")[0]) < 3
+    with open(os.path.join(out, "data", "config.ini")) as f:
+        assert f.read() == "[main]\nkey = value\n"
+
+
+def test_indexed_hard_link_extracts_target(archive):
+    out = os.path.join(archive, "out")
+    assert untar(out, "../backup.tar.gz", "same.txt").startswith("Распаковано элементов по индексу: 2")
+    with open(os.path.join(archive, "data", "d0", "big0.txt"), "rb") as f:
+        expected = f.read()
+    with open(os.path.join(out, "data", "d1", "same.txt"), "rb") as f:
+        assert f.read() == expected
+
+
+def test_listing_uses_index(archive, monkeypatch):
+    monkeypatch.setattr(CommandUNTAR, "_extract_stream", None)
+    names = untar(archive, "-t", "backup.tar.gz", "data/d1/").split("\n")
+    assert names == ["data/d1", "data/d1/big1.txt", "data/d1/big3.txt", "data/d1/big5.txt", "data/d1/same.txt"]
+
+
+def test_stale_index_is_ignored(archive):
+    archive_path = os.path.join(archive, "backup.tar.gz")
+    os.utime(archive_path, (1, 1))
+    assert TarIndex.load(archive_path) == None
+    assert untar(os.path.join(archive, "out"), "../backup.tar.gz", "config.ini").startswith("Распаковано элементов: 1")
+
+
+@pytest.mark.parametrize("name, patterns, expected", [
+    ("data/d1/x.txt", ["*.txt"], True),
+    ("data/d1/x.txt", ["data/d1/"], True),
+    ("data/d1", ["data/d1/"], True),
+    ("data/d10/x.txt", ["data/d1/"], False),
+    ("data/x.txt", ["*.ini"], False),
+])
+def test_member_matches(name, patterns, expected):
+    assert member_matches(name, patterns) == expected
@@ -0,0 +1,73 @@
+import os
+import stat
+
+from tests.testutils import write_file
+
+from modules.valid_and_path_ops import MetadataCache, make_path, shlex_tokenization
+
+
+def age_directory(path: str, seconds: int = 3600):
+    old = os.stat(path).st_mtime - seconds
+    os.utime(path, (old, old))
+
+
+def test_cache_hits_until_parent_directory_changes(tmp_path):
+    cache = MetadataCache()
+    path = write_file(str(tmp_path / "a.txt"), "a")
+    age_directory(str(tmp_path))
+    assert cache.stat(path) != None
+    cache.new_command()
+    assert cache.stat(path) != None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    os.remove(path)
+    age_directory(str(tmp_path), seconds=1800)
+    cache.new_command()
+    assert cache.stat(path) == None
+
+
+def test_recently_changed_directory_is_not_cached(tmp_path):
+    cache = MetadataCache()
+    path = write_file(str(tmp_path / "a.txt"), "a")
+    cache.stat(path)
+    os.remove(path)
+    assert cache.stat(path) == None
+    assert cache.hits == 0
+
+
+def test_symlink_follows_target_in_other_directory(tmp_path):
+    cache = MetadataCache()
+    target = write_file(str(tmp_path / "targets" / "a.txt"), "a")
+    link = str(tmp_path / "links" / "a.txt")
+    os.makedirs(os.path.dirname(link))
+    os.symlink(target, link)
+    age_directory(str(tmp_path / "links"))
+    assert cache.stat(link) != None
+
+    os.remove(target)
+    cache.new_command()
+    assert cache.stat(link) == None
+    os.makedirs(target)
+    cache.new_command()
+    assert stat.S_ISDIR(cache.stat(link).st_mode)
+    assert link not in cache._entries
+
+
+def test_invalidate_recursive_and_lru_limit(tmp_path):
+    cache = MetadataCache(max_entries=2)
+    paths = [write_file(str(tmp_path / "d" / name), name) for name in ("a", "b", "c")]
+    age_directory(str(tmp_path / "d"))
+    for path in paths:
+        cache.stat(path)
+    assert len(cache._entries) == 2 and paths[0] not in cache._entries
+
+    cache.invalidate(str(tmp_path / "d"), recursive=True)
+    assert len(cache._entries) == 0
+    assert cache.invalidations == 2
+
+
+def test_make_path_and_tokenization():
+    assert make_path("/home/user", "docs") == "/home/user/docs"
+    assert make_path("/home/user", "/home/other") == "/home/other"
+    assert make_path("/home/user", None) == "/home/user"
+    assert shlex_tokenization("cp 'a b' c") == ["cp", "a b", "c", None]
@@ -0,0 +1,191 @@
+import os
+import zipfile
+
+import pytest
+
+from tests.testutils import tree_snapshot, write_file
+
+from modules import compression_policy
+from modules.bash.zip import CommandUNZIP, CommandZIP
+
+
+def zip_(current_dir: str, *args: str) -> str:
+    command = ["zip", *args, None, None]
+    return CommandZIP(command, current_dir).command_zip(command[1:], current_dir)
+
+
+def unzip(current_dir: str, *args: str) -> str:
+    command = ["unzip", *args, None, None]
+    return CommandUNZIP(command, current_dir).command_unzip(command[1:], current_dir)
+
+
+@pytest.fixture
+def source(tmp_path):
+    for i in range(12):
+        write_file(str(tmp_path / "data" / f"d{i % 3}" / f"f{i}.txt"), f"line {i}\n" * (i * 100 + 1))
+    write_file(str(tmp_path / "data" / "random.bin"), os.urandom(100_000))
+    write_file(str(tmp_path / "data" / "photo.jpg"), b"\xff\xd8" + b"x" * 5000)
+    write_file(str(tmp_path / "data" / "empty"), b"")
+    os.makedirs(str(tmp_path / "out"))
+    return str(tmp_path)
+
+
+def files_only(root: str):
+    return {path: value for path, value in tree_snapshot(root).items() if value[0] == "file"}
+
+
+def test_hard_links_are_stored_once(source):
+    os.link(os.path.join(source, "data", "d0", "f0.txt"), os.path.join(source, "data", "d1", "same.txt"))
+    assert "Пропущено жестких ссылок: 1" in zip_(source, "data", "plain.zip")
+    with zipfile.ZipFile(os.path.join(source, "plain.zip")) as zipf:
+        assert len([name for name in zipf.namelist() if name.endswith(("f0.txt", "same.txt"))]) == 1
+
+    zip_(source, "--keep-hardlinks", "data", "all.zip")
+    with zipfile.ZipFile(os.path.join(source, "all.zip")) as zipf:
+        assert {"data/d0/f0.txt", "data/d1/same.txt"} <= set(zipf.namelist())
+
+
+@pytest.mark.parametrize("options", [[], ["-j", "2"], ["-j", "2", "--memory-budget", "1"], ["-j", "0"]])
+def test_archive_round_trip(source, options):
+    output = zip_(source, *options, "data", "archive.zip")
+    assert output.startswith("Архив создан")
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        assert zipf.testzip() == None
+    assert unzip(os.path.join(source, "out"), "../archive.zip").startswith("Архив распакован")
+    assert files_only(os.path.join(source, "out", "data")) == files_only(os.path.join(source, "data"))
+
+
+def test_parallel_archive_keeps_member_order(source):
+    zip_(source, "-j", "1", "data", "serial.zip")
+    zip_(source, "-j", "2", "--memory-budget", "1", "data", "parallel.zip")
+    with zipfile.ZipFile(os.path.join(source, "serial.zip")) as serial, \
+            zipfile.ZipFile(os.path.join(source, "parallel.zip")) as parallel:
+        assert parallel.namelist() == serial.namelist()
+        assert [zinfo.CRC for zinfo in parallel.infolist()] == [zinfo.CRC for zinfo in serial.infolist()]
+
+
+def test_parallel_member_larger_than_budget(source):
+    write_file(os.path.join(source, "data", "large.txt"), "large line\n" * 200_000)
+    assert "Файлов: 16" in zip_(source, "-j", "2", "--memory-budget", "1", "data", "archive.zip")
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        assert zipf.read("data/large.txt") == b"large line\n" * 200_000
+
+
+@pytest.mark.parametrize("options", [["-j"], ["-j", "x"], ["--memory-budget", "0"], ["--fast"]])
+def test_invalid_options(source, options):
+    with pytest.raises(ValueError):
+        zip_(source, *options, "data", "archive.zip")
+
+
+def test_update_reuses_unchanged_members(source):
+    past = 1_600_000_001
+    for root, dirs, files in os.walk(os.path.join(source, "data")):
+        for file in files:
+            os.utime(os.path.join(root, file), (past, past))
+    zip_(source, "data", "archive.zip")
+    write_file(os.path.join(source, "data", "d1", "f4.txt"), "changed\n")
+    write_file(os.path.join(source, "data", "new.txt"), "new\n")
+    os.remove(os.path.join(source, "data", "d2", "f5.txt"))
+
+    output = zip_(source, "-u", "data", "archive.zip")
+    assert "Без пересжатия: 13" in output and "сжато заново: 2" in output and "удалено из архива: 1" in output
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        assert zipf.testzip() == None
+    unzip(os.path.join(source, "out"), "../archive.zip")
+    assert files_only(os.path.join(source, "out", "data")) == files_only(os.path.join(source, "data"))
+
+
+def test_update_detects_same_size_rewrite_within_archive_time_slot(source):
+    slot = int(os.stat(source).st_mtime) // 2 * 2
+    path = write_file(os.path.join(source, "data", "d0", "f0.txt"), "before\n", mtime=slot)
+    zip_(source, "data", "archive.zip")
+    os.utime(os.path.join(source, "archive.zip"), (slot + 1, slot + 1))
+    write_file(path, "after!\n", mtime=slot)
+    zip_(source, "-u", "data", "archive.zip")
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        assert zipf.read("data/d0/f0.txt") == b"after!\n"
+
+
+def test_update_detects_same_size_change_with_old_mtime(source):
+    path = write_file(os.path.join(source, "data", "d0", "f0.txt"), "before\n", mtime=1_600_000_000)
+    zip_(source, "data", "archive.zip")
+    write_file(path, "after!\n", mtime=1_600_000_100)
+    assert "сжато заново: 1" in zip_(source, "-u", "data", "archive.zip")
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        assert zipf.read("data/d0/f0.txt") == b"after!\n"
+
+
+def test_unzip_selects_members_by_pattern(source):
+    zip_(source, "data", "archive.zip")
+    out = os.path.join(source, "out")
+    assert unzip(out, "../archive.zip", "f1?.txt", "data/d0/").startswith("Распаковано элементов: 6")
+    assert sorted(files_only(os.path.join(out, "data"))) == [
+        "d0/f0.txt", "d0/f3.txt", "d0/f6.txt", "d0/f9.txt", "d1/f10.txt", "d2/f11.txt"]
+    assert unzip(out, "../archive.zip", "data/random.bin").startswith("Распаковано элементов: 1")
+    assert unzip(out, "../archive.zip", "*.md").startswith("В архиве")
+
+
+def test_unzip_reads_only_selected_member(source, monkeypatch):
+    zip_(source, "data", "archive.zip")
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        member = zipf.getinfo("data/d0/f0.txt")
+    opened = []
+    original_open = zipfile.ZipFile.open
+
+    def tracking_open(self, name, *args, **kwargs):
+        opened.append(name.filename if isinstance(name, zipfile.ZipInfo) else name)
+        return original_open(self, name, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile.ZipFile, "open", tracking_open)
+    unzip(os.path.join(source, "out"), "../archive.zip", "data/d0/f0.txt")
+    assert opened == [member.filename]
+
+
+@pytest.mark.parametrize("workers", ["1", "3", "0"])
+def test_parallel_unzip_round_trip(source, workers):
+    zip_(source, "data", "archive.zip")
+    assert unzip(os.path.join(source, "out"), "-j", workers, "../archive.zip").startswith("Архив распакован")
+    assert files_only(os.path.join(source, "out", "data")) == files_only(os.path.join(source, "data"))
+
+
+def test_unzip_rejects_invalid_input(source):
+    write_file(os.path.join(source, "fake.zip"), "not an archive")
+    with pytest.raises(ValueError):
+        unzip(source, "fake.zip")
+    with pytest.raises(FileNotFoundError):
+        unzip(source, "missing.zip")
+    with pytest.raises(ValueError):
+        unzip(source, "-j", "x", "fake.zip")
+
+
+def test_serial_archive_reports_stage_timings(source):
+    output = zip_(source, "data", "archive.zip")
+    assert "Чтение: " in output and "узкое место: " in output
+    assert "узкое место: " not in zip_(source, "-j", "2", "data", "archive2.zip")
+
+
+def test_failed_update_removes_temporary_archive(source, monkeypatch):
+    zip_(source, "data", "archive.zip")
+
+    def replace(src, dst):
+        raise PermissionError("replace denied")
+    monkeypatch.setattr(os, "replace", replace)
+    assert zip_(source, "-u", "data", "archive.zip").startswith("Ошибка")
+    assert not os.path.exists(os.path.join(source, "archive.zip.tmp"))
+    with zipfile.ZipFile(os.path.join(source, "archive.zip")) as zipf:
+        assert zipf.testzip() == None
+
+
+def test_serial_archive_samples_prefetched_data(source, monkeypatch):
+    sampled = []
+    original = compression_policy.sample_entropy
+
+    def tracking_sample(path, size, data=None):
+        sampled.append(data != None)
+        return original(path, size, data)
+
+    monkeypatch.setattr(compression_policy, "sample_entropy", tracking_sample)
+    zip_(source, "data", "archive.zip")
+    assert sampled and all(sampled)
+    unzip(os.path.join(source, "out"), "../archive.zip")
+    assert files_only(os.path.join(source, "out", "data")) == files_only(os.path.join(source, "data"))
@@ -0,0 +1,85 @@
+import os
+import sys
+from typing import Dict, Tuple
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from modules.bash.tar import CommandTAR, CommandUNTAR
+
+
+def write_file(path: str, data, mtime: int = None) -> str:
+    """
+    Создает файл (и недостающие директории) с заданным содержимым.
+
+    Args:
+        path (str): Путь к файлу
+        data (str | bytes): Содержимое
+        mtime (int): Время изменения в секундах (None - текущее)
+
+    Returns:
+        str: Путь к файлу
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+    if mtime != None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def tree_snapshot(root: str) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Описывает дерево для сравнения: тип и содержимое каждого объекта.
+
+    Args:
+        root (str): Корень дерева
+
+    Returns:
+        Dict[str, Tuple[str, bytes]]: Относительный путь -> (тип, содержимое или цель ссылки)
+    """
+    result = {}
+    for current, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(current, name)
+            rel_path = os.path.relpath(path, root)
+            if os.path.islink(path):
+                result[rel_path] = ("link", os.readlink(path).encode("utf-8"))
+            elif os.path.isdir(path):
+                result[rel_path] = ("dir", b"")
+            else:
+                with open(path, "rb") as f:
+                    result[rel_path] = ("file", f.read())
+    return result
+
+
+def tar(current_dir: str, *args: str) -> str:
+    """
+    Выполняет команду tar так же, как оболочка (с дополнением аргументов None).
+
+    Args:
+        current_dir (str): Текущая рабочая директория
+        *args (str): Аргументы команды
+
+    Returns:
+        str: Вывод команды
+    """
+    command = ["tar", *args, None, None]
+    return CommandTAR(command, current_dir).command_tar(command[1:], current_dir)
+
+
+def untar(current_dir: str, *args: str) -> str:
+    """
+    Выполняет команду untar так же, как оболочка (с дополнением аргументов None).
+
+    Args:
+        current_dir (str): Текущая рабочая директория
+        *args (str): Аргументы команды
+
+    Returns:
+        str: Вывод команды
+    """
+    command = ["untar", *args, None, None]
+    return CommandUNTAR(command, current_dir).command_untar(command[1:], current_dir)